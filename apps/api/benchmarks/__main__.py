@@ -0,0 +1,155 @@
+"""End-to-end API benchmarks
+
+Drives every router through an in-process ASGI client against an embedded
+SQLite database and a local OpenRouter stand-in, so the numbers are the API's
+own overhead (plus the simulated LLM latency), with no network or Supabase
+involved. Results are written as JSON and checked against thresholds.json and,
+optionally, a baseline run:
+
+    python -m benchmarks                          # 10 / 1k / 100k rows
+    python -m benchmarks --quick                  # 10 / 1k rows, fewer requests
+    python -m benchmarks --only "read.*,list.*" --sizes 1000
+    python -m benchmarks --llm-latency lognormal:800,0.4 --only "pipeline.*"
+    python -m benchmarks --baseline benchmarks/results/main.json
+"""
+import argparse
+import asyncio
+import fnmatch
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+HERE = Path(__file__).parent
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,1000,100000", help="rows per table, comma separated")
+    parser.add_argument("--class-size", type=int, default=30, help="processed results the class pipelines aggregate")
+    parser.add_argument("--concurrency", default="1,8,32", help="concurrency levels for the pipelines")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for requests per scenario")
+    parser.add_argument("--quick", action="store_true", help="10 / 1k rows and a tenth of the requests")
+    parser.add_argument("--only", help="comma separated glob patterns of scenario names")
+    parser.add_argument("--llm-latency", default="fixed:0", help='fake OpenRouter latency, e.g. "lognormal:800,0.4"')
+    parser.add_argument("--output", type=Path, help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", type=Path, help="earlier results to flag regressions against")
+    parser.add_argument("--thresholds", type=Path, default=HERE / "thresholds.json")
+    args = parser.parse_args()
+    if args.quick:
+        args.sizes = "10,1000"
+        args.scale *= 0.1
+    return args
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=HERE, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def check(results: dict[str, dict], thresholds: dict, baseline: Optional[dict[str, dict]]) -> list[str]:
+    """Returns a message for each scenario over its limits or regressed from the baseline
+
+    The first entry of `thresholds["limits"]` whose pattern matches a scenario
+    sets its p95_ms / min_rps / max_errors limits. A p95 more than
+    `max_regression` (a fraction) above the baseline's is flagged, unless both
+    are under `noise_floor_ms`.
+    """
+    failures = []
+    for name, stats in results.items():
+        limits = next(
+            (limits for pattern, limits in thresholds["limits"].items() if fnmatch.fnmatchcase(name, pattern)), {}
+        )
+        if stats["errors"] > limits.get("max_errors", 0):
+            failures.append(f"{name}: {stats['errors']} errors")
+        if "p95_ms" in limits and stats["p95_ms"] > limits["p95_ms"]:
+            failures.append(f"{name}: p95 {stats['p95_ms']:.1f} ms > {limits['p95_ms']} ms")
+        if "min_rps" in limits and stats["throughput_rps"] < limits["min_rps"]:
+            failures.append(f"{name}: {stats['throughput_rps']:.1f} req/s < {limits['min_rps']} req/s")
+
+        before = (baseline or {}).get(name)
+        if before is None or max(before["p95_ms"], stats["p95_ms"]) < thresholds["noise_floor_ms"]:
+            continue
+        if stats["p95_ms"] > before["p95_ms"] * (1 + thresholds["max_regression"]):
+            failures.append(f"{name}: p95 {stats['p95_ms']:.1f} ms regressed from {before['p95_ms']:.1f} ms")
+    return failures
+
+
+def main() -> int:
+    args = parse_args()
+    # Settings are read at import, so the environment is set up before importing the app
+    for name in ("API_KEY", "OPENROUTER_API_KEY", "DB_URL", "DB_API_KEY"):
+        os.environ.setdefault(name, "benchmark")
+    os.environ["DB_BACKEND"] = "sqlite"
+    # Access logs for every benchmark request would dominate the output
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Measure the pipelines themselves rather than the admission limits
+    os.environ.setdefault("LLM_ADMISSION_RATE", "0")
+    os.environ.setdefault("LLM_ADMISSION_KEY_RATE", "0")
+    os.environ.setdefault("LLM_RATE_LIMIT", "0")
+
+    from benchmarks.fakes import FakeOpenRouterConfig
+
+    from .harness import FakeLLMServer
+
+    started = datetime.now(timezone.utc)
+    with FakeLLMServer(FakeOpenRouterConfig(latency=args.llm_latency, seed=0)) as llm:
+        os.environ["OPENROUTER_BASE_URL"] = llm.base_url
+        from .suite import run_suite
+
+        patterns = args.only.split(",") if args.only else ["*"]
+
+        def progress(name: str, stats: dict) -> None:
+            print(
+                f"{name:45} p50 {stats['p50_ms']:9.2f}  p95 {stats['p95_ms']:9.2f}  p99 {stats['p99_ms']:9.2f} ms"
+                f"  {stats['throughput_rps']:9.1f} req/s  errors {stats['errors']}",
+                flush=True,
+            )
+
+        results = asyncio.run(
+            run_suite(
+                sizes=tuple(int(size) for size in args.sizes.split(",")),
+                class_size=args.class_size,
+                concurrencies=tuple(int(c) for c in args.concurrency.split(",")),
+                scale=args.scale,
+                select=lambda name: any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns),
+                progress=progress,
+            )
+        )
+
+    output = args.output or HERE / "results" / f"{started:%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(
+            {
+                "meta": {
+                    "timestamp": started.isoformat(),
+                    "commit": git_commit(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "args": {key: str(value) for key, value in vars(args).items()},
+                },
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+    print(f"\nResults written to {output}")
+
+    baseline = json.loads(args.baseline.read_text())["results"] if args.baseline else None
+    failures = check(results, json.loads(args.thresholds.read_text()), baseline)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""Local stand-in for the OpenRouter chat completions API
+
+Serves `POST /api/v1/chat/completions` with configurable latency, injected
+429/5xx errors and streaming, so the LLM paths can be load tested offline.
+Point the API at it with `OPENROUTER_BASE_URL=http://127.0.0.1:8100/api/v1`.
+
+Responses are synthesized from the request's `response_format` JSON schema
+(or a JSON array of strings when there is none), replayed from a cassette, or
+recorded from the real API into a cassette:
+
+    python -m benchmarks.fakes --latency lognormal:800,0.4 --error-429 0.05
+    python -m benchmarks.fakes --mode record --cassette benchmarks/cassettes/pipeline.jsonl
+    python -m benchmarks.fakes --mode replay --cassette benchmarks/cassettes/pipeline.jsonl
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+UPSTREAM_URL = "https://openrouter.ai/api/v1/chat/completions"
+WORDS = "cells membrane energy transport protein structure function gradient diffusion".split()
+
+
+def parse_latency(spec: str):
+    """Parses a latency distribution into a sampler returning seconds
+
+    Specs (milliseconds): "fixed:200", "uniform:100,400", "normal:300,50",
+    "lognormal:300,0.5" (median, sigma).
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "normal":
+        return lambda rng: max(rng.gauss(values[0], values[1]), 0) / 1000
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(0, values[1]) * values[0] / 1000
+    raise ValueError(f"Unknown latency distribution {spec!r}")
+
+
+def cassette_key(request: dict) -> str:
+    """Identifies a request by everything that affects the completion"""
+    relevant = {key: request.get(key) for key in ("model", "messages", "response_format")}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode()).hexdigest()
+
+
+def fake_value(schema: dict, rng: random.Random, example: Any = None) -> Any:
+    """Builds a value that satisfies a (simple) JSON schema
+
+    Like a model filling in a template, values present in `example` are kept
+    and only the missing ones are made up.
+    """
+    if "const" in schema:
+        return schema["const"]
+    kind = schema.get("type")
+    if kind == "object":
+        example = example if isinstance(example, dict) else {}
+        return {key: fake_value(sub, rng, example.get(key)) for key, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        if "prefixItems" in schema:
+            return [fake_value(sub, rng) for sub in schema["prefixItems"]]
+        items = schema.get("items") or {"type": "string"}
+        if isinstance(example, list):
+            return [fake_value(items, rng, item) for item in example]
+        # Arrays of property-less objects are placeholders that must stay empty
+        count = schema.get("minItems", 0 if items.get("properties") == {} else 3)
+        return [fake_value(items, rng) for _ in range(count)]
+    if example is not None and not isinstance(example, (dict, list)):
+        return example
+    if kind == "integer":
+        return rng.randint(schema.get("minimum", 1), schema.get("maximum", 5))
+    if kind == "number":
+        return round(rng.uniform(schema.get("minimum", 0), schema.get("maximum", 1)), 2)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12))).capitalize()
+
+
+def prompt_template(body: dict) -> Any:
+    """The JSON object the last message ends with (a template to fill in), if any"""
+    messages = body.get("messages") or []
+    text = messages[-1].get("content") if messages else None
+    if not isinstance(text, str):
+        return None
+    text = text.rstrip()
+    decoder = json.JSONDecoder()
+    for start in (i for i, char in enumerate(text) if char == "{"):
+        try:
+            value, end = decoder.raw_decode(text, start)
+        except ValueError:
+            continue
+        if end == len(text):
+            return value
+    return None
+
+
+@dataclass
+class FakeOpenRouterConfig:
+    latency: str = "fixed:0"
+    error_429: float = 0.0
+    error_5xx: float = 0.0
+    # Streamed responses are split into this many chunks, `chunk_delay` ms apart
+    chunks: int = 8
+    chunk_delay: float = 0.0
+    mode: str = "fake"  # fake | replay | record
+    cassette: Optional[Path] = None
+    # What a replay miss does: "fake" synthesizes a response, "error" returns 404
+    on_miss: str = "fake"
+    upstream_key: Optional[str] = None
+    seed: Optional[int] = None
+    stats: dict = field(default_factory=lambda: {"requests": 0, "429": 0, "5xx": 0, "replayed": 0, "recorded": 0})
+
+
+class FakeOpenRouter:
+    def __init__(self, config: FakeOpenRouterConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.sample_latency = parse_latency(config.latency)
+        self.cassette: dict[str, dict] = {}
+        if config.cassette and config.cassette.exists():
+            with config.cassette.open() as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.cassette[entry["key"]] = entry
+        self._record_lock = asyncio.Lock()
+
+    def app(self) -> Starlette:
+        return Starlette(
+            routes=[
+                Route("/api/v1/chat/completions", self.chat_completions, methods=["POST"]),
+                Route("/stats", self.stats, methods=["GET"]),
+            ]
+        )
+
+    async def stats(self, request: Request) -> Response:
+        return JSONResponse(self.config.stats)
+
+    async def chat_completions(self, request: Request) -> Response:
+        body = await request.json()
+        stats = self.config.stats
+        stats["requests"] += 1
+        await asyncio.sleep(self.sample_latency(self.rng))
+
+        roll = self.rng.random()
+        if roll < self.config.error_429:
+            stats["429"] += 1
+            return JSONResponse(
+                {"error": {"code": 429, "message": "Rate limit exceeded"}},
+                status_code=429,
+                headers={"Retry-After": "1"},
+            )
+        if roll < self.config.error_429 + self.config.error_5xx:
+            stats["5xx"] += 1
+            status = self.rng.choice((500, 502, 503))
+            return JSONResponse({"error": {"code": status, "message": "Upstream error"}}, status_code=status)
+
+        content = await self.completion_content(body)
+        if content is None:
+            return JSONResponse({"error": {"code": 404, "message": "Request not in cassette"}}, status_code=404)
+        if body.get("stream"):
+            return StreamingResponse(self.stream(body, content), media_type="text/event-stream")
+        return JSONResponse(self.completion(body, content))
+
+    async def completion_content(self, body: dict) -> Optional[str]:
+        key = cassette_key(body)
+        if self.config.mode in ("replay", "record") and key in self.cassette:
+            self.config.stats["replayed"] += 1
+            return self.cassette[key]["content"]
+        if self.config.mode == "record":
+            return await self.record(key, body)
+        if self.config.mode == "replay" and self.config.on_miss == "error":
+            return None
+        return self.fake_content(body)
+
+    def fake_content(self, body: dict) -> str:
+        response_format = body.get("response_format") or {}
+        schema = response_format.get("json_schema", {}).get("schema")
+        if schema is None:
+            schema = {"type": "array", "minItems": 4, "items": {"type": "string"}}
+        return json.dumps(fake_value(schema, self.rng, prompt_template(body)))
+
+    async def record(self, key: str, body: dict) -> str:
+        async with httpx.AsyncClient(timeout=120.0) as client:
+            response = await client.post(
+                UPSTREAM_URL,
+                headers={"Authorization": f"Bearer {self.config.upstream_key}"},
+                json={**body, "stream": False},
+            )
+        response.raise_for_status()
+        content = response.json()["choices"][0]["message"]["content"]
+        entry = {"key": key, "request": body, "content": content}
+        async with self._record_lock:
+            self.cassette[key] = entry
+            self.config.cassette.parent.mkdir(parents=True, exist_ok=True)
+            with self.config.cassette.open("a") as f:
+                f.write(json.dumps(entry) + "\n")
+        self.config.stats["recorded"] += 1
+        return content
+
+    def completion(self, body: dict, content: str) -> dict:
+        return {
+            "id": f"gen-fake-{self.rng.getrandbits(32):08x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(json.dumps(body.get("messages"))) // 4, "completion_tokens": len(content) // 4},
+        }
+
+    async def stream(self, body: dict, content: str):
+        yield ": OPENROUTER PROCESSING\n\n"
+        size = max(len(content) // max(self.config.chunks, 1), 1)
+        for start in range(0, len(content), size):
+            delta = {"choices": [{"index": 0, "delta": {"content": content[start : start + size]}}]}
+            yield f"data: {json.dumps(delta)}\n\n"
+            if self.config.chunk_delay:
+                await asyncio.sleep(self.config.chunk_delay / 1000)
+        yield f"data: {json.dumps({'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})}\n\n"
+        yield "data: [DONE]\n\n"
+
+
+def create_app(config: Optional[FakeOpenRouterConfig] = None) -> Starlette:
+    return FakeOpenRouter(config or FakeOpenRouterConfig()).app()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", default="fixed:0", help='e.g. "lognormal:800,0.4" (ms)')
+    parser.add_argument("--error-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--error-5xx", type=float, default=0.0, help="fraction of requests answered with 5xx")
+    parser.add_argument("--chunks", type=int, default=8)
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="ms between streamed chunks")
+    parser.add_argument("--mode", choices=("fake", "replay", "record"), default="fake")
+    parser.add_argument("--cassette", type=Path)
+    parser.add_argument("--on-miss", choices=("fake", "error"), default="fake")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    if args.mode != "fake" and args.cassette is None:
+        parser.error("--cassette is required for replay and record modes")
+
+    import uvicorn
+
+    config = FakeOpenRouterConfig(
+        latency=args.latency,
+        error_429=args.error_429,
+        error_5xx=args.error_5xx,
+        chunks=args.chunks,
+        chunk_delay=args.chunk_delay,
+        mode=args.mode,
+        cassette=args.cassette,
+        on_miss=args.on_miss,
+        upstream_key=os.getenv("OPENROUTER_API_KEY"),
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Load generation, latency statistics and the local LLM stand-in for the benchmarks"""
+import asyncio
+import socket
+import threading
+import time
+from typing import Awaitable, Callable
+
+import httpx
+import numpy as np
+import uvicorn
+
+from benchmarks.fakes import FakeOpenRouterConfig, create_app
+
+
+async def run_load(
+    send: Callable[[int], Awaitable[httpx.Response]],
+    *,
+    requests: int,
+    concurrency: int,
+) -> dict:
+    """Sends `requests` requests from `concurrency` workers and summarizes their latencies
+
+    Args:
+        send (Callable[[int], Awaitable[httpx.Response]]): Sends the i-th request
+        requests (int): Total number of requests
+        concurrency (int): Requests in flight at once
+
+    Returns:
+        dict: Latency percentiles (ms), throughput (requests/s) and error count
+    """
+    latencies = np.empty(requests)
+    errors = 0
+    next_request = 0
+
+    async def worker():
+        nonlocal errors, next_request
+        while next_request < requests:
+            i = next_request
+            next_request += 1
+            start = time.perf_counter()
+            try:
+                failed = (await send(i)).status_code >= 400
+            except Exception:
+                failed = True
+            latencies[i] = time.perf_counter() - start
+            errors += failed
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(latencies, (50, 95, 99)) * 1000
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(latencies.mean() * 1000), 3),
+        "max_ms": round(float(latencies.max() * 1000), 3),
+        "throughput_rps": round(requests / elapsed, 2),
+    }
+
+
+class FakeLLMServer:
+    """Runs the OpenRouter stand-in on a local port in a background thread
+
+    A real socket (rather than an ASGI transport) so every HTTP client the API
+    uses reaches it through OPENROUTER_BASE_URL.
+    """
+
+    def __init__(self, config: FakeOpenRouterConfig):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.server = uvicorn.Server(
+            uvicorn.Config(create_app(config), host="127.0.0.1", port=self.port, log_level="warning")
+        )
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/v1"
+
+    def __enter__(self) -> "FakeLLMServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join()
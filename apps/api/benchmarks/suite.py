@@ -0,0 +1,245 @@
+"""Benchmark scenarios: every router driven through an ASGI client on SQLite"""
+import json
+import random
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterator
+
+import httpx
+
+from src.api.dependencies import get_db
+from src.config import settings
+from src.main import app
+from src.services import spell_search
+from src.storage import SQLiteBackend, StorageBackend
+
+from .harness import run_load
+
+API = settings.API_VERSION
+HEADERS = {"Authorization": f"Bearer {settings.API_KEY}"}
+
+# Ids of the rows every dataset has
+TEACHER_ID = STUDENT_ID = ASSESSMENT_ID = RESULT_ID = 1
+# Assessment whose results all have filled mindmaps, for the class pipelines
+CLASS_ASSESSMENT_ID = 2
+
+TEMPLATE = {
+    "topic": {
+        "name": "Cell biology",
+        "description": "Structure and function of cells",
+        "subtopics": [
+            {
+                "name": f"Subtopic {i}",
+                "description": "A key idea",
+                "subtopics": [{"name": f"Detail {i}.{j}", "description": "A detail", "subtopics": []} for j in range(3)],
+            }
+            for i in range(4)
+        ],
+    }
+}
+
+
+def filled_mindmap(rng: random.Random) -> str:
+    def fill(node: dict) -> dict:
+        return {
+            **node,
+            "studentResponse": "The student explained it",
+            "understandingLevel": rng.randint(1, 5),
+            "subtopics": [fill(child) for child in node["subtopics"]],
+        }
+
+    return json.dumps({"topic": fill(TEMPLATE["topic"])})
+
+
+async def seed(db: StorageBackend, rows: int, class_size: int) -> None:
+    """Fills every table with `rows` rows, plus a processed class of `class_size` results"""
+    rng = random.Random(rows)
+    template = json.dumps(TEMPLATE)
+    await db.insert("Teacher", [{"name": f"Teacher {i}"} for i in range(rows)])
+    await db.insert(
+        "Assessment",
+        [
+            {
+                "name": f"Assessment {i}",
+                "first_question": "What do you know about cells?",
+                "system_prompt": "You are a friendly interviewer.",
+                "mindmap_template": template,
+                "teacher_id": TEACHER_ID,
+            }
+            for i in range(max(rows, CLASS_ASSESSMENT_ID))
+        ],
+    )
+    # After the assessments, so the database indexes the assignments (see services/assignments.py)
+    await db.insert("Student", [{"name": f"Student {i}", "assessment_ids": [ASSESSMENT_ID]} for i in range(rows)])
+    await db.insert(
+        "AssessmentResult",
+        [
+            {
+                "assessment_id": ASSESSMENT_ID,
+                "teacher_id": TEACHER_ID,
+                "student_id": STUDENT_ID + i % rows,
+                "transcript": "Teacher: What do you know about cells?\nStudent: They have membranes.",
+            }
+            for i in range(rows)
+        ],
+    )
+    await db.insert(
+        "AssessmentResult",
+        [
+            {
+                "assessment_id": CLASS_ASSESSMENT_ID,
+                "teacher_id": TEACHER_ID + 1,
+                "student_id": STUDENT_ID + i,
+                "transcript": "Teacher: ...\nStudent: ...",
+                "mindmap": filled_mindmap(rng),
+            }
+            for i in range(class_size)
+        ],
+    )
+    await db.insert(
+        "spells",
+        [{"id": f"spell-{i}", "name": f"Spell {i}", "description": "Makes things float"} for i in range(rows)],
+    )
+
+
+@dataclass
+class Scenario:
+    name: str
+    send: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+    requests: int
+    concurrency: int
+
+
+def get(path: str) -> Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]:
+    return lambda client, i: client.get(path, headers=HEADERS)
+
+
+def table_scenarios(rows: int, scale: float) -> Iterator[Scenario]:
+    """Reads, creates and full-table lists against a dataset of `rows` rows per table"""
+    def n(count: int) -> int:
+        return max(int(count * scale), 5)
+
+    reads = {
+        "teacher": f"{API}/teachers/{TEACHER_ID}",
+        "student": f"{API}/students/{STUDENT_ID}",
+        "assessment": f"{API}/assessments/{ASSESSMENT_ID}",
+        "assessment_result": f"{API}/assessment-results/{RESULT_ID}",
+        "assessment_stats": f"{API}/assessments/{CLASS_ASSESSMENT_ID}/stats",
+        "spell": f"{API}/spells/get/?spell_id=spell-0",
+    }
+    for name, path in reads.items():
+        yield Scenario(f"read.{name}@{rows}", get(path), n(500), 16)
+
+    creates = {
+        "teacher": ("POST", f"{API}/teachers/", {"name": "New teacher"}),
+        "student": ("POST", f"{API}/students/", {"name": "New student", "assessment_ids": []}),
+        "assessment": (
+            "POST",
+            f"{API}/assessments/",
+            {
+                "name": "New assessment",
+                "first_question": "?",
+                "system_prompt": "",
+                "mindmap_template": json.dumps(TEMPLATE),
+                "teacher_id": TEACHER_ID,
+            },
+        ),
+        # Results are created with GET (see endpoints/assessment_results.py)
+        "assessment_result": (
+            "GET",
+            f"{API}/assessment-results/",
+            {"assessment_id": CLASS_ASSESSMENT_ID, "teacher_id": TEACHER_ID, "student_id": STUDENT_ID},
+        ),
+    }
+    for name, (method, path, body) in creates.items():
+        def send(client, i, method=method, path=path, body=body):
+            return client.request(method, path, headers=HEADERS, json=body)
+
+        yield Scenario(f"create.{name}@{rows}", send, n(300), 16)
+
+    lists = {
+        "teachers": f"{API}/teachers/",
+        "students": f"{API}/students/",
+        "assessments": f"{API}/assessments/",
+        "teacher_assessments": f"{API}/assessments/teacher/{TEACHER_ID}",
+        "student_assessments": f"{API}/assessments/student/{STUDENT_ID}",
+        "teacher_results": f"{API}/assessment-results/teacher/{TEACHER_ID}",
+        "teacher_results_export": f"{API}/assessment-results/export/teacher/{TEACHER_ID}",
+        "student_results": f"{API}/assessment-results/student/{STUDENT_ID}",
+        "spells": f"{API}/spells/get-all/",
+        "spell_search": f"{API}/spells/search/?keyword=spell%201&max_results=10",
+    }
+    for name, path in lists.items():
+        yield Scenario(f"list.{name}@{rows}", get(path), max(int(20_000 / rows * scale), 3), 4)
+
+
+def pipeline_scenarios(scale: float, concurrencies: tuple[int, ...]) -> Iterator[Scenario]:
+    """LLM-backed processing at each concurrency level"""
+    def n(count: int) -> int:
+        return max(int(count * scale), 2)
+
+    def mindmap(client, i):
+        return client.post(
+            f"{API}/assessments/generate-mindmap", headers=HEADERS, json={"text": "Cells have membranes and organelles."}
+        )
+
+    for c in concurrencies:
+        yield Scenario(f"pipeline.class_numbers@c{c}", get(f"{API}/assessments/{CLASS_ASSESSMENT_ID}/process?mode=numbers"), n(100), c)
+        yield Scenario(f"pipeline.class_insights@c{c}", get(f"{API}/assessments/{CLASS_ASSESSMENT_ID}/process"), n(20), c)
+        yield Scenario(f"pipeline.result_process@c{c}", get(f"{API}/assessment-results/{RESULT_ID}/process"), n(20), c)
+        yield Scenario(f"pipeline.generate_mindmap@c{c}", mindmap, n(20), c)
+
+
+async def run_suite(
+    *,
+    sizes: tuple[int, ...],
+    class_size: int,
+    concurrencies: tuple[int, ...],
+    scale: float = 1.0,
+    select: Callable[[str], bool] = lambda name: True,
+    progress: Callable[[str, dict], None] = lambda name, stats: None,
+) -> dict[str, dict]:
+    """Runs the scenarios against a fresh SQLite database per dataset size
+
+    Args:
+        sizes (tuple[int, ...]): Rows per table for the table scenarios
+        class_size (int): Processed results in the class the pipelines aggregate
+        concurrencies (tuple[int, ...]): Concurrency levels for the pipelines
+        scale (float, optional): Multiplier for the number of requests per scenario. Defaults to 1.0.
+        select (Callable[[str], bool], optional): Picks the scenarios to run by name. Defaults to all.
+        progress (Callable[[str, dict], None], optional): Called with each scenario's results.
+
+    Returns:
+        dict[str, dict]: Results by scenario name
+    """
+    results: dict[str, dict] = {}
+    for i, rows in enumerate(sizes):
+        scenarios = [s for s in table_scenarios(rows, scale) if select(s.name)]
+        if i == 0:
+            scenarios += [s for s in pipeline_scenarios(scale, concurrencies) if select(s.name)]
+        if not scenarios:
+            continue
+
+        db = SQLiteBackend()
+        await seed(db, rows, class_size)
+
+        async def override():
+            yield db
+
+        app.dependency_overrides[get_db] = override
+        # The spell index would otherwise keep serving the previous dataset
+        spell_search.invalidate()
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                for scenario in scenarios:
+                    stats = await run_load(
+                        lambda i, send=scenario.send: send(client, i),
+                        requests=scenario.requests,
+                        concurrency=scenario.concurrency,
+                    )
+                    results[scenario.name] = stats
+                    progress(scenario.name, stats)
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            await db.close()
+    return results
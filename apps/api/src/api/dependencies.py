@@ -1,30 +1,151 @@
-from typing import Annotated, AsyncGenerator
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Annotated, AsyncGenerator, AsyncIterator, Optional
 
-from fastapi import Depends, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
 from supabase._async.client import AsyncClient, create_client
 from supabase.lib.client_options import AsyncClientOptions as ClientOptions
 
 from src.config import settings
+from src.services.admission import AdmissionRejected, get_controller, retry_after_header
+from src.services.cache import get_cache
+from src.storage import (
+    LargeTextBackend,
+    LocalBlobStore,
+    PostgrestBackend,
+    SQLiteBackend,
+    StorageBackend,
+    SupabaseBlobStore,
+)
 
+_backend: Optional[StorageBackend] = None
+_backend_lock: Optional[asyncio.Lock] = None
+logger = logging.getLogger(__name__)
 
-async def get_db() -> AsyncGenerator[AsyncClient, None]:
-    client: AsyncClient | None = None
+
+async def create_supabase_client() -> AsyncClient:
+    client = await create_client(
+        settings.DB_URL,
+        settings.DB_API_KEY,
+        options=ClientOptions(
+            postgrest_client_timeout=10, storage_client_timeout=10
+        ),
+    )
+    # client = await client.auth.sign_in_with_password(
+    #     {"email": settings.DB_EMAIL, "password": settings.DB_PASSWORD}
+    # )
+    return client
+
+
+async def create_backend() -> StorageBackend:
+    """Creates the storage backend selected by settings.DB_BACKEND, packing large text per settings.LARGE_TEXT_STORAGE
+
+    CRUD lookups by id through it are cached in the process-wide cache.
+    """
+    client = None
+    if settings.DB_BACKEND == "sqlite":
+        backend = SQLiteBackend(settings.SQLITE_PATH)
+    else:
+        client = await create_supabase_client()
+        backend = PostgrestBackend(client)
+
+    blobs = None
+    if settings.LARGE_TEXT_STORAGE == "offload":
+        if settings.BLOB_BACKEND == "local":
+            blobs = LocalBlobStore(settings.BLOB_DIR)
+        else:
+            blobs = SupabaseBlobStore(client or await create_supabase_client(), settings.BLOB_BUCKET)
+    backend = LargeTextBackend(
+        backend,
+        min_size=settings.LARGE_TEXT_MIN_SIZE if settings.LARGE_TEXT_STORAGE != "plain" else None,
+        blobs=blobs,
+        offload_size=settings.LARGE_TEXT_OFFLOAD_SIZE,
+    )
+    backend.cache = get_cache()
+    return backend
+
+
+async def get_backend() -> StorageBackend:
+    """Returns the shared storage backend, creating it on first use
+
+    Created lazily rather than in the lifespan, as not every ASGI host sends
+    lifespan events (@vercel/python doesn't reliably). The lock keeps concurrent
+    first requests from creating one each.
+    """
+    global _backend, _backend_lock
+    if _backend is None:
+        if _backend_lock is None:
+            _backend_lock = asyncio.Lock()
+        async with _backend_lock:
+            if _backend is None:
+                _backend = await create_backend()
+    return _backend
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Closes the shared storage backend on shutdown, if a request created it"""
+    global _backend, _backend_lock
     try:
-        client = await create_client(
-            settings.DB_URL,
-            settings.DB_API_KEY,
-            options=ClientOptions(
-                postgrest_client_timeout=10, storage_client_timeout=10
-            ),
-        )
-        # client = await client.auth.sign_in_with_password(
-        #     {"email": settings.DB_EMAIL, "password": settings.DB_PASSWORD}
-        # )
-        yield client
+        yield
+    finally:
+        if _backend is not None:
+            await _backend.close()
+        _backend = _backend_lock = None
+
 
-    except Exception as e:
-        print(e)
+async def get_db() -> AsyncGenerator[StorageBackend, None]:
+    # Shared by all requests, so they reuse its connections
+    backend = await get_backend()
+    try:
+        yield backend
+
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Unhandled error in request")
         raise
 
 
-SessionDep = Annotated[AsyncClient, Depends(get_db)]
+def client_key(request: Request) -> str:
+    """Tells clients apart for admission control, by IP address
+
+    Behind a proxy, run uvicorn with --proxy-headers (and --forwarded-allow-ips)
+    so this is the client's address rather than the proxy's.
+    """
+    return request.client.host if request.client else "unknown"
+
+
+async def admit_llm(client: str) -> None:
+    """Holds an LLM-backed request in the admission queue, or sheds it with a 429
+
+    Raises:
+        HTTPException: 429 with Retry-After when the request can't be admitted in time
+    """
+    try:
+        await get_controller().admit(client)
+    except AdmissionRejected as e:
+        logger.warning("LLM request shed by admission control", extra={"retry_after": e.retry_after})
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests for LLM processing, please retry later",
+            headers=retry_after_header(e.retry_after),
+        )
+
+
+async def admit_llm_request(request: Request) -> None:
+    """Route dependency for endpoints that always call the LLM"""
+    await admit_llm(client_key(request))
+
+
+def prefer_minimal(prefer: Optional[str] = Header(None)) -> bool:
+    """True when the client sent `Prefer: return=minimal` (as with PostgREST), asking for no response body"""
+    return prefer is not None and "return=minimal" in prefer.replace(" ", "").split(",")
+
+
+# Documents the bodiless response of write routes that honour prefer_minimal
+MINIMAL_RESPONSE = {204: {"description": "Updated, no body (Prefer: return=minimal)"}}
+
+
+SessionDep = Annotated[StorageBackend, Depends(get_db)]
@@ -1,51 +1,246 @@
 import json
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from supabase._async.client import AsyncClient
+import logging
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from ....storage import StorageBackend
 from datetime import datetime
 import os
-import requests
 
 
-from ...dependencies import get_db
-from ....schemas.assessment_result import AssessmentResult, AssessmentResultCreate, AssessmentResultUpdate, AssessmentResultResponse
+from ...dependencies import MINIMAL_RESPONSE, admit_llm_request, get_db, prefer_minimal
+from ....schemas.assessment_result import AssessmentResult, AssessmentResultCreate, AssessmentResultPatch, AssessmentResultUpdate, AssessmentResultResponse
+from ....schemas.transcript_segment import Transcript, TranscriptSegment, TranscriptSegmentCreate, TranscriptSegmentIn
 from ....crud.assessment_result import assessment_result
 from ....crud.assessment import assessment
+from ....crud.transcript_segment import transcript_segment
+from ....services import transcripts
+from ....services.assessment_stats import record_result_change
+from ....services.events import publish_result
+from ....services.llm_scheduler import Priority
+from ....services.mindmap_validation import compile_template
+from ....services.openrouter import chat_completion_json
+from ....services.result_export import FORMATS, export_results, parse_columns, template_paths
+from ....prompts import FILL_MINDMAP, RESULT_INSIGHTS
 from ....config import settings
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# The result columns events are published with
+EVENT_COLUMNS = ["id", "assessment_id", "teacher_id", "student_id"]
+# The result columns listed without the transcript, the largest (and possibly offloaded) one
+LIST_COLUMNS = [field for field in AssessmentResult.model_fields if field != "transcript"]
 
 @router.get("/", response_model=AssessmentResultResponse)
-async def create_assessment_result(result_in: AssessmentResultCreate, db: AsyncClient = Depends(get_db)):
-    return await assessment_result.create(db=db, obj_in=result_in)
+async def create_assessment_result(result_in: AssessmentResultCreate, db: StorageBackend = Depends(get_db)):
+    db_result = await assessment_result.create(db=db, obj_in=result_in)
+    await record_result_change(db, new=db_result)
+    await publish_result("result.created", db_result)
+    return db_result
 
 @router.get("/{result_id}", response_model=AssessmentResultResponse)
-async def read_assessment_result(result_id: int, db: AsyncClient = Depends(get_db)):
+async def read_assessment_result(result_id: int, db: StorageBackend = Depends(get_db)):
     db_result = await assessment_result.get(db, id=result_id)
     if db_result is None:
         raise HTTPException(status_code=404, detail="Assessment result not found")
+    await transcripts.assemble(db, [db_result])
     return db_result
 
 @router.get("/student/{student_id}", response_model=List[AssessmentResultResponse])
-async def read_student_results(student_id: int, db: AsyncClient = Depends(get_db)):
-    results = await assessment_result.get_by_student(db, student_id=student_id)
-    return results
+async def read_student_results(student_id: int, transcript: bool = True, db: StorageBackend = Depends(get_db)):
+    """Lists a student's results; ?transcript=false leaves the transcripts out (null), which is cheaper"""
+    results = await assessment_result.get_by_student(
+        db, student_id=student_id, columns=None if transcript else LIST_COLUMNS
+    )
+    return await transcripts.assemble(db, results) if transcript else results
 
 @router.get("/teacher/{teacher_id}", response_model=List[AssessmentResultResponse])
-async def read_teacher_results(teacher_id: int, db: AsyncClient = Depends(get_db)):
-    results = await assessment_result.get_by_teacher(db, teacher_id=teacher_id)
-    return results
+async def read_teacher_results(teacher_id: int, transcript: bool = True, db: StorageBackend = Depends(get_db)):
+    """Lists a teacher's results; ?transcript=false leaves the transcripts out (null), which is cheaper"""
+    results = await assessment_result.get_by_teacher(
+        db, teacher_id=teacher_id, columns=None if transcript else LIST_COLUMNS
+    )
+    return await transcripts.assemble(db, results) if transcript else results
+
+@router.post("/{result_id}/transcript", response_model=List[TranscriptSegment])
+async def append_transcript(result_id: int, segments: List[TranscriptSegmentIn], db: StorageBackend = Depends(get_db)):
+    """Appends segments to a live interview's transcript, without rewriting the result"""
+    # Only the keys the subscribers are notified by, not the (possibly large) transcript
+    rows = await db.select(AssessmentResult.table_name, columns=EVENT_COLUMNS, where={"id": result_id})
+    if not rows:
+        raise HTTPException(status_code=404, detail="Assessment result not found")
+    if not segments:
+        return []
+    created = await transcript_segment.create_many(
+        db, objs_in=[TranscriptSegmentCreate(result_id=result_id, **segment.model_dump()) for segment in segments]
+    )
+    await publish_result(
+        "transcript.appended",
+        rows[0],
+        segments=[segment.model_dump(include={"speaker", "offset_ms", "text"}) for segment in created],
+    )
+    return created
+
+@router.get("/{result_id}/transcript", response_model=Transcript)
+async def read_transcript(result_id: int, db: StorageBackend = Depends(get_db)):
+    """Returns the full transcript: the stored transcript followed by the appended segments"""
+    rows = await db.select(AssessmentResult.table_name, columns=["id", "transcript"], where={"id": result_id})
+    if not rows:
+        raise HTTPException(status_code=404, detail="Assessment result not found")
+    pending = await transcripts.pending_for(db, result_id)
+    return Transcript(
+        result_id=result_id,
+        transcript=transcripts.render(rows[0]["transcript"], pending) or "",
+        pending_segments=len(pending),
+    )
+
+def export_response(
+    db: StorageBackend,
+    *,
+    where: dict,
+    filename: str,
+    format: str,
+    columns: Optional[str],
+    scores: bool,
+    score_paths: Optional[list[str]] = None,
+) -> StreamingResponse:
+    """Streams the matching results as an NDJSON or CSV download"""
+    try:
+        selected = parse_columns(columns)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return StreamingResponse(
+        export_results(
+            db,
+            where=where,
+            fmt=format,
+            columns=selected,
+            scores=scores,
+            score_paths=score_paths,
+            page_size=settings.EXPORT_PAGE_SIZE,
+        ),
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
+
+@router.get("/export/teacher/{teacher_id}")
+async def export_teacher_results(
+    teacher_id: int,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    columns: Optional[str] = None,
+    scores: bool = False,
+    db: StorageBackend = Depends(get_db),
+):
+    """Streams all of a teacher's results; `columns` is a comma separated subset, `scores` adds mindmap scores"""
+    return export_response(
+        db,
+        where={"teacher_id": teacher_id},
+        filename=f"teacher-{teacher_id}-results",
+        format=format,
+        columns=columns,
+        scores=scores,
+    )
+
+@router.get("/export/student/{student_id}")
+async def export_student_results(
+    student_id: int,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    columns: Optional[str] = None,
+    scores: bool = False,
+    db: StorageBackend = Depends(get_db),
+):
+    """Streams all of a student's results; `columns` is a comma separated subset, `scores` adds mindmap scores"""
+    return export_response(
+        db,
+        where={"student_id": student_id},
+        filename=f"student-{student_id}-results",
+        format=format,
+        columns=columns,
+        scores=scores,
+    )
+
+@router.get("/export/assessment/{assessment_id}")
+async def export_assessment_results(
+    assessment_id: int,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    columns: Optional[str] = None,
+    scores: bool = False,
+    db: StorageBackend = Depends(get_db),
+):
+    """Streams all results of an assessment; in CSV, `scores` adds a column per node of its template"""
+    assessmentx = await assessment.get(db, id=assessment_id)
+    if assessmentx is None:
+        raise HTTPException(status_code=404, detail="Assessment not found")
+    return export_response(
+        db,
+        where={"assessment_id": assessment_id},
+        filename=f"assessment-{assessment_id}-results",
+        format=format,
+        columns=columns,
+        scores=scores,
+        score_paths=template_paths(assessmentx.mindmap_template) if scores else None,
+    )
 
 @router.put("/{result_id}", response_model=AssessmentResultResponse)
-async def update_assessment_result(result_id: int, result_in: AssessmentResultUpdate, db: AsyncClient = Depends(get_db)):
+async def update_assessment_result(result_id: int, result_in: AssessmentResultUpdate, db: StorageBackend = Depends(get_db)):
     result_in.id = result_id
-    return await assessment_result.update(db, obj_in=result_in)
+    old_result = await assessment_result.get(db, id=result_id)
+    # The transcript sent replaces the full one, segments included
+    pending = await transcripts.pending_for(db, result_id)
+    db_result = await assessment_result.update(db, obj_in=result_in)
+    await transcripts.compact(db, pending)
+    await record_result_change(db, old=old_result, new=db_result)
+    await publish_result("result.updated", db_result)
+    return db_result
+
+# Fields the assessment stats are computed from
+STATS_FIELDS = {"assessment_id", "mindmap"}
+
+@router.patch("/{result_id}", response_model=AssessmentResultResponse, responses=MINIMAL_RESPONSE)
+async def patch_assessment_result(
+    result_id: int,
+    result_in: AssessmentResultPatch,
+    minimal: bool = Depends(prefer_minimal),
+    db: StorageBackend = Depends(get_db),
+):
+    """Updates only the fields sent, e.g. the mindmap without resending the transcript"""
+    changes = result_in.changes()
+    # The stats only need the old row when the patch touches what they are computed from
+    old_result = await assessment_result.get(db, id=result_id) if STATS_FIELDS & changes.keys() else None
+    # A transcript sent replaces the full one, segments included
+    pending = await transcripts.pending_for(db, result_id) if "transcript" in changes else []
+    db_result = await assessment_result.patch(db, id=result_id, obj_in=result_in, returning=not minimal)
+    # False with Prefer: return=minimal, as only the count of matched rows comes back
+    if not db_result:
+        raise HTTPException(status_code=404, detail="Assessment result not found")
+    await transcripts.compact(db, pending)
+    if old_result is not None:
+        new_result = old_result.model_copy(update=changes)
+        if new_result.assessment_id == old_result.assessment_id:
+            await record_result_change(db, old=old_result, new=new_result)
+        else:
+            await record_result_change(db, old=old_result)
+            await record_result_change(db, new=new_result)
+    if not minimal:
+        updated = db_result
+    else:
+        updated = old_result.model_copy(update=changes) if old_result is not None else None
+    if updated is None and changes:
+        # Nothing read back (Prefer: return=minimal), so only the keys subscribers are notified by
+        rows = await db.select(AssessmentResult.table_name, columns=EVENT_COLUMNS, where={"id": result_id})
+        updated = rows[0] if rows else None
+    if updated is not None:
+        await publish_result("result.updated", updated, fields=sorted(changes))
+    if minimal:
+        return Response(status_code=204)
+    return db_result
 
-def process_assessment(data: dict) -> dict:
+async def process_assessment(data: dict) -> dict:
     """
     Replicates the logic of the Deno serve function: 
     1. Validates 'transcript' and 'mindmap_template' in the incoming data.
-    2. Calls OpenRouter to fill in the mindmap template.
+    2. Calls OpenRouter to fill in the mindmap template and validates the result against it.
     3. Calls OpenRouter again to generate insights.
     4. Returns a dictionary containing the 'mindmap' and 'insights'.
     """
@@ -58,105 +253,46 @@ def process_assessment(data: dict) -> dict:
         if not transcript or not mindmap_template:
             raise ValueError("Missing required fields: 'transcript' and 'mindmap_template'")
 
-        # Get OpenRouter API key from settings
-        OPENROUTER_API_KEY = settings.OPENROUTER_API_KEY
-        if not OPENROUTER_API_KEY:
-            raise ValueError("OPENROUTER_API_KEY is missing from settings")
-
-        # 2. Construct the prompt to fill in the mindmap
-        fill_prompt = (
-            f'Given this transcript of a student\'s interview with a teacher: "{transcript}"\n\n'
-            "Please analyze it and fill out the following template with relevant information. "
-            "You'll need to fill in the studentResponse and understandingLevel (1-5) fields for each "
-            "topic and subtopic.\n"
-            "Respond ONLY with the completed JSON template, maintaining the exact same structure:\n"
-            f"{json.dumps(mindmap_template, indent=2)}"
-        )
-
-        # 3. Make the first request to OpenRouter to fill the template
-        fill_response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://alterview-web.vercel.app"
-            },
-            json={
-                "model": "google/gemini-2.0-flash-001",
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": fill_prompt
-                    }
-                ]
-            },
-            timeout=60
-        )
+        # Compiled once per template and cached, so this is a dict lookup after the first result
+        compiled_template = compile_template(mindmap_template)
 
-        if not fill_response.ok:
-            raise RuntimeError(f"OpenRouter API error: {fill_response.text}")
-
-        fill_data = fill_response.json()
-        # Clean the response content of any markdown formatting
-        fill_content_raw = fill_data["choices"][0]["message"]["content"]
-        fill_content = fill_content_raw.replace("```json", "").replace("```", "").strip()
-        filled_template = json.loads(fill_content)
-
-        # 4. Construct the prompt for generating insights
-        insights_prompt = (
-            "Based on this assessment data:\n"
-            f"{json.dumps(filled_template, indent=2)}\n\n"
-            "Generate 3-5 specific, actionable insights for the teacher to help this student improve. "
-            "Each insight should be concrete and implementable. Format the response as a JSON array of strings."
+        # 2. Ask OpenRouter to fill the template, extracting the JSON from the response as it streams
+        filled_template = await chat_completion_json(
+            FILL_MINDMAP,
+            {"transcript": transcript, "template": compiled_template.template_json},
+            response_format=compiled_template.response_format_json,
+            expect=dict,
+            # Rejects shape drift before anything downstream sees (or caches, or persists) it
+            validate=compiled_template.validate,
+            priority=Priority.BATCH,
         )
 
-        # 5. Make the second request to OpenRouter to get the insights
-        insights_response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://alterview-web.vercel.app"
-            },
-            json={
-                "model": "openai/gpt-4o",
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": insights_prompt
-                    }
-                ]
-            },
-            timeout=60
+        # 3. Ask OpenRouter for the insights
+        clean_insights = await chat_completion_json(
+            RESULT_INSIGHTS,
+            {"mindmap": json.dumps(filled_template, indent=2)},
+            expect=list,
+            priority=Priority.BATCH,
         )
 
-        if not insights_response.ok:
-            raise RuntimeError(f"OpenRouter API error generating insights: {insights_response.text}")
-
-        insights_data = insights_response.json()
-        insights_content_raw = insights_data["choices"][0]["message"]["content"]
-        insights_content = insights_content_raw.replace("```json", "").replace("```", "").strip()
-        clean_insights = json.loads(insights_content)
-
-        # 6. Return the combined data
+        # 4. Return the combined data
         return {
             "mindmap": filled_template,
             "insights": clean_insights
         }
 
     except Exception as e:
-        # In a real production app, you might log the exception or return a detailed error response.
+        logger.warning("Assessment processing failed", exc_info=True)
         return {
             "error": str(e)
         }
 
-@router.get("/{result_id}/process")
+@router.get("/{result_id}/process", dependencies=[Depends(admit_llm_request)])
 async def process_assessment_result(
     result_id: int,
-    db: AsyncClient = Depends(get_db)
+    db: StorageBackend = Depends(get_db)
 ):
-    # Just return the result id that was received
-    print(f"DIAGNOSTIC: Received result_id: {result_id}")
+    logger.debug("Processing assessment result", extra={"result_id": result_id})
     
     # Get the existing result
     db_result = await assessment_result.get(db, id=result_id)
@@ -170,7 +306,8 @@ async def process_assessment_result(
     assessmentx = await assessment.get(db, id=assessment_id)
 
     blankMindmapTemplate = assessmentx.mindmap_template
-    userTranscript = db_result.transcript
+    pending = (await transcripts.pending_segments(db, [result_id])).get(result_id, [])
+    userTranscript = transcripts.render(db_result.transcript, pending)
 
     data = {
         "root": "Assessment Analysis",
@@ -179,7 +316,27 @@ async def process_assessment_result(
     }
 
     # Process the assessment data to get the filled mindmap and insights
-    processed_result = process_assessment(data)
+    processed_result = await process_assessment(data)
+
+    # Persist the filled mindmap and insights, keeping the assessment stats current
+    if "error" not in processed_result:
+        result_patch = AssessmentResultPatch(
+            # The segments the result was processed from are folded into the transcript column
+            transcript=userTranscript,
+            mindmap=json.dumps(processed_result["mindmap"]),
+            insights=json.dumps(processed_result["insights"]),
+        )
+        # Only the processed columns are written, so a PATCH that landed during the
+        # LLM calls keeps its other fields; the stats diff from the row as it is now
+        old_result = await assessment_result.get(db, id=result_id)
+        updated_result = await assessment_result.patch(db, id=result_id, obj_in=result_patch)
+        if old_result is None or updated_result is None:
+            raise HTTPException(status_code=404, detail="Assessment result not found")
+        await transcripts.compact(db, pending)
+        await record_result_change(db, old=old_result, new=updated_result)
+        await publish_result("result.processed", updated_result, ok=True)
+    else:
+        await publish_result("result.processed", db_result, ok=False, error=processed_result["error"])
     
     # Combine the original data with the processed results
     result = {
@@ -1,90 +1,188 @@
+import logging
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from supabase._async.client import AsyncClient
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, Response
+from ....storage import StorageBackend
 import httpx
-import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Literal, Optional
 
-from ...dependencies import get_db
-from ....schemas.assessment import Assessment, AssessmentCreate
+from ...dependencies import MINIMAL_RESPONSE, admit_llm, admit_llm_request, client_key, get_db, prefer_minimal
+from ....schemas.assessment import Assessment, AssessmentCreate, AssessmentPatch
 from ....schemas.assessment_result import AssessmentResult
+from ....schemas.assessment_stats import AssessmentStats
+from ....schemas.assignment import AssignmentChange, AssignmentRequest
+from ....schemas.student import Student
 from ....crud.assessment import assessment
 from ....crud.assessment_result import assessment_result
+from ....crud.assignment import assignment
+from ....crud.student import student
 from ....schemas.mindmap import MindmapRequest, MindmapResponse
+from ....services import assignments
+from ....services.assessment_stats import get_stats
+from ....services.class_insights import generate_class_insights
+from ....services.class_summary import summarize_class
+from ....services.json_extract import JSONExtractionError, extract_json
+from ....services.mindmap_tree import MindmapTree
+from ....services.llm_scheduler import Priority, get_scheduler
+from ....services.openrouter import OPENROUTER_URL, get_client, request_headers
+from ....prompts import GENERATE_MINDMAP
 from ....config import settings
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 @router.post("/", response_model=Assessment)
-async def create_assessment(assessment_in: AssessmentCreate, db: AsyncClient = Depends(get_db)):
+async def create_assessment(assessment_in: AssessmentCreate, db: StorageBackend = Depends(get_db)):
     return await assessment.create(db=db, obj_in=assessment_in)
 
 @router.get("/{assessment_id}", response_model=Assessment)
-async def read_assessment(assessment_id: int, db: AsyncClient = Depends(get_db)):
+async def read_assessment(assessment_id: int, db: StorageBackend = Depends(get_db)):
     db_assessment = await assessment.get(db, id=assessment_id)
     if db_assessment is None:
         raise HTTPException(status_code=404, detail="Assessment not found")
     return db_assessment
 
 @router.get("/", response_model=List[Assessment])
-async def read_assessments(db: AsyncClient = Depends(get_db)):
+async def read_assessments(db: StorageBackend = Depends(get_db)):
     assessments = await assessment.get_all(db)
     return assessments
 
 @router.get("/teacher/{teacher_id}", response_model=List[Assessment])
-async def read_teacher_assessments(teacher_id: int, db: AsyncClient = Depends(get_db)):
+async def read_teacher_assessments(teacher_id: int, db: StorageBackend = Depends(get_db)):
     assessments = await assessment.get_by_teacher(db, teacher_id=teacher_id)
     return assessments
 
 @router.get("/student/{student_id}", response_model=List[Assessment])
-async def read_student_assessments(student_id: int, db: AsyncClient = Depends(get_db)):
+async def read_student_assessments(student_id: int, db: StorageBackend = Depends(get_db)):
     """Get all assessments assigned to a specific student"""
     assessments = await assessment.get_by_student(db, student_id=student_id)
     return assessments
 
+@router.patch("/{assessment_id}", response_model=Assessment, responses=MINIMAL_RESPONSE)
+async def patch_assessment(
+    assessment_id: int,
+    assessment_in: AssessmentPatch,
+    minimal: bool = Depends(prefer_minimal),
+    db: StorageBackend = Depends(get_db),
+):
+    """Updates only the fields sent"""
+    db_assessment = await assessment.patch(db, id=assessment_id, obj_in=assessment_in, returning=not minimal)
+    # False with Prefer: return=minimal, as only the count of matched rows comes back
+    if not db_assessment:
+        raise HTTPException(status_code=404, detail="Assessment not found")
+    if minimal:
+        return Response(status_code=204)
+    return db_assessment
+
 @router.delete("/{assessment_id}", response_model=Assessment)
-async def delete_assessment(assessment_id: int, db: AsyncClient = Depends(get_db)):
+async def delete_assessment(assessment_id: int, db: StorageBackend = Depends(get_db)):
+    # Found through the assignment index, instead of scanning every student
+    await assignments.unassign_all(db, assessment_id)
     return await assessment.delete(db, id=assessment_id)
 
+@router.get("/{assessment_id}/students", response_model=List[Student])
+async def read_assessment_students(assessment_id: int, db: StorageBackend = Depends(get_db)):
+    """Get all students assigned a specific assessment"""
+    return await student.get_by_assessment(db, assessment_id=assessment_id)
+
+async def change_assignments(db: StorageBackend, assessment_id: int, request: AssignmentRequest, assign: bool) -> AssignmentChange:
+    if not await assessment.exists(db, id=assessment_id):
+        raise HTTPException(status_code=404, detail="Assessment not found")
+    change = assignments.assign if assign else assignments.unassign
+    try:
+        changed = await change(db, assessment_id, request.student_ids)
+    except assignments.UnknownStudents as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except assignments.ConcurrentChange as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return AssignmentChange(
+        assessment_id=assessment_id,
+        changed=changed,
+        student_ids=await assignment.get_student_ids(db, assessment_id=assessment_id),
+    )
+
+@router.post("/{assessment_id}/assign", response_model=AssignmentChange)
+async def assign_assessment(assessment_id: int, request: AssignmentRequest, db: StorageBackend = Depends(get_db)):
+    """Assign an assessment to many students at once; students who already have it are left as they are"""
+    return await change_assignments(db, assessment_id, request, assign=True)
+
+@router.post("/{assessment_id}/unassign", response_model=AssignmentChange)
+async def unassign_assessment(assessment_id: int, request: AssignmentRequest, db: StorageBackend = Depends(get_db)):
+    """Unassign an assessment from many students at once"""
+    return await change_assignments(db, assessment_id, request, assign=False)
+
+@router.get("/{assessment_id}/stats", response_model=AssessmentStats)
+async def read_assessment_stats(assessment_id: int, db: StorageBackend = Depends(get_db)):
+    """Get result counts and per-node understanding totals for an assessment
+
+    The stats are maintained incrementally as results are created, updated and
+    processed, so this is a single-row lookup.
+    """
+    return await get_stats(db, assessment_id)
+
 @router.get("/{assessment_id}/process")
 async def process_assessment_results(
     assessment_id: int,
-    db: AsyncClient = Depends(get_db)
+    request: Request,
+    mode: Literal["insights", "numbers"] = "insights",
+    db: StorageBackend = Depends(get_db),
 ):
-    """Process mindmaps from all assessment results for a given assessment"""
+    """Process mindmaps from all assessment results for a given assessment
+
+    The mindmaps are aggregated locally into per-topic understanding statistics. In
+    "insights" mode the mindmaps are also summarized with a map-reduce over groups
+    of students (see services.class_insights); "numbers" mode skips the LLM and
+    returns the statistics alone.
+    """
     # First verify the assessment exists
     db_assessment = await assessment.get(db, id=assessment_id)
     if db_assessment is None:
         raise HTTPException(status_code=404, detail="Assessment not found")
     
     try:
-        # Get only the mindmap field from assessment results
-        results = await db.table("AssessmentResult").select("mindmap").eq("assessment_id", assessment_id).execute()
-        if not results.data:
+        # Get only the fields the aggregation needs from assessment results
+        results = await db.select(
+            AssessmentResult.table_name, columns=["student_id", "mindmap"], where={"assessment_id": assessment_id}
+        )
+        if not results:
             raise HTTPException(status_code=404, detail="No assessment results found for this assessment")
         
-        # Filter out None mindmaps and extract just the mindmap strings
-        mindmaps = [result["mindmap"] for result in results.data if result["mindmap"]]
+        # Parse each mindmap once, skipping results that haven't been processed yet
+        results = [
+            (tree, result["student_id"])
+            for tree, result in ((MindmapTree.loads(result["mindmap"]), result) for result in results)
+            if tree is not None
+        ]
         
-        if not mindmaps:
+        if not results:
             raise HTTPException(status_code=404, detail="No mindmaps found in assessment results")
         
-        # Call the edge function with just the mindmaps
-        edge_function_response = await db.functions.invoke(
-            "process-assessments",
-            {"mindmaps": mindmaps}
+        trees = [tree for tree, _ in results]
+        summary = summarize_class(trees, [student_id for _, student_id in results])
+        if mode == "numbers":
+            return {"summary": summary}
+
+        # Only the LLM path goes through admission control
+        await admit_llm(client_key(request))
+
+        # Summarize groups of mindmaps in parallel, then merge the group summaries
+        insights = await generate_class_insights(
+            trees,
+            summary,
+            fan_in=settings.INSIGHTS_FAN_IN,
+            concurrency=settings.INSIGHTS_CONCURRENCY,
         )
         
-        # Return the processed string from the edge function
-        return {"result": edge_function_response["data"]}
+        return {"result": insights, "summary": summary}
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to process mindmaps: {str(e)}"
         )
 
-@router.post("/generate-mindmap", response_model=MindmapResponse)
+@router.post("/generate-mindmap", response_model=MindmapResponse, dependencies=[Depends(admit_llm_request)])
 async def generate_mindmap(mindmap_request: MindmapRequest):
     # Validate input text
     if not mindmap_request.text:
@@ -98,312 +196,8 @@ async def generate_mindmap(mindmap_request: MindmapRequest):
             detail="OpenRouter API key is not configured"
         )
     
-    print(f"Using OpenRouter API key: {API_KEY[:10]}...{API_KEY[-5:]}")
-    
-    # Define the JSON schema for the structured output
-    schema = {
-        "type": "object",
-        "properties": {
-            "topic": {
-                "type": "object",
-                "properties": {
-                    "name": {
-                        "type": "string",
-                        "description": "Main topic name extracted from content"
-                    },
-                    "description": {
-                        "type": "string",
-                        "description": "Brief description of the topic (1-2 sentences)"
-                    },
-                    "subtopics": {
-                        "type": "array",
-                        "description": "Array of 3-5 key subtopics from the content",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "name": {
-                                    "type": "string",
-                                    "description": "Subtopic name"
-                                },
-                                "description": {
-                                    "type": "string",
-                                    "description": "Brief description of the subtopic (1-2 sentences)"
-                                },
-                                "subtopics": {
-                                    "type": "array",
-                                    "description": "Optional nested subtopics (maximum 2-3 per subtopic)",
-                                    "items": {
-                                        "type": "object",
-                                        "properties": {
-                                            "name": {
-                                                "type": "string",
-                                                "description": "Sub-subtopic name"
-                                            },
-                                            "description": {
-                                                "type": "string",
-                                                "description": "Brief description of the sub-subtopic (1 sentence)"
-                                            },
-                                            "subtopics": {
-                                                "type": "array",
-                                                "description": "Empty array as we only support 2 levels of nesting",
-                                                "items": {
-                                                    "type": "object",
-                                                    "properties": {},
-                                                    "additionalProperties": False
-                                                }
-                                            }
-                                        },
-                                        "required": ["name", "description", "subtopics"],
-                                        "additionalProperties": False
-                                    }
-                                }
-                            },
-                            "required": ["name", "description", "subtopics"],
-                            "additionalProperties": False
-                        }
-                    }
-                },
-                "required": ["name", "description", "subtopics"],
-                "additionalProperties": False
-            }
-        },
-        "required": ["topic"],
-        "additionalProperties": False
-    }
-    
-    # Prepare the request to OpenRouter API
-    payload = {
-        "model": "openai/gpt-4o",  # or any model that supports structured outputs
-        "messages": [
-            {
-                "role": "system",
-                "content": """
-    Generate a mindmap from this educational content. The user will give you title,
-    description, and content. You will break apart info in the input overview into subtopics 
-    and sub-subtopics.
-
-    ALSO: If the user provides you syllabus text or policies, don't include that in the mindmap.
-    
-    IN SUM:
-    - Identify the main topic
-    - Extract 3-5 key subtopics
-    - Generate concise descriptions
-    - Create up to 2 levels of nesting
-    
-    Here's an example mindmap that you should follow:
-{
-  "topic": {
-    "name": "",
-    "description": "",
-    "assessmentCriteria": {
-      "excellentUnderstanding": [
-        "",
-        "",
-        ""
-      ],
-      "adequateUnderstanding": [
-        "",
-        ""
-      ],
-      "misconceptions": [
-        "",
-        "",
-        ""
-      ],
-      "tutorGuidance": ""
-    },
-    "subtopics": [
-      {
-        "name": "",
-        "description": "",
-        "assessmentCriteria": {
-          "excellentUnderstanding": [
-            "",
-            "",
-            ""
-          ],
-          "adequateUnderstanding": [
-            "",
-            ""
-          ],
-          "misconceptions": [
-            "",
-            "",
-            ""
-          ]
-        },
-        "subtopics": [
-          {
-            "name": "",
-            "description": ""
-          },
-          {
-            "name": "",
-            "description": ""
-          },
-          {
-            "name": "",
-            "description": ""
-          }
-        ]
-      },
-      {
-        "name": "",
-        "description": "",
-        "assessmentCriteria": {
-          "excellentUnderstanding": [
-            "",
-            "",
-            ""
-          ],
-          "adequateUnderstanding": [
-            "",
-            ""
-          ],
-          "misconceptions": [
-            "",
-            "",
-            ""
-          ]
-        },
-        "subtopics": [
-          {
-            "name": "",
-            "description": ""
-          },
-          {
-            "name": "",
-            "description": ""
-          },
-          {
-            "name": "",
-            "description": ""
-          }
-        ]
-      },
-      {
-        "name": "",
-        "description": "",
-        "assessmentCriteria": {
-          "excellentUnderstanding": [
-            "",
-            "",
-            ""
-          ],
-          "adequateUnderstanding": [
-            "",
-            ""
-          ],
-          "misconceptions": [
-            "",
-            "",
-            ""
-          ]
-        },
-        "subtopics": [
-          {
-            "name": "",
-            "description": ""
-          },
-          {
-            "name": "",
-            "description": ""
-          },
-          {
-            "name": "",
-            "description": ""
-          }
-        ]
-      },
-      {
-        "name": "",
-        "description": "",
-        "assessmentCriteria": {
-          "excellentUnderstanding": [
-            "",
-            "",
-            ""
-          ],
-          "adequateUnderstanding": [
-            "",
-            ""
-          ],
-          "misconceptions": [
-            "",
-            "",
-            ""
-          ]
-        },
-        "subtopics": [
-          {
-            "name": "",
-            "description": ""
-          },
-          {
-            "name": "",
-            "description": ""
-          },
-          {
-            "name": "",
-            "description": ""
-          }
-        ]
-      },
-      {
-        "name": "",
-        "description": "",
-        "assessmentCriteria": {
-          "excellentUnderstanding": [
-            "",
-            "",
-            ""
-          ],
-          "adequateUnderstanding": [
-            "",
-            ""
-          ],
-          "misconceptions": [
-            "",
-            "",
-            ""
-          ]
-        },
-        "subtopics": [
-          {
-            "name": "",
-            "description": ""
-          },
-          {
-            "name": "",
-            "description": ""
-          },
-          {
-            "name": "",
-            "description": ""
-          }
-        ]
-      }
-    ]
-  }
-}
-"""
-            },
-            {
-                "role": "user",
-                "content": (
-                    f"Content: {mindmap_request.text}"
-                )
-            }
-        ],
-        "response_format": {
-            "type": "json_schema",
-            "json_schema": {
-                "name": "mindmap",
-                "strict": True,
-                "schema": schema
-            }
-        }
-    }
+    # The prompt, schema and model are pre-serialized in the prompt registry
+    payload = GENERATE_MINDMAP.payload({"text": mindmap_request.text})
     
     # Make the request to OpenRouter API with automatic retrying
     max_retries = 3
@@ -411,96 +205,88 @@ async def generate_mindmap(mindmap_request: MindmapRequest):
     
     while retry_count < max_retries:
         try:
-            headers = {
-                "Authorization": f"Bearer {API_KEY}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://alterview.vercel.app",  # Add a referer header
-                "X-Title": "Alterview Education App"  # Add a title header
-            }
+            logger.debug("Requesting mindmap from OpenRouter", extra={"attempt": retry_count + 1})
             
-            print(f"Making request to OpenRouter API (attempt {retry_count + 1}/{max_retries})")
+            # Shared client, so connections to OpenRouter are reused across requests; a
+            # teacher is waiting, so the call goes ahead of queued background work
+            async with get_scheduler().slot(Priority.INTERACTIVE):
+                response = await get_client().post(
+                    OPENROUTER_URL,
+                    headers=request_headers(),
+                    content=payload
+                )
             
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    "https://openrouter.ai/api/v1/chat/completions",
-                    headers=headers,
-                    json=payload
+            # Check if the request was successful
+            if response.status_code != 200:
+                error_detail = f"OpenRouter API error: {response.text}"
+                logger.warning(
+                    "OpenRouter API error",
+                    extra={"status_code": response.status_code, "body": response.text, "attempt": retry_count + 1},
                 )
                 
-                # Check if the request was successful
-                if response.status_code != 200:
-                    error_detail = f"OpenRouter API error: {response.text}"
-                    print(f"Error from OpenRouter API: {error_detail}")
-                    
-                    if response.status_code == 429:
-                        # Rate limiting - retry with exponential backoff
-                        retry_count += 1
-                        if retry_count < max_retries:
-                            import asyncio
-                            backoff_seconds = 2 ** retry_count
-                            print(f"Rate limit exceeded. Retrying in {backoff_seconds} seconds...")
-                            await asyncio.sleep(backoff_seconds)
-                            continue
-                        else:
-                            raise HTTPException(
-                                status_code=429, 
-                                detail="OpenRouter API rate limit exceeded after multiple retries. Please try again later."
-                            )
-                    else:
-                        # For other errors, retry once
-                        retry_count += 1
-                        if retry_count < max_retries:
-                            print(f"Retrying after error... (attempt {retry_count + 1}/{max_retries})")
-                            continue
-                        else:
-                            raise HTTPException(
-                                status_code=500, 
-                                detail=error_detail
-                            )
-                
-                # Parse the response
-                result = response.json()
-                print(f"Received response from OpenRouter API: {result}")
-                
-                # Extract the mindmap from the response
-                try:
-                    content = result["choices"][0]["message"]["content"]
-                    
-                    # Parse the JSON content
-                    if isinstance(content, str):
-                        try:
-                            mindmap_data = json.loads(content)
-                        except json.JSONDecodeError:
-                            print("Response content is not valid JSON, using as-is")
-                            mindmap_data = content
+                if response.status_code == 429:
+                    # Rate limiting - retry with exponential backoff
+                    retry_count += 1
+                    if retry_count < max_retries:
+                        import asyncio
+                        backoff_seconds = 2 ** retry_count
+                        logger.info("Rate limited by OpenRouter, retrying", extra={"backoff_seconds": backoff_seconds})
+                        await asyncio.sleep(backoff_seconds)
+                        continue
                     else:
-                        mindmap_data = content
-                    
-                    # Validate response matches our expected schema
-                    return MindmapResponse(**mindmap_data)
-                    
-                except (KeyError, json.JSONDecodeError) as e:
-                    # Retry on malformed response
+                        raise HTTPException(
+                            status_code=429, 
+                            detail="OpenRouter API rate limit exceeded after multiple retries. Please try again later."
+                        )
+                else:
+                    # For other errors, retry once
                     retry_count += 1
                     if retry_count < max_retries:
-                        print(f"Malformed response. Retrying... (attempt {retry_count + 1}/{max_retries})")
                         continue
                     else:
                         raise HTTPException(
                             status_code=500, 
-                            detail=f"Failed to parse OpenRouter API response after {max_retries} attempts: {str(e)}"
+                            detail=error_detail
                         )
+            
+            # Parse the response
+            result = response.json()
+            logger.debug("Received mindmap from OpenRouter", extra={"response": result})
+            
+            # Extract the mindmap from the response
+            try:
+                content = result["choices"][0]["message"]["content"]
+                
+                # Parse the JSON content, tolerating prose, fences and truncation
+                if isinstance(content, str):
+                    mindmap_data = extract_json(content, expect=dict)
+                else:
+                    mindmap_data = content
+                
+                # Validate response matches our expected schema
+                return MindmapResponse(**mindmap_data)
+                
+            except (KeyError, JSONExtractionError) as e:
+                # Retry on malformed response
+                retry_count += 1
+                if retry_count < max_retries:
+                    logger.warning("Malformed mindmap response, retrying", extra={"error": str(e), "attempt": retry_count})
+                    continue
+                else:
+                    raise HTTPException(
+                        status_code=500, 
+                        detail=f"Failed to parse OpenRouter API response after {max_retries} attempts: {str(e)}"
+                    )
+            
+            # If we got here, we succeeded
+            break
                 
-                # If we got here, we succeeded
-                break
-                    
         except httpx.RequestError as e:
             # Network-related errors
-            print(f"Error making request to OpenRouter API: {str(e)}")
+            logger.warning("Error making request to OpenRouter API", extra={"error": str(e), "attempt": retry_count + 1})
             retry_count += 1
             if retry_count < max_retries:
                 import asyncio
-                print(f"Network error. Retrying in 2 seconds... (attempt {retry_count + 1}/{max_retries})")
                 await asyncio.sleep(2)
                 continue
             else:
@@ -0,0 +1,44 @@
+from typing import List, Optional
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from ....services.events import event_stream, get_bus
+from ....config import settings
+
+router = APIRouter()
+
+@router.get("/", response_class=StreamingResponse)
+async def subscribe_events(
+    teacher_id: List[int] = Query([]),
+    assessment_id: List[int] = Query([]),
+    result_id: List[int] = Query([]),
+    last_event_id: Optional[str] = Header(None),
+):
+    """Streams Server-Sent Events about the results of the given teachers, assessments and results
+
+    Events: result.created, result.updated, transcript.appended (with the new
+    segments) and result.processed (with "ok", and "error" on failure). A
+    "lagged" event reports events dropped because the client read too slowly.
+    Reconnect with Last-Event-ID to receive the events missed in between; if
+    they can't be known (e.g. the server restarted), a "reset" event is sent
+    first, and the client should refetch what it shows.
+    """
+    topics = (
+        [("teacher", id) for id in teacher_id]
+        + [("assessment", id) for id in assessment_id]
+        + [("result", id) for id in result_id]
+    )
+    if not topics:
+        raise HTTPException(status_code=422, detail="Subscribe to at least one teacher_id, assessment_id or result_id")
+    return StreamingResponse(
+        event_stream(
+            get_bus(),
+            topics,
+            heartbeat=settings.SSE_HEARTBEAT,
+            max_queue=settings.SSE_QUEUE_SIZE,
+            last_event_id=last_event_id,
+        ),
+        media_type="text/event-stream",
+        # Delivered as they happen: not cached, nor buffered by a reverse proxy
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
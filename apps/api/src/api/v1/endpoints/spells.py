@@ -37,7 +37,8 @@ async def search_spells(
     max_results: Optional[int] = 10,
 ) -> SpellSearchResults:
     """
-    Search for spells based on a keyword and return the top `max_results` items.
+    Search for spells based on a keyword and return the top `max_results` items, best match first.
+    Partial words and small typos match too, so this can back a typeahead.
 
     **Args:**
     - search_on (str, optional): The field to perform the search on. Defaults to "name".
@@ -52,7 +53,7 @@ async def search_spells(
         return SpellSearchResults(results=results)
 
     results = await spell.search_all(
-        db, field=search_on, search_value=keyword, max_results=max_results
+        db, field=search_on, search_value=str(keyword), max_results=max_results
     )
 
     if not results:
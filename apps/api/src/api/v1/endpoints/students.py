@@ -1,25 +1,50 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from supabase._async.client import AsyncClient
+from fastapi import APIRouter, Depends, HTTPException, Response
+from ....storage import StorageBackend
 
-from ...dependencies import get_db
-from ....schemas.student import Student, StudentCreate
+from ...dependencies import MINIMAL_RESPONSE, get_db, prefer_minimal
+from ....schemas.student import Student, StudentCreate, StudentPatch
 from ....crud.student import student
+from ....services import assignments
 
 router = APIRouter()
 
 @router.post("/", response_model=Student)
-async def create_student(student_in: StudentCreate, db: AsyncClient = Depends(get_db)):
-    return await student.create(db=db, obj_in=student_in)
+async def create_student(student_in: StudentCreate, db: StorageBackend = Depends(get_db)):
+    try:
+        return await assignments.create_student(db, obj_in=student_in)
+    except assignments.UnknownAssessments as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 @router.get("/{student_id}", response_model=Student)
-async def read_student(student_id: int, db: AsyncClient = Depends(get_db)):
+async def read_student(student_id: int, db: StorageBackend = Depends(get_db)):
     db_student = await student.get(db, id=student_id)
     if db_student is None:
         raise HTTPException(status_code=404, detail="Student not found")
     return db_student
 
 @router.get("/", response_model=List[Student])
-async def read_students(db: AsyncClient = Depends(get_db)):
+async def read_students(db: StorageBackend = Depends(get_db)):
     students = await student.get_all(db)
-    return students 
\ No newline at end of file
+    return students 
+
+@router.patch("/{student_id}", response_model=Student, responses=MINIMAL_RESPONSE)
+async def patch_student(
+    student_id: int,
+    student_in: StudentPatch,
+    minimal: bool = Depends(prefer_minimal),
+    db: StorageBackend = Depends(get_db),
+):
+    """Updates only the fields sent, and the student's assignments with assessment_ids"""
+    try:
+        db_student = await assignments.patch_student(db, id=student_id, obj_in=student_in, returning=not minimal)
+    except assignments.UnknownAssessments as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except assignments.ConcurrentChange as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    # False with Prefer: return=minimal, as only the count of matched rows comes back
+    if not db_student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    if minimal:
+        return Response(status_code=204)
+    return db_student
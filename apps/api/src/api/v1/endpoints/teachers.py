@@ -1,25 +1,56 @@
+import asyncio
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from supabase._async.client import AsyncClient
+from fastapi import APIRouter, Depends, HTTPException, Response
+from ....storage import StorageBackend
 
-from ...dependencies import get_db
-from ....schemas.teacher import Teacher, TeacherCreate
+from ...dependencies import MINIMAL_RESPONSE, get_db, prefer_minimal
+from ....schemas.dashboard import TeacherDashboard
+from ....schemas.teacher import Teacher, TeacherCreate, TeacherPatch
 from ....crud.teacher import teacher
+from ....services.dashboard import teacher_dashboard
 
 router = APIRouter()
 
 @router.post("/", response_model=Teacher)
-async def create_teacher(teacher_in: TeacherCreate, db: AsyncClient = Depends(get_db)):
+async def create_teacher(teacher_in: TeacherCreate, db: StorageBackend = Depends(get_db)):
     return await teacher.create(db=db, obj_in=teacher_in)
 
 @router.get("/{teacher_id}", response_model=Teacher)
-async def read_teacher(teacher_id: int, db: AsyncClient = Depends(get_db)):
+async def read_teacher(teacher_id: int, db: StorageBackend = Depends(get_db)):
     db_teacher = await teacher.get(db, id=teacher_id)
     if db_teacher is None:
         raise HTTPException(status_code=404, detail="Teacher not found")
     return db_teacher
 
 @router.get("/", response_model=List[Teacher])
-async def read_teachers(db: AsyncClient = Depends(get_db)):
+async def read_teachers(db: StorageBackend = Depends(get_db)):
     teachers = await teacher.get_all(db)
-    return teachers 
\ No newline at end of file
+    return teachers 
+
+@router.patch("/{teacher_id}", response_model=Teacher, responses=MINIMAL_RESPONSE)
+async def patch_teacher(
+    teacher_id: int,
+    teacher_in: TeacherPatch,
+    minimal: bool = Depends(prefer_minimal),
+    db: StorageBackend = Depends(get_db),
+):
+    """Updates only the fields sent"""
+    db_teacher = await teacher.patch(db, id=teacher_id, obj_in=teacher_in, returning=not minimal)
+    # False with Prefer: return=minimal, as only the count of matched rows comes back
+    if not db_teacher:
+        raise HTTPException(status_code=404, detail="Teacher not found")
+    if minimal:
+        return Response(status_code=204)
+    return db_teacher
+
+@router.get("/{teacher_id}/dashboard", response_model=TeacherDashboard)
+async def read_teacher_dashboard(teacher_id: int, db: StorageBackend = Depends(get_db)):
+    """Get each of the teacher's assessments with result counts, average understanding and last activity
+
+    Computed server side from the incrementally maintained stats in a fixed number
+    of queries, instead of joining assessments, results and students client side.
+    """
+    db_teacher, dashboard = await asyncio.gather(teacher.get(db, id=teacher_id), teacher_dashboard(db, teacher_id))
+    if db_teacher is None:
+        raise HTTPException(status_code=404, detail="Teacher not found")
+    return dashboard
@@ -22,8 +22,77 @@ class Settings(BaseSettings):
     DB_API_KEY: str = os.getenv("DB_API_KEY")
     DB_EMAIL: str = os.getenv("DB_EMAIL")
     DB_PASSWORD: str = os.getenv("DB_PASSWORD")
+    # "supabase" or "sqlite", an embedded database for running locally without a Supabase project
+    DB_BACKEND: str = os.getenv("DB_BACKEND", "supabase")
+    SQLITE_PATH: str = os.getenv("SQLITE_PATH", ":memory:")
     OPENROUTER_API_KEY: str = os.getenv("OPENROUTER_API_KEY")
+    # Point at a local stand-in (tests/fakes/openrouter.py) for offline runs and load tests
+    OPENROUTER_BASE_URL: str = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
     API_KEY: str = os.getenv("API_KEY")
+    # Class insights map-reduce: students per group / summaries per merge, and LLM calls in flight
+    INSIGHTS_FAN_IN: int = int(os.getenv("INSIGHTS_FAN_IN", 10))
+    INSIGHTS_CONCURRENCY: int = int(os.getenv("INSIGHTS_CONCURRENCY", 4))
+    # Admission control for LLM-backed endpoints: requests/s and burst, globally and per client (IP address),
+    # plus how many requests may wait for a slot and for how long (seconds) before getting a 429
+    LLM_ADMISSION_RATE: float = float(os.getenv("LLM_ADMISSION_RATE", 5))
+    LLM_ADMISSION_BURST: float = float(os.getenv("LLM_ADMISSION_BURST", 10))
+    LLM_ADMISSION_KEY_RATE: float = float(os.getenv("LLM_ADMISSION_KEY_RATE", 2))
+    LLM_ADMISSION_KEY_BURST: float = float(os.getenv("LLM_ADMISSION_KEY_BURST", 5))
+    LLM_ADMISSION_QUEUE_SIZE: int = int(os.getenv("LLM_ADMISSION_QUEUE_SIZE", 50))
+    LLM_ADMISSION_MAX_WAIT: float = float(os.getenv("LLM_ADMISSION_MAX_WAIT", 10))
+    # LLM scheduler: calls in flight per priority class, and the provider-wide rate budget (calls/s, 0 = unlimited)
+    LLM_INTERACTIVE_CONCURRENCY: int = int(os.getenv("LLM_INTERACTIVE_CONCURRENCY", 8))
+    LLM_BATCH_CONCURRENCY: int = int(os.getenv("LLM_BATCH_CONCURRENCY", 4))
+    LLM_RATE_LIMIT: float = float(os.getenv("LLM_RATE_LIMIT", 10))
+    LLM_RATE_BURST: float = float(os.getenv("LLM_RATE_BURST", 10))
+    # Result transcripts: "plain", "compress" (values of LARGE_TEXT_MIN_SIZE bytes or more are stored zlib
+    # compressed) or "offload" (and compressed values of LARGE_TEXT_OFFLOAD_SIZE bytes or more go to object
+    # storage). Rows already packed are read back whatever the setting. Packed values are only readable
+    # through the API, so columns the web app reads or writes through Supabase (assessment prompts and
+    # templates, result mindmaps) are never packed.
+    LARGE_TEXT_STORAGE: str = os.getenv("LARGE_TEXT_STORAGE", "plain")
+    LARGE_TEXT_MIN_SIZE: int = int(os.getenv("LARGE_TEXT_MIN_SIZE", 1024))
+    LARGE_TEXT_OFFLOAD_SIZE: int = int(os.getenv("LARGE_TEXT_OFFLOAD_SIZE", 65536))
+    # Object storage for offloaded text: "supabase" (a Storage bucket) or "local" (files under BLOB_DIR)
+    BLOB_BACKEND: str = os.getenv("BLOB_BACKEND", "supabase")
+    BLOB_BUCKET: str = os.getenv("BLOB_BUCKET", "large-text")
+    BLOB_DIR: str = os.getenv("BLOB_DIR", "blobs")
+    # Event subscriptions (GET /events): seconds between heartbeats on an idle stream, events queued per
+    # connection before the oldest are dropped, and recent events kept for clients resuming with Last-Event-ID
+    SSE_HEARTBEAT: float = float(os.getenv("SSE_HEARTBEAT", 15))
+    SSE_QUEUE_SIZE: int = int(os.getenv("SSE_QUEUE_SIZE", 100))
+    SSE_REPLAY_SIZE: int = int(os.getenv("SSE_REPLAY_SIZE", 1000))
+    # Results fetched per query by the streaming exports
+    EXPORT_PAGE_SIZE: int = int(os.getenv("EXPORT_PAGE_SIZE", 500))
+    # Seconds before the in-memory spell search index is rebuilt from the table
+    SPELL_INDEX_TTL: float = float(os.getenv("SPELL_INDEX_TTL", 300))
+    # Cache (src/services/cache.py): entries and bytes kept per worker, seconds a worker serves its copy of data
+    # that can change, and the Redis-protocol server shared by the workers (redis://[:password@]host:port/db, off if empty),
+    # which also carries the events of GET /events between them (src/services/events.py)
+    CACHE_LOCAL_SIZE: int = int(os.getenv("CACHE_LOCAL_SIZE", 10000))
+    CACHE_LOCAL_MAX_BYTES: int = int(os.getenv("CACHE_LOCAL_MAX_BYTES", 64 * 1024 * 1024))
+    CACHE_LOCAL_TTL: float = float(os.getenv("CACHE_LOCAL_TTL", 5))
+    CACHE_REDIS_URL: str = os.getenv("CACHE_REDIS_URL", "")
+    CACHE_REDIS_TIMEOUT: float = float(os.getenv("CACHE_REDIS_TIMEOUT", 0.5))
+    # Seconds teachers, students and assessments fetched by id, and LLM results, are cached (0 to not cache them).
+    # Neither is cached by default: lookups by id could serve a row changed by another worker (or the web app, which
+    # writes to Supabase directly) until it expires, and an identical LLM request would get the same answer instead
+    # of a new sample
+    CACHE_CRUD_TTL: float = float(os.getenv("CACHE_CRUD_TTL", 0))
+    LLM_CACHE_TTL: float = float(os.getenv("LLM_CACHE_TTL", 0))
+    # Idempotency-Key: how long (seconds) a stored response is replayed, and how many are kept
+    IDEMPOTENCY_TTL: float = float(os.getenv("IDEMPOTENCY_TTL", 86400))
+    IDEMPOTENCY_MAX_KEYS: int = int(os.getenv("IDEMPOTENCY_MAX_KEYS", 10000))
+    # Request profiling (src/middleware/profiling.py), off unless a token or sample rate is set
+    PROFILE_TOKEN: str = os.getenv("PROFILE_TOKEN", "")
+    PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "profiles")
+    # Logging (src/log.py): level, "json" or "text", max characters per field, "category=rate,..."
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+    LOG_MAX_FIELD_LENGTH: int = int(os.getenv("LOG_MAX_FIELD_LENGTH", 1000))
+    LOG_SAMPLE_RATES: str = os.getenv("LOG_SAMPLE_RATES", "")
     model_config = SettingsConfigDict(env_file=".env")
     API_VERSION: str = "/api/v1"
     ROOT: str = ROOT_PATH
@@ -3,4 +3,6 @@ from .assessment import assessment
 from .assessment_result import assessment_result
 from .student import student
 from .teacher import teacher
-
+from .assessment_stats import assessment_stats
+from .transcript_segment import transcript_segment
+from .assignment import assignment
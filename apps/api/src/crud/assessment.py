@@ -1,26 +1,46 @@
-from typing import Optional
+from typing import Optional, Union
 
 from fastapi import HTTPException
-from supabase._async.client import AsyncClient
+from ..storage import StorageBackend
 
+from .assignment import assignment
 from .base import CRUDBase
-from ..schemas.assessment import Assessment, AssessmentCreate, AssessmentUpdate
+from ..schemas.assessment import Assessment, AssessmentCreate, AssessmentPatch, AssessmentUpdate
 
 
 class CRUDAssessment(CRUDBase[Assessment, AssessmentCreate, AssessmentUpdate]):
-    async def get(self, db: AsyncClient, *, id: int) -> Optional[Assessment]:
+    async def get(self, db: StorageBackend, *, id: int) -> Optional[Assessment]:
         try:
-            response = await db.table(self.model.table_name).select("*").eq("id", id).single().execute()
-            if not response.data:
-                return None
-            return self.model(**response.data)
+            return await super().get(db, id=id)
         except Exception as e:
             raise HTTPException(
                 status_code=404,
                 detail=f"{e.code}: Assessment not found. {e.details}",
             )
 
-    async def get_all(self, db: AsyncClient) -> list[Assessment]:
+    async def exists(self, db: StorageBackend, *, id: int) -> bool:
+        """checks for the assessment without reading its (possibly large) columns"""
+        try:
+            return bool(await db.select(self.model.table_name, columns=["id"], where={"id": id}))
+        except Exception as e:
+            raise HTTPException(
+                status_code=404,
+                detail=f"{e.code}: Assessment not found. {e.details}",
+            )
+
+    async def existing_ids(self, db: StorageBackend, *, ids: list[int]) -> set[int]:
+        """which of the ids are assessments, without reading their (possibly large) columns"""
+        if not ids:
+            return set()
+        try:
+            return {item["id"] for item in await db.select(self.model.table_name, columns=["id"], where={"id": ids})}
+        except Exception as e:
+            raise HTTPException(
+                status_code=404,
+                detail=f"{e.code}: Failed to look up assessments. {e.details}",
+            )
+
+    async def get_all(self, db: StorageBackend) -> list[Assessment]:
         try:
             return await super().get_all(db)
         except Exception as e:
@@ -29,7 +49,7 @@ class CRUDAssessment(CRUDBase[Assessment, AssessmentCreate, AssessmentUpdate]):
                 detail=f"An error occurred while fetching assessments. {e}",
             )
 
-    async def create(self, db: AsyncClient, *, obj_in: AssessmentCreate) -> Assessment:
+    async def create(self, db: StorageBackend, *, obj_in: AssessmentCreate) -> Assessment:
         try:
             return await super().create(db, obj_in=obj_in)
         except Exception as e:
@@ -38,7 +58,7 @@ class CRUDAssessment(CRUDBase[Assessment, AssessmentCreate, AssessmentUpdate]):
                 detail=f"{e.code}: Failed to create assessment. {e.details}",
             )
 
-    async def delete(self, db: AsyncClient, *, id: int) -> Assessment:
+    async def delete(self, db: StorageBackend, *, id: int) -> Assessment:
         try:
             return await super().delete(db, id=str(id))
         except Exception as e:
@@ -47,30 +67,29 @@ class CRUDAssessment(CRUDBase[Assessment, AssessmentCreate, AssessmentUpdate]):
                 detail=f"{e.code}: Failed to delete assessment. {e.details}",
             )
 
-    async def get_by_teacher(self, db: AsyncClient, teacher_id: int) -> list[Assessment]:
+    async def get_by_teacher(self, db: StorageBackend, teacher_id: int) -> list[Assessment]:
         try:
-            response = await db.table(self.model.table_name).select("*").eq("teacher_id", teacher_id).execute()
-            return [self.model(**record) for record in response.data]
+            records = await db.select(self.model.table_name, where={"teacher_id": teacher_id})
+            return [self.model(**record) for record in records]
         except Exception as e:
             raise HTTPException(
                 status_code=404,
                 detail=f"An error occurred while fetching teacher's assessments. {e}",
             )
 
-    async def get_by_student(self, db: AsyncClient, student_id: int) -> list[Assessment]:
+    async def get_by_student(self, db: StorageBackend, student_id: int) -> list[Assessment]:
         try:
-            # First get the student to get their assessment_ids
-            student_response = await db.table("Student").select("assessment_ids").eq("id", student_id).execute()
-            if not student_response.data:
-                raise HTTPException(status_code=404, detail="Student not found")
-            
-            assessment_ids = student_response.data[0]["assessment_ids"]
+            # First get the student's assessment ids from the assignment index
+            assessment_ids = await assignment.get_assessment_ids(db, student_id=student_id)
             if not assessment_ids:
+                # Only tells an unknown student from one without assessments
+                if not await db.select("Student", columns=["id"], where={"id": student_id}):
+                    raise HTTPException(status_code=404, detail="Student not found")
                 return []
             
             # Then get all assessments with those IDs
-            response = await db.table(self.model.table_name).select("*").in_("id", assessment_ids).execute()
-            return [self.model(**record) for record in response.data]
+            records = await db.select(self.model.table_name, where={"id": assessment_ids})
+            return [self.model(**record) for record in records]
         except HTTPException as he:
             raise he
         except Exception as e:
@@ -79,5 +98,16 @@ class CRUDAssessment(CRUDBase[Assessment, AssessmentCreate, AssessmentUpdate]):
                 detail=f"An error occurred while fetching student's assessments. {e}",
             )
 
+    async def patch(
+        self, db: StorageBackend, *, id: int, obj_in: AssessmentPatch, returning: bool = True
+    ) -> Union[Assessment, bool, None]:
+        try:
+            return await super().patch(db, id=id, obj_in=obj_in, returning=returning)
+        except Exception as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{e.code}: Failed to update assessment. {e.details}",
+            )
+
 
-assessment = CRUDAssessment(Assessment) 
\ No newline at end of file
+assessment = CRUDAssessment(Assessment, cached=True) 
\ No newline at end of file
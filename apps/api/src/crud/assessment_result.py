@@ -1,14 +1,14 @@
-from typing import Optional
+from typing import Optional, Sequence, Union
 
 from fastapi import HTTPException
-from supabase._async.client import AsyncClient
+from ..storage import StorageBackend
 
 from .base import CRUDBase
-from ..schemas.assessment_result import AssessmentResult, AssessmentResultCreate, AssessmentResultUpdate
+from ..schemas.assessment_result import AssessmentResult, AssessmentResultCreate, AssessmentResultPatch, AssessmentResultUpdate
 
 
 class CRUDAssessmentResult(CRUDBase[AssessmentResult, AssessmentResultCreate, AssessmentResultUpdate]):
-    async def get(self, db: AsyncClient, *, id: int) -> Optional[AssessmentResult]:
+    async def get(self, db: StorageBackend, *, id: int) -> Optional[AssessmentResult]:
         try:
             return await super().get(db, id=str(id))
         except Exception as e:
@@ -17,15 +17,11 @@ class CRUDAssessmentResult(CRUDBase[AssessmentResult, AssessmentResultCreate, As
                 detail=f"{e.code}: Assessment result not found. {e.details}",
             )
 
-    async def get_by_student(self, db: AsyncClient, *, student_id: int) -> list[AssessmentResult]:
+    async def get_by_student(
+        self, db: StorageBackend, *, student_id: int, columns: Optional[Sequence[str]] = None
+    ) -> list[AssessmentResult]:
         try:
-            data, count = (
-                await db.table(self.model.table_name)
-                .select("*")
-                .eq("student_id", student_id)
-                .execute()
-            )
-            _, got = data
+            got = await db.select(self.model.table_name, columns=columns, where={"student_id": student_id})
             return [self.model(**item) for item in got]
         except Exception as e:
             raise HTTPException(
@@ -33,15 +29,11 @@ class CRUDAssessmentResult(CRUDBase[AssessmentResult, AssessmentResultCreate, As
                 detail=f"An error occurred while fetching student results. {e}",
             )
 
-    async def get_by_teacher(self, db: AsyncClient, *, teacher_id: int) -> list[AssessmentResult]:
+    async def get_by_teacher(
+        self, db: StorageBackend, *, teacher_id: int, columns: Optional[Sequence[str]] = None
+    ) -> list[AssessmentResult]:
         try:
-            data, count = (
-                await db.table(self.model.table_name)
-                .select("*")
-                .eq("teacher_id", teacher_id)
-                .execute()
-            )
-            _, got = data
+            got = await db.select(self.model.table_name, columns=columns, where={"teacher_id": teacher_id})
             return [self.model(**item) for item in got]
         except Exception as e:
             raise HTTPException(
@@ -49,7 +41,7 @@ class CRUDAssessmentResult(CRUDBase[AssessmentResult, AssessmentResultCreate, As
                 detail=f"An error occurred while fetching teacher results. {e}",
             )
 
-    async def create(self, db: AsyncClient, *, obj_in: AssessmentResultCreate) -> AssessmentResult:
+    async def create(self, db: StorageBackend, *, obj_in: AssessmentResultCreate) -> AssessmentResult:
         try:
             return await super().create(db, obj_in=obj_in)
         except Exception as e:
@@ -58,7 +50,7 @@ class CRUDAssessmentResult(CRUDBase[AssessmentResult, AssessmentResultCreate, As
                 detail=f"{e.code}: Failed to create assessment result. {e.details}",
             )
 
-    async def update(self, db: AsyncClient, *, obj_in: AssessmentResultUpdate) -> AssessmentResult:
+    async def update(self, db: StorageBackend, *, obj_in: AssessmentResultUpdate) -> AssessmentResult:
         try:
             return await super().update(db, obj_in=obj_in)
         except Exception as e:
@@ -67,5 +59,16 @@ class CRUDAssessmentResult(CRUDBase[AssessmentResult, AssessmentResultCreate, As
                 detail=f"{e.code}: Failed to update assessment result. {e.details}",
             )
 
+    async def patch(
+        self, db: StorageBackend, *, id: int, obj_in: AssessmentResultPatch, returning: bool = True
+    ) -> Union[AssessmentResult, bool, None]:
+        try:
+            return await super().patch(db, id=id, obj_in=obj_in, returning=returning)
+        except Exception as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{e.code}: Failed to update assessment result. {e.details}",
+            )
+
 
 assessment_result = CRUDAssessmentResult(AssessmentResult) 
\ No newline at end of file
@@ -0,0 +1,76 @@
+from typing import Optional
+
+from fastapi import HTTPException
+from ..storage import StorageBackend, StorageError
+
+from .base import CRUDBase
+from ..schemas.assessment_stats import AssessmentStats, AssessmentStatsCreate, AssessmentStatsUpdate
+
+
+class CRUDAssessmentStats(CRUDBase[AssessmentStats, AssessmentStatsCreate, AssessmentStatsUpdate]):
+    async def get_by_assessment(self, db: StorageBackend, *, assessment_id: int) -> Optional[AssessmentStats]:
+        try:
+            got = await db.select(self.model.table_name, where={"assessment_id": assessment_id})
+            return self.model(**got[0]) if got else None
+        except Exception as e:
+            raise HTTPException(
+                status_code=404,
+                detail=f"An error occurred while fetching assessment stats. {e}",
+            )
+
+    async def create(self, db: StorageBackend, *, obj_in: AssessmentStatsCreate) -> AssessmentStats:
+        try:
+            return await super().create(db, obj_in=obj_in)
+        except Exception as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{e.code}: Failed to create assessment stats. {e.details}",
+            )
+
+    async def create_if_missing(self, db: StorageBackend, *, obj_in: AssessmentStatsCreate) -> Optional[AssessmentStats]:
+        """create, or None if the assessment already has stats (another request made them first)"""
+        try:
+            return await super().create(db, obj_in=obj_in)
+        except StorageError as e:
+            if e.code == "23505":
+                return None
+            raise HTTPException(
+                status_code=400,
+                detail=f"{e.code}: Failed to create assessment stats. {e.details}",
+            )
+
+    async def update_if_unchanged(self, db: StorageBackend, *, obj_in: AssessmentStatsUpdate) -> Optional[AssessmentStats]:
+        """update only if the row is still at obj_in.version, bumping it; None if someone else wrote it first"""
+        try:
+            updated = await db.update(
+                self.model.table_name,
+                {**obj_in.model_dump(), "version": obj_in.version + 1},
+                where={"id": obj_in.id, "version": obj_in.version},
+            )
+            return self.model(**updated[0]) if updated else None
+        except Exception as e:
+            raise HTTPException(
+                status_code=404,
+                detail=f"{e.code}: Failed to update assessment stats. {e.details}",
+            )
+
+    async def delete_by_assessment(self, db: StorageBackend, *, assessment_id: int) -> None:
+        try:
+            await db.delete(self.model.table_name, where={"assessment_id": assessment_id})
+        except Exception as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{e.code}: Failed to delete assessment stats. {e.details}",
+            )
+
+    async def update(self, db: StorageBackend, *, obj_in: AssessmentStatsUpdate) -> AssessmentStats:
+        try:
+            return await super().update(db, obj_in=obj_in)
+        except Exception as e:
+            raise HTTPException(
+                status_code=404,
+                detail=f"{e.code}: Failed to update assessment stats. {e.details}",
+            )
+
+
+assessment_stats = CRUDAssessmentStats(AssessmentStats)
@@ -0,0 +1,36 @@
+from fastapi import HTTPException
+from ..storage import StorageBackend
+
+from .base import CRUDBase
+from ..schemas.assignment import Assignment, AssignmentCreate, AssignmentUpdate
+
+
+class CRUDAssignment(CRUDBase[Assignment, AssignmentCreate, AssignmentUpdate]):
+    async def get_student_ids(self, db: StorageBackend, *, assessment_id: int) -> list[int]:
+        """students assigned the assessment, by the assessment_id index"""
+        try:
+            got = await db.select(
+                self.model.table_name, columns=["student_id"], where={"assessment_id": assessment_id}, order_by="student_id"
+            )
+            return [item["student_id"] for item in got]
+        except Exception as e:
+            raise HTTPException(
+                status_code=404,
+                detail=f"An error occurred while fetching assigned students. {e}",
+            )
+
+    async def get_assessment_ids(self, db: StorageBackend, *, student_id: int) -> list[int]:
+        """assessments assigned to the student, by the student_id index"""
+        try:
+            got = await db.select(
+                self.model.table_name, columns=["assessment_id"], where={"student_id": student_id}, order_by="assessment_id"
+            )
+            return [item["assessment_id"] for item in got]
+        except Exception as e:
+            raise HTTPException(
+                status_code=404,
+                detail=f"An error occurred while fetching assigned assessments. {e}",
+            )
+
+
+assignment = CRUDAssignment(Assignment)
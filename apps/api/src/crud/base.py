@@ -1,74 +1,139 @@
-from typing import Generic, Optional, TypeVar
+import logging
+from typing import Any, AsyncIterator, Generic, Mapping, Optional, Sequence, TypeVar, Union
 
-from supabase._async.client import AsyncClient
-
-from src.schemas.base import CreateBase, ResponseBase, UpdateBase
+from src.config import settings
+from src.schemas.base import CreateBase, PatchBase, ResponseBase, UpdateBase
+from src.services.cache import Cache, Codec
+from src.storage import StorageBackend
 
 ModelType = TypeVar("ModelType", bound=ResponseBase)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=CreateBase)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=UpdateBase)
 
+logger = logging.getLogger(__name__)
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    def __init__(self, model: type[ModelType]):
+    def __init__(self, model: type[ModelType], *, cached: bool = False):
         """CRUD object with default methods to do CRUD ops
 
         Args:
             model (type[ModelType]): Model class type
+            cached (bool, optional): Cache get by id in the backend's cache, if it has one. Defaults to False.
         """
         self.model = model
+        self.cached = cached
+        self._codec = Codec(model) if cached else None
+
+    def _cache(self, db: StorageBackend) -> Optional[Cache]:
+        return db.cache if self.cached and settings.CACHE_CRUD_TTL > 0 else None
+
+    def _cache_key(self, id) -> str:
+        return f"{self.model.table_name}:{id}"
 
-    async def get(self, db: AsyncClient, *, id: str) -> Optional[ModelType]:
-        """get by table_name by id"""
-        data, count = (
-            await db.table(self.model.table_name).select("*").eq("id", id).execute()
+    async def _invalidate(self, db: StorageBackend, id) -> None:
+        cache = self._cache(db)
+        if cache is not None:
+            await cache.delete(self._cache_key(id))
+
+    async def get(self, db: StorageBackend, *, id: str) -> Optional[ModelType]:
+        """get by table_name by id, through the backend's cache if cached"""
+        cache = self._cache(db)
+        if cache is None:
+            return await self._select_by_id(db, id)
+        return await cache.get_or_load(
+            self._cache_key(id), lambda: self._select_by_id(db, id), ttl=settings.CACHE_CRUD_TTL, codec=self._codec
         )
-        _, got = data
+
+    async def _select_by_id(self, db: StorageBackend, id) -> Optional[ModelType]:
+        got = await db.select(self.model.table_name, where={"id": id})
         return self.model(**got[0]) if got else None
 
-    async def get_all(self, db: AsyncClient) -> list[ModelType]:
+    async def get_all(self, db: StorageBackend) -> list[ModelType]:
         """get all by table_name"""
-        data, count = await db.table(self.model.table_name).select("*").execute()
-        _, got = data
+        got = await db.select(self.model.table_name)
         return [self.model(**item) for item in got]
 
     async def search_all(
-        self, db: AsyncClient, *, field: str, search_value: str, max_results: int
+        self, db: StorageBackend, *, field: str, search_value: str, max_results: int
     ) -> list[ModelType]:
         """search all by table_name"""
-        data, count = (
-            await db.table(self.model.table_name)
-            .select("*")
-            .ilike(field, f"%{search_value}%")
-            .limit(max_results)
-            .execute()
+        got = await db.select(
+            self.model.table_name,
+            ilike={field: f"%{search_value}%"},
+            limit=max_results,
         )
-        _, got = data
         return [self.model(**item) for item in got]
 
-    async def create(self, db: AsyncClient, *, obj_in: CreateSchemaType) -> ModelType:
+    async def iter_pages(
+        self,
+        db: StorageBackend,
+        *,
+        where: Optional[Mapping[str, Any]] = None,
+        columns: Optional[Sequence[str]] = None,
+        page_size: int = 500,
+    ) -> AsyncIterator[list[dict]]:
+        """yields the matching rows page by page, in id order, as raw dicts
+
+        Pages are fetched with keyset paging (id greater than the last one seen), so
+        each page costs the same however deep into the table it is.
+        """
+        if columns is not None and "id" not in columns:
+            columns = ["id", *columns]
+        last_id = None
+        while True:
+            page = await db.select(
+                self.model.table_name,
+                columns=columns,
+                where=where,
+                after={"id": last_id} if last_id is not None else None,
+                order_by="id",
+                limit=page_size,
+            )
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            last_id = page[-1]["id"]
+
+    async def create(self, db: StorageBackend, *, obj_in: CreateSchemaType) -> ModelType:
         """create by CreateSchemaType"""
-        data, count = (
-            await db.table(self.model.table_name).insert(obj_in.model_dump()).execute()
-        )
-        _, created = data
+        created = await db.insert(self.model.table_name, [obj_in.model_dump()])
+        logger.debug("Created row", extra={"table": self.model.table_name, "id": created[0].get("id")})
         return self.model(**created[0])
 
-    async def update(self, db: AsyncClient, *, obj_in: UpdateSchemaType) -> ModelType:
+    async def update(self, db: StorageBackend, *, obj_in: UpdateSchemaType) -> ModelType:
         """update by UpdateSchemaType"""
-        data, count = (
-            await db.table(self.model.table_name)
-            .update(obj_in.model_dump())
-            .eq("id", obj_in.id)
-            .execute()
+        updated = await db.update(
+            self.model.table_name, obj_in.model_dump(), where={"id": obj_in.id}
         )
-        _, updated = data
+        await self._invalidate(db, obj_in.id)
+        logger.debug("Updated row", extra={"table": self.model.table_name, "id": obj_in.id})
         return self.model(**updated[0])
 
-    async def delete(self, db: AsyncClient, *, id: str) -> ModelType:
+    async def patch(
+        self, db: StorageBackend, *, id: int, obj_in: PatchBase, returning: bool = True
+    ) -> Union[ModelType, bool, None]:
+        """update only the fields set on obj_in
+
+        Returns the updated row, or None if there is no such row. If not
+        `returning` (the database then sends back only a count), returns
+        whether there was one instead.
+        """
+        values = obj_in.changes()
+        if not values:
+            found = await self.get(db, id=id)
+            return found if returning else found is not None
+        updated = await db.update(self.model.table_name, values, where={"id": id}, returning=returning)
+        await self._invalidate(db, id)
+        logger.debug("Patched row", extra={"table": self.model.table_name, "id": id, "columns": sorted(values)})
+        if not returning:
+            return bool(updated)
+        return self.model(**updated[0]) if updated else None
+
+    async def delete(self, db: StorageBackend, *, id: str) -> ModelType:
         """remove by UpdateSchemaType"""
-        data, count = (
-            await db.table(self.model.table_name).delete().eq("id", id).execute()
-        )
-        _, deleted = data
+        deleted = await db.delete(self.model.table_name, where={"id": id})
+        await self._invalidate(db, id)
+        logger.debug("Deleted row", extra={"table": self.model.table_name, "id": id})
         return self.model(**deleted[0])
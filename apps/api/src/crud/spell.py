@@ -1,14 +1,15 @@
 from typing import Optional
 
 from fastapi import HTTPException
-from supabase._async.client import AsyncClient
+from src.storage import StorageBackend
 
 from src.crud.base import CRUDBase
 from src.schemas import Spell, SpellCreate, SpellUpdate
+from src.services import spell_search
 
 
 class CRUDSpell(CRUDBase[Spell, SpellCreate, SpellUpdate]):
-    async def get(self, db: AsyncClient, *, id: str) -> Optional[Spell]:
+    async def get(self, db: StorageBackend, *, id: str) -> Optional[Spell]:
         try:
             return await super().get(db, id=id)
         except Exception as e:
@@ -17,7 +18,7 @@ class CRUDSpell(CRUDBase[Spell, SpellCreate, SpellUpdate]):
                 detail=f"{e.code}: Spell not found. {e.details}",
             )
 
-    async def get_all(self, db: AsyncClient) -> list[Spell]:
+    async def get_all(self, db: StorageBackend) -> list[Spell]:
         try:
             return await super().get_all(db)
         except Exception as e:
@@ -26,18 +27,34 @@ class CRUDSpell(CRUDBase[Spell, SpellCreate, SpellUpdate]):
                 detail=f"An error occurred while fetching spells. {e}",
             )
 
+    # Answered from the in-memory index; the table is only read when the index is rebuilt
     async def search_all(
-        self, db: AsyncClient, *, field: str, search_value: str, max_results: int
+        self, db: StorageBackend, *, field: str, search_value: str, max_results: Optional[int]
     ) -> list[Spell]:
         try:
-            return await super().search_all(
-                db, field=field, search_value=search_value, max_results=max_results
-            )
+            index = await spell_search.get_index(db)
+            return index.search(search_value, field=field, limit=max_results)
         except Exception as e:
             raise HTTPException(
                 status_code=404,
                 detail=f"An error occurred while searching for users. {e}",
             )
 
+    # Writes drop the in-memory search index, so the next search sees them
+    async def create(self, db: StorageBackend, *, obj_in: SpellCreate) -> Spell:
+        created = await super().create(db, obj_in=obj_in)
+        spell_search.invalidate()
+        return created
+
+    async def update(self, db: StorageBackend, *, obj_in: SpellUpdate) -> Spell:
+        updated = await super().update(db, obj_in=obj_in)
+        spell_search.invalidate()
+        return updated
+
+    async def delete(self, db: StorageBackend, *, id: str) -> Spell:
+        deleted = await super().delete(db, id=id)
+        spell_search.invalidate()
+        return deleted
+
 
 spell = CRUDSpell(Spell)
@@ -1,14 +1,15 @@
-from typing import Optional
+from typing import Optional, Union
 
 from fastapi import HTTPException
-from supabase._async.client import AsyncClient
+from ..storage import StorageBackend
 
+from .assignment import assignment
 from .base import CRUDBase
-from ..schemas.student import Student, StudentCreate, StudentUpdate
+from ..schemas.student import Student, StudentCreate, StudentPatch, StudentUpdate
 
 
 class CRUDStudent(CRUDBase[Student, StudentCreate, StudentUpdate]):
-    async def get(self, db: AsyncClient, *, id: int) -> Optional[Student]:
+    async def get(self, db: StorageBackend, *, id: int) -> Optional[Student]:
         try:
             return await super().get(db, id=str(id))
         except Exception as e:
@@ -17,7 +18,7 @@ class CRUDStudent(CRUDBase[Student, StudentCreate, StudentUpdate]):
                 detail=f"{e.code}: Student not found. {e.details}",
             )
 
-    async def get_all(self, db: AsyncClient) -> list[Student]:
+    async def get_all(self, db: StorageBackend) -> list[Student]:
         try:
             return await super().get_all(db)
         except Exception as e:
@@ -26,7 +27,21 @@ class CRUDStudent(CRUDBase[Student, StudentCreate, StudentUpdate]):
                 detail=f"An error occurred while fetching students. {e}",
             )
 
-    async def create(self, db: AsyncClient, *, obj_in: StudentCreate) -> Student:
+    async def get_by_assessment(self, db: StorageBackend, *, assessment_id: int) -> list[Student]:
+        """students assigned the assessment, through the assignment index"""
+        student_ids = await assignment.get_student_ids(db, assessment_id=assessment_id)
+        if not student_ids:
+            return []
+        try:
+            got = await db.select(self.model.table_name, where={"id": student_ids}, order_by="id")
+            return [self.model(**item) for item in got]
+        except Exception as e:
+            raise HTTPException(
+                status_code=404,
+                detail=f"An error occurred while fetching assigned students. {e}",
+            )
+
+    async def create(self, db: StorageBackend, *, obj_in: StudentCreate) -> Student:
         try:
             return await super().create(db, obj_in=obj_in)
         except Exception as e:
@@ -35,5 +50,40 @@ class CRUDStudent(CRUDBase[Student, StudentCreate, StudentUpdate]):
                 detail=f"{e.code}: Failed to create student. {e.details}",
             )
 
+    async def patch(
+        self, db: StorageBackend, *, id: int, obj_in: StudentPatch, returning: bool = True
+    ) -> Union[Student, bool, None]:
+        try:
+            return await super().patch(db, id=id, obj_in=obj_in, returning=returning)
+        except Exception as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{e.code}: Failed to update student. {e.details}",
+            )
+
+    async def patch_if_unchanged(
+        self, db: StorageBackend, *, id: int, obj_in: StudentPatch, version: int, returning: bool = True
+    ) -> Union[Student, bool, None]:
+        """patch only if the row is still at `version`, bumping it
+
+        Returns what patch does, so None (or False if not `returning`) if someone else wrote it first.
+        """
+        try:
+            updated = await db.update(
+                self.model.table_name,
+                {**obj_in.changes(), "version": version + 1},
+                where={"id": id, "version": version},
+                returning=returning,
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{e.code}: Failed to update student. {e.details}",
+            )
+        await self._invalidate(db, id)
+        if not returning:
+            return bool(updated)
+        return self.model(**updated[0]) if updated else None
+
 
-student = CRUDStudent(Student) 
\ No newline at end of file
+student = CRUDStudent(Student, cached=True) 
\ No newline at end of file
@@ -1,14 +1,14 @@
-from typing import Optional
+from typing import Optional, Union
 
 from fastapi import HTTPException
-from supabase._async.client import AsyncClient
+from ..storage import StorageBackend
 
 from .base import CRUDBase
-from ..schemas.teacher import Teacher, TeacherCreate, TeacherUpdate
+from ..schemas.teacher import Teacher, TeacherCreate, TeacherPatch, TeacherUpdate
 
 
 class CRUDTeacher(CRUDBase[Teacher, TeacherCreate, TeacherUpdate]):
-    async def get(self, db: AsyncClient, *, id: int) -> Optional[Teacher]:
+    async def get(self, db: StorageBackend, *, id: int) -> Optional[Teacher]:
         try:
             return await super().get(db, id=str(id))
         except Exception as e:
@@ -17,7 +17,7 @@ class CRUDTeacher(CRUDBase[Teacher, TeacherCreate, TeacherUpdate]):
                 detail=f"{e.code}: Teacher not found. {e.details}",
             )
 
-    async def get_all(self, db: AsyncClient) -> list[Teacher]:
+    async def get_all(self, db: StorageBackend) -> list[Teacher]:
         try:
             return await super().get_all(db)
         except Exception as e:
@@ -26,7 +26,7 @@ class CRUDTeacher(CRUDBase[Teacher, TeacherCreate, TeacherUpdate]):
                 detail=f"An error occurred while fetching teachers. {e}",
             )
 
-    async def create(self, db: AsyncClient, *, obj_in: TeacherCreate) -> Teacher:
+    async def create(self, db: StorageBackend, *, obj_in: TeacherCreate) -> Teacher:
         try:
             return await super().create(db, obj_in=obj_in)
         except Exception as e:
@@ -35,5 +35,16 @@ class CRUDTeacher(CRUDBase[Teacher, TeacherCreate, TeacherUpdate]):
                 detail=f"{e.code}: Failed to create teacher. {e.details}",
             )
 
+    async def patch(
+        self, db: StorageBackend, *, id: int, obj_in: TeacherPatch, returning: bool = True
+    ) -> Union[Teacher, bool, None]:
+        try:
+            return await super().patch(db, id=id, obj_in=obj_in, returning=returning)
+        except Exception as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{e.code}: Failed to update teacher. {e.details}",
+            )
+
 
-teacher = CRUDTeacher(Teacher) 
\ No newline at end of file
+teacher = CRUDTeacher(Teacher, cached=True) 
\ No newline at end of file
@@ -0,0 +1,41 @@
+from fastapi import HTTPException
+from ..storage import StorageBackend
+
+from .base import CRUDBase
+from ..schemas.transcript_segment import TranscriptSegment, TranscriptSegmentCreate, TranscriptSegmentUpdate
+
+
+class CRUDTranscriptSegment(CRUDBase[TranscriptSegment, TranscriptSegmentCreate, TranscriptSegmentUpdate]):
+    async def create_many(self, db: StorageBackend, *, objs_in: list[TranscriptSegmentCreate]) -> list[TranscriptSegment]:
+        try:
+            created = await db.insert(self.model.table_name, [obj.model_dump() for obj in objs_in])
+            return [self.model(**item) for item in created]
+        except Exception as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{e.code}: Failed to append transcript segments. {e.details}",
+            )
+
+    async def get_by_results(self, db: StorageBackend, *, result_ids: list[int]) -> list[TranscriptSegment]:
+        """segments of the results, in interview order (offset, then arrival)"""
+        try:
+            got = await db.select(self.model.table_name, where={"result_id": result_ids}, order_by="id")
+            segments = [self.model(**item) for item in got]
+            return sorted(segments, key=lambda segment: segment.offset_ms)
+        except Exception as e:
+            raise HTTPException(
+                status_code=404,
+                detail=f"An error occurred while fetching transcript segments. {e}",
+            )
+
+    async def delete_many(self, db: StorageBackend, *, ids: list[int]) -> None:
+        try:
+            await db.delete(self.model.table_name, where={"id": ids})
+        except Exception as e:
+            raise HTTPException(
+                status_code=404,
+                detail=f"{e.code}: Failed to delete transcript segments. {e.details}",
+            )
+
+
+transcript_segment = CRUDTranscriptSegment(TranscriptSegment)
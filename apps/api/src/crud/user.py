@@ -1,14 +1,14 @@
 from typing import Optional
 
 from fastapi import HTTPException
-from supabase._async.client import AsyncClient
+from src.storage import StorageBackend
 
 from src.crud.base import CRUDBase
 from src.schemas import User, UserCreate, UserUpdate
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
-    async def create(self, db: AsyncClient, *, obj_in: UserCreate) -> User:
+    async def create(self, db: StorageBackend, *, obj_in: UserCreate) -> User:
         try:
             return await super().create(db, obj_in=obj_in)
         except Exception as e:
@@ -17,7 +17,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
                 detail=f"{e.code}: Failed to create user. {e.details}",
             )
 
-    async def get(self, db: AsyncClient, *, id: str) -> Optional[User]:
+    async def get(self, db: StorageBackend, *, id: str) -> Optional[User]:
         try:
             return await super().get(db, id=id)
         except Exception as e:
@@ -26,7 +26,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
                 detail=f"{e.code}: User not found. {e.details}",
             )
 
-    async def get_all(self, db: AsyncClient) -> list[User]:
+    async def get_all(self, db: StorageBackend) -> list[User]:
         try:
             return await super().get_all(db)
         except Exception as e:
@@ -36,7 +36,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             )
 
     async def search_all(
-        self, db: AsyncClient, *, field: str, search_value: str, max_results: int
+        self, db: StorageBackend, *, field: str, search_value: str, max_results: int
     ) -> list[User]:
         try:
             return await super().search_all(
@@ -48,10 +48,10 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
                 detail=f"An error occurred while searching for users. {e}",
             )
 
-    async def update(self, db: AsyncClient, *, obj_in: UserUpdate) -> User:
+    async def update(self, db: StorageBackend, *, obj_in: UserUpdate) -> User:
         return await super().update(db, obj_in=obj_in)
 
-    async def delete(self, db: AsyncClient, *, id: str) -> User:
+    async def delete(self, db: StorageBackend, *, id: str) -> User:
         return await super().delete(db, id=id)
 
 
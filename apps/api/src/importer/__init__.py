@@ -0,0 +1,3 @@
+"""Bulk import of CSV / NDJSON files into the database, see __main__.py"""
+from .loader import TABLES, Checkpoint, ImportFailed, ImportReport, import_rows, validate_batch
+from .sources import ColumnTemplates, SourceError, detect_format, open_source, read_rows
@@ -0,0 +1,117 @@
+"""Bulk import of CSV / NDJSON rows into a table
+
+Streams the input, validates rows in batches against the table's create
+schema and writes them with multi-row inserts, several batches at a time, to
+the database selected by the settings (DB_BACKEND). Progress is saved to a
+checkpoint file after every batch; if the import stops, rerun it with
+--resume to carry on from there. Rejected rows are written to a rejects file
+instead of stopping the import.
+
+    python -m src.importer spells harry-potter-db-seed-spells.csv
+    python -m src.importer Student harry-potter-db-seed-users.csv --set "name={forename} {surname}"
+    python -m src.importer Student roster.ndjson --batch-size 1000 --parallel 8
+    python -m src.importer Student roster.ndjson --resume
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+from typing import Optional
+
+from ..api.dependencies import create_backend
+from ..log import configure_logging
+from .loader import TABLES, Checkpoint, ImportFailed, ImportReport, import_rows
+from .sources import ColumnTemplates, SourceError, detect_format, open_source, read_rows
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m src.importer", description=__doc__.splitlines()[0])
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("source", help='CSV or NDJSON file (optionally .gz), or "-" for NDJSON on stdin')
+    parser.add_argument("--format", choices=("csv", "ndjson"), help="input format (default: from the extension)")
+    parser.add_argument(
+        "--set",
+        action="append",
+        metavar="COLUMN=TEMPLATE",
+        help='derived column from the input columns, e.g. "name={forename} {surname}" (repeatable)',
+    )
+    parser.add_argument("--batch-size", type=int, default=500, help="rows per insert")
+    parser.add_argument("--parallel", type=int, default=4, help="batches written at once")
+    parser.add_argument("--checkpoint", type=Path, help="progress file (default: <source>.checkpoint.json)")
+    parser.add_argument("--resume", action="store_true", help="skip the rows the checkpoint records as written")
+    parser.add_argument("--rejects", type=Path, help="rejected rows as NDJSON (default: <source>.rejects.ndjson)")
+    parser.add_argument("--dry-run", action="store_true", help="validate only")
+    args = parser.parse_args(argv)
+    stem = args.table if args.source == "-" else args.source
+    args.checkpoint = args.checkpoint or Path(f"{stem}.checkpoint.json")
+    args.rejects = args.rejects or Path(f"{stem}.rejects.ndjson")
+    args.format = args.format or detect_format(args.source)
+    return args
+
+
+def load_checkpoint(args: argparse.Namespace) -> Checkpoint:
+    fresh = Checkpoint(source=args.source, table=args.table, batch_size=args.batch_size)
+    if not args.checkpoint.exists() or args.dry_run:
+        return fresh
+    if not args.resume:
+        sys.exit(f"{args.checkpoint} exists: pass --resume to continue that import, or delete it to start over")
+    checkpoint = Checkpoint.load(args.checkpoint)
+    if (checkpoint.source, checkpoint.table, checkpoint.batch_size) != (fresh.source, fresh.table, fresh.batch_size):
+        sys.exit(
+            f"{args.checkpoint} is for {checkpoint.table} from {checkpoint.source} "
+            f"with --batch-size {checkpoint.batch_size}"
+        )
+    return checkpoint
+
+
+def print_report(report: ImportReport, final: bool = False) -> None:
+    print(
+        f"{'done' if final else '...':4} {report.read:>10} read  {report.inserted:>10} inserted  "
+        f"{report.rejected:>8} rejected  {report.skipped:>10} skipped  {report.rows_per_second:>9.0f} rows/s",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+async def run(args: argparse.Namespace) -> int:
+    configure_logging()
+    # Batches refused for a constraint are retried row by row, and every refused row
+    # would be logged; they are all in the rejects file already
+    logging.getLogger("src.storage").setLevel(logging.ERROR)
+    checkpoint = load_checkpoint(args)
+    db = await create_backend()
+    try:
+        with open_source(args.source) as source, args.rejects.open("a") as rejects:
+            report = await import_rows(
+                db,
+                args.table,
+                read_rows(source, args.format),
+                batch_size=args.batch_size,
+                parallel=args.parallel,
+                checkpoint=checkpoint,
+                checkpoint_path=args.checkpoint,
+                templates=ColumnTemplates.parse(args.set),
+                csv_cells=args.format == "csv",
+                rejects=rejects,
+                dry_run=args.dry_run,
+                progress=print_report,
+            )
+    except (ImportFailed, SourceError) as e:
+        print(f"{e}\nProgress is saved in {args.checkpoint}; rerun with --resume to continue.", file=sys.stderr)
+        return 1
+    finally:
+        await db.close()
+
+    print_report(report, final=True)
+    if not args.dry_run:
+        args.checkpoint.unlink(missing_ok=True)
+    if report.rejected:
+        print(f"{report.rejected} rows rejected, see {args.rejects}", file=sys.stderr)
+    elif args.rejects.exists() and args.rejects.stat().st_size == 0:
+        args.rejects.unlink()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run(parse_args())))
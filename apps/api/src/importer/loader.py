@@ -0,0 +1,280 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, TextIO
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from ..schemas import AssessmentCreate, AssessmentResultCreate, SpellCreate, StudentCreate, TeacherCreate
+from ..storage import StorageBackend, StorageError
+from .sources import ColumnTemplates
+
+logger = logging.getLogger(__name__)
+
+# Tables rows can be imported into, with the schema rows are validated against
+TABLES: dict[str, type[BaseModel]] = {
+    "Teacher": TeacherCreate,
+    "Student": StudentCreate,
+    "Assessment": AssessmentCreate,
+    "AssessmentResult": AssessmentResultCreate,
+    "spells": SpellCreate,
+}
+
+
+class ImportFailed(Exception):
+    """Raised when a batch can't be written; the checkpoint records what was"""
+
+
+@dataclass
+class Checkpoint:
+    """Which input rows are written, so a failed import can resume where it stopped
+
+    Batches are numbered by the input row they start at. Every row before
+    `offset` is done, and so are the batches starting at the rows in `done`,
+    which finished ahead of an earlier batch.
+    """
+
+    source: str
+    table: str
+    batch_size: int
+    offset: int = 0
+    done: dict[int, int] = field(default_factory=dict)
+    inserted: int = 0
+    rejected: int = 0
+
+    @classmethod
+    def load(cls, path: Path) -> "Checkpoint":
+        data = json.loads(path.read_text())
+        data["done"] = {int(start): end for start, end in data["done"].items()}
+        return cls(**data)
+
+    def save(self, path: Path) -> None:
+        # Written to a temporary file and renamed, so a crash never leaves half a checkpoint
+        temporary = path.with_suffix(path.suffix + ".tmp")
+        temporary.write_text(json.dumps(asdict(self)))
+        os.replace(temporary, path)
+
+    def is_done(self, start: int) -> bool:
+        return start < self.offset or start in self.done
+
+    def complete(self, start: int, end: int) -> None:
+        self.done[start] = end
+        while self.offset in self.done:
+            self.offset = self.done.pop(self.offset)
+
+
+@dataclass
+class ImportReport:
+    read: int = 0
+    inserted: int = 0
+    rejected: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return (self.inserted + self.rejected) / self.seconds if self.seconds else 0.0
+
+
+def _batches(rows: Iterable[dict], size: int) -> Iterator[tuple[int, list[dict]]]:
+    iterator = iter(rows)
+    start = 0
+    while batch := list(islice(iterator, size)):
+        yield start, batch
+        start += len(batch)
+
+
+@functools.lru_cache
+def _list_adapter(schema: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[schema])
+
+
+def _parse_cells(schema: type[BaseModel], row: dict) -> dict:
+    """Decodes JSON cells (e.g. assessment_ids "[1, 2]") for the fields that aren't strings"""
+    parsed = dict(row)
+    for name, info in schema.model_fields.items():
+        value = parsed.get(name)
+        if isinstance(value, str) and info.annotation is not str and value[:1] in ("[", "{"):
+            try:
+                parsed[name] = json.loads(value)
+            except json.JSONDecodeError:
+                pass
+    return parsed
+
+
+def validate_batch(
+    schema: type[BaseModel], rows: list[dict], *, templates: ColumnTemplates, csv_cells: bool
+) -> tuple[list[dict], list[tuple[int, str]]]:
+    """Validates a batch of input rows, returning the valid rows and (index, error) per invalid one"""
+    prepared, rejected = [], []
+    for i, row in enumerate(rows):
+        try:
+            row = templates.apply(row)
+        except KeyError as e:
+            rejected.append((i, f"template column {e} missing"))
+            continue
+        prepared.append((i, _parse_cells(schema, row) if csv_cells else row))
+
+    # Validating the whole batch at once is much faster; rows are only checked one
+    # by one to pick out the invalid ones when it fails
+    try:
+        models = _list_adapter(schema).validate_python([row for _, row in prepared])
+        return [model.model_dump() for model in models], rejected
+    except ValidationError:
+        pass
+    valid = []
+    for i, row in prepared:
+        try:
+            valid.append(schema.model_validate(row).model_dump())
+        except ValidationError as e:
+            rejected.append((i, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())))
+    return valid, sorted(rejected)
+
+
+async def import_rows(
+    db: StorageBackend,
+    table: str,
+    rows: Iterable[dict],
+    *,
+    batch_size: int = 500,
+    parallel: int = 4,
+    checkpoint: Optional[Checkpoint] = None,
+    checkpoint_path: Optional[Path] = None,
+    templates: Optional[ColumnTemplates] = None,
+    csv_cells: bool = False,
+    rejects: Optional[TextIO] = None,
+    retries: int = 3,
+    dry_run: bool = False,
+    progress: Callable[[ImportReport], None] = lambda report: None,
+    progress_interval: float = 2.0,
+) -> ImportReport:
+    """Validates and inserts a stream of rows in batches, several batches at a time
+
+    Memory stays bounded whatever the input size: at most `parallel` batches are
+    being written and as many more are read ahead. A batch that breaks a
+    constraint (e.g. a duplicate key) is retried row by row and only the
+    offending rows are rejected; any other write error is retried `retries`
+    times before the import stops with ImportFailed.
+
+    Args:
+        db (StorageBackend): Where rows are written
+        table (str): One of TABLES
+        rows (Iterable[dict]): Input rows, e.g. from sources.read_rows
+        batch_size (int, optional): Rows per multi-row insert. Defaults to 500.
+        parallel (int, optional): Batches written at once. Defaults to 4.
+        checkpoint (Checkpoint, optional): Progress of an earlier run to resume; its rows are skipped
+        checkpoint_path (Path, optional): Where progress is saved after every batch
+        templates (ColumnTemplates, optional): Derived columns applied before validation
+        csv_cells (bool, optional): Decode JSON in string cells of non-string fields (CSV input)
+        rejects (TextIO, optional): Receives one JSON line per rejected row
+        retries (int, optional): Attempts per batch on write errors. Defaults to 3.
+        dry_run (bool, optional): Validate only, don't write. Defaults to False.
+        progress (Callable[[ImportReport], None], optional): Called every `progress_interval` seconds
+
+    Raises:
+        ImportFailed: If a batch can't be written
+
+    Returns:
+        ImportReport: Counts for this run and its throughput
+    """
+    schema = TABLES[table]
+    templates = templates or ColumnTemplates({})
+    checkpoint = checkpoint or Checkpoint(source="", table=table, batch_size=batch_size)
+    report = ImportReport()
+    started = last_progress = time.perf_counter()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=parallel)
+    result_assessments: set[int] = set()
+    failure: Optional[BaseException] = None
+
+    def save() -> None:
+        if checkpoint_path is not None and not dry_run:
+            checkpoint.save(checkpoint_path)
+
+    async def write(batch: list[dict]) -> tuple[list[dict], list[tuple[int, str]]]:
+        """Inserts a batch, returning the rows inserted and the rows rejected by the database"""
+        for attempt in range(retries):
+            try:
+                return await db.insert(table, batch), []
+            except StorageError as e:
+                if e.code and e.code.startswith("23"):
+                    break
+                if attempt == retries - 1:
+                    raise
+                logger.warning("Import batch failed, retrying", extra={"table": table, "error": e.message})
+                await asyncio.sleep(2**attempt)
+        inserted, rejected = [], []
+        for i, row in enumerate(batch):
+            try:
+                inserted += await db.insert(table, [row])
+            except StorageError as e:
+                rejected.append((i, e.message))
+        return inserted, rejected
+
+    async def worker() -> None:
+        nonlocal failure, last_progress
+        while (item := await queue.get()) is not None:
+            start, batch = item
+            try:
+                if failure is not None:
+                    continue
+                valid, rejected = validate_batch(schema, batch, templates=templates, csv_cells=csv_cells)
+                inserted = len(valid)
+                if valid and not dry_run:
+                    rows, refused = await write(valid)
+                    inserted = len(rows)
+                    # Indices of database refusals are positions among the valid rows
+                    invalid = {i for i, _ in rejected}
+                    accepted = [i for i in range(len(batch)) if i not in invalid]
+                    rejected += [(accepted[i], error) for i, error in refused]
+                if table == "AssessmentResult":
+                    result_assessments.update(row["assessment_id"] for row in valid)
+                for i, error in rejected:
+                    if rejects is not None:
+                        rejects.write(json.dumps({"row": start + i, "error": error, "data": batch[i]}, default=str) + "\n")
+                report.inserted += inserted
+                report.rejected += len(rejected)
+                checkpoint.inserted += inserted
+                checkpoint.rejected += len(rejected)
+                checkpoint.complete(start, start + len(batch))
+                save()
+                now = time.perf_counter()
+                if now - last_progress >= progress_interval:
+                    last_progress = now
+                    report.seconds = now - started
+                    progress(report)
+            except Exception as e:
+                failure = e
+            finally:
+                queue.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(parallel)]
+    try:
+        for start, batch in _batches(rows, batch_size):
+            if failure is not None:
+                break
+            report.read += len(batch)
+            if checkpoint.is_done(start):
+                report.skipped += len(batch)
+                continue
+            await queue.put((start, batch))
+    finally:
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+        save()
+
+    # Results written behind the API's back: drop the affected stats so they are
+    # rebuilt from the results on their next read (see services/assessment_stats.py)
+    if result_assessments and not dry_run:
+        await db.delete("AssessmentStats", where={"assessment_id": sorted(result_assessments)})
+
+    report.seconds = time.perf_counter() - started
+    if failure is not None:
+        raise ImportFailed(f"Import of {table} stopped at row {checkpoint.offset}: {failure}") from failure
+    return report
@@ -0,0 +1,151 @@
+"""Structured, sampled, non-blocking logging
+
+Modules log through `logging.getLogger(__name__)`, so a logger's name (e.g.
+"src.crud", "src.access") is its category. `configure_logging` routes the "src"
+loggers through a QueueHandler: the request path only filters, samples and
+enqueues the record, and a QueueListener thread formats and writes it.
+
+Records carry the current request ID (see middleware/request_id.py) and any
+`extra={...}` fields. Messages and fields longer than LOG_MAX_FIELD_LENGTH are
+truncated when formatted. LOG_SAMPLE_RATES keeps only a fraction of a
+category's records below WARNING, e.g. "src.access=0.1,src.crud=0.01".
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+from .config import settings
+
+request_id: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has; anything else was passed as `extra`
+_RECORD_FIELDS = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "request_id"}
+
+_listener: Optional[QueueListener] = None
+
+
+def truncate(value: Any, limit: int) -> Any:
+    """Shortens long strings (and the repr of other long values) to `limit` characters"""
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    text = value if isinstance(value, str) else repr(value)
+    if len(text) <= limit:
+        return value
+    return f"{text[:limit]}... ({len(text) - limit} more characters)"
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """Parses "category=rate,..." into {category: rate}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        category, _, rate = item.partition("=")
+        rates[category.strip()] = float(rate)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of each category's records below WARNING
+
+    The most specific configured category matching the logger name applies.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        # Longest first so "src.crud.assessment" wins over "src.crud"
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self._cache: dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = next(
+                (rate for category, rate in self.rates if name == category or name.startswith(f"{category}.")),
+                1.0,
+            )
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class ContextQueueHandler(QueueHandler):
+    """Enqueues records unformatted, tagged with the current request ID
+
+    The default QueueHandler formats every record before enqueueing it, which
+    puts the formatting cost back on the request path.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id.get()
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, request ID, message and extra fields"""
+
+    def __init__(self, max_length: int = 1000):
+        super().__init__()
+        self.max_length = max_length
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": truncate(record.getMessage(), self.max_length),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = truncate(value, self.max_length)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human readable lines for local development"""
+
+    def __init__(self, max_length: int = 1000):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s")
+        self.max_length = max_length
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = truncate(record.message, self.max_length)
+        line = super().formatMessage(record)
+        extra = {key: truncate(value, self.max_length) for key, value in record.__dict__.items() if key not in _RECORD_FIELDS}
+        return f"{line} {extra}" if extra else line
+
+
+def configure_logging() -> None:
+    """Routes the application's loggers through the sampled, queued handler (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter_class = TextFormatter if settings.LOG_FORMAT == "text" else JSONFormatter
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(formatter_class(settings.LOG_MAX_FIELD_LENGTH))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = ContextQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(parse_sample_rates(settings.LOG_SAMPLE_RATES)))
+
+    logger = logging.getLogger("src")
+    logger.setLevel(settings.LOG_LEVEL.upper())
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -2,8 +2,12 @@ from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.routing import APIRoute
 
+from src.api.dependencies import lifespan
 from src.api.v1.api import api_router
 from src.config import settings
+from src.log import configure_logging
+from src.middleware import IdempotencyMiddleware, IdempotencyStore, ProfilingMiddleware, RequestIDMiddleware
+from src.services.cache import get_shared_cache
 
 info_router = APIRouter()
 
@@ -26,17 +30,43 @@ def custom_generate_unique_id(route: APIRoute):
 
 
 def get_application():
+    configure_logging()
+
     _app = FastAPI(
         title=settings.PROJECT_NAME,
         description=settings.PROJECT_DESCRIPTION,
         generate_unique_id_function=custom_generate_unique_id,
         root_path=settings.ROOT,
         root_path_in_servers=True,
+        lifespan=lifespan,
     )
 
     _app.include_router(api_router, prefix=settings.API_VERSION)
     _app.include_router(info_router, tags=[""])
 
+    # Only installed when enabled, so unprofiled deployments don't pay for it
+    if settings.PROFILE_TOKEN or settings.PROFILE_SAMPLE_RATE:
+        _app.add_middleware(
+            ProfilingMiddleware,
+            token=settings.PROFILE_TOKEN,
+            sample_rate=settings.PROFILE_SAMPLE_RATE,
+            interval_ms=settings.PROFILE_INTERVAL_MS,
+            directory=settings.PROFILE_DIR,
+        )
+
+    # Outside the profiler and the routes, so replayed retries skip both
+    _app.add_middleware(
+        IdempotencyMiddleware,
+        store=IdempotencyStore(
+            ttl=settings.IDEMPOTENCY_TTL, max_keys=settings.IDEMPOTENCY_MAX_KEYS, shared=get_shared_cache()
+        ),
+    )
+
+    # So everything below (including the profiler) logs with the request ID
+    _app.add_middleware(RequestIDMiddleware)
+
+    # Outermost, so preflights are answered and every response (replays and
+    # rejections from the middleware above included) gets the CORS headers
     _app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -0,0 +1,3 @@
+from .idempotency import IdempotencyMiddleware, IdempotencyStore
+from .profiling import ProfilingMiddleware
+from .request_id import RequestIDMiddleware
@@ -0,0 +1,277 @@
+"""Idempotency keys for create and processing requests
+
+A client that may retry a request (a create, or a processing trigger that runs
+the LLM) sends an `Idempotency-Key` header with a unique value. Only POST, PUT,
+PATCH and DELETE requests are intercepted; other methods are passed through
+with the header ignored, so reads are never replayed. The first
+successful response for a key is stored for IDEMPOTENCY_TTL seconds and
+replayed, with an `Idempotent-Replayed: true` header, for any retry. A retry
+that arrives while the first request is still running waits for it and gets
+the same response, so the work is done once however many times it is retried.
+
+Keys are scoped to the caller's credentials, and a key reused for a different
+request (method, path, query or body) is rejected with 422. Only 2xx responses
+are stored; anything else leaves the key free, so a failed request can be
+retried for real.
+
+With the shared cache tier configured, stored responses are also replayed for
+retries that reach another worker, and a running request is marked there too:
+a retry on another worker polls for the stored response until the request
+finishes or its mark expires (after `running_ttl` seconds, in case the worker
+died), then runs only if nothing was stored.
+"""
+import asyncio
+import hashlib
+import struct
+import time
+from typing import Callable, NamedTuple, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.services.cache import Cache, LocalCache, SharedCache
+
+HEADER = b"idempotency-key"
+METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_KEY_LENGTH = 255
+# Larger responses are passed through but not stored
+MAX_STORED_BODY = 1024 * 1024
+
+
+class StoredResponse(NamedTuple):
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+class RecordCodec:
+    """Packs a (fingerprint, StoredResponse) record as binary, for the cache
+
+    A 64-character fingerprint, the status, the header count, each header as
+    two length-prefixed byte strings, then the body.
+    """
+
+    HEAD = struct.Struct(">64sHH")
+    LENGTHS = struct.Struct(">HH")
+
+    def dumps(self, record: tuple[str, StoredResponse]) -> bytes:
+        fingerprint, response = record
+        parts = [self.HEAD.pack(fingerprint.encode(), response.status, len(response.headers))]
+        for name, value in response.headers:
+            parts += [self.LENGTHS.pack(len(name), len(value)), name, value]
+        parts.append(response.body)
+        return b"".join(parts)
+
+    def loads(self, data: bytes) -> tuple[str, StoredResponse]:
+        fingerprint, status, count = self.HEAD.unpack_from(data)
+        offset = self.HEAD.size
+        headers = []
+        for _ in range(count):
+            name_length, value_length = self.LENGTHS.unpack_from(data, offset)
+            offset += self.LENGTHS.size
+            headers.append((data[offset : offset + name_length], data[offset + name_length : offset + name_length + value_length]))
+            offset += name_length + value_length
+        return fingerprint.decode(), StoredResponse(status, headers, data[offset:])
+
+
+_record_codec = RecordCodec()
+
+
+class IdempotencyStore:
+    """Stored responses by key, with the requests currently running for a key
+
+    Records expire `ttl` seconds after they are stored; past `max_keys` records
+    in this process the oldest are evicted first. With a `shared` cache tier,
+    records are stored there too, so every worker can replay them, and running
+    requests are marked there for at most `running_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float,
+        max_keys: int,
+        clock: Callable[[], float] = time.monotonic,
+        shared: Optional[SharedCache] = None,
+        running_ttl: float = 120,
+        poll_interval: float = 0.1,
+    ):
+        self.ttl = ttl
+        self.shared = shared
+        self.running_ttl = running_ttl
+        self.poll_interval = poll_interval
+        self._records = Cache(LocalCache(max_entries=max_keys, clock=clock), shared)
+        self._in_flight: dict[str, tuple[str, asyncio.Future]] = {}
+
+    async def get(self, key: str) -> Optional[tuple[str, StoredResponse]]:
+        """Returns the request fingerprint and response stored for a key, if any"""
+        return await self._records.get(f"idempotency:{key}", _record_codec)
+
+    async def put(self, key: str, fingerprint: str, response: StoredResponse) -> None:
+        await self._records.set(
+            f"idempotency:{key}", (fingerprint, response), ttl=self.ttl, codec=_record_codec, immutable=True
+        )
+
+    def in_flight(self, key: str) -> Optional[tuple[str, asyncio.Future]]:
+        """Returns the fingerprint of the request running for a key and a future set when it finishes"""
+        return self._in_flight.get(key)
+
+    async def running_elsewhere(self, key: str) -> Optional[str]:
+        """Returns the fingerprint of the request another worker is running for a key, if any"""
+        if self.shared is None:
+            return None
+        data = await self.shared.get(f"idempotency:{key}:running")
+        return None if data is None else data.decode()
+
+    async def begin(self, key: str, fingerprint: str) -> bool:
+        """Marks a request as running for a key; False if another worker is already running one"""
+        done = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = (fingerprint, done)
+        if self.shared is None or await self.shared.add(
+            f"idempotency:{key}:running", fingerprint.encode(), self.running_ttl
+        ):
+            return True
+        del self._in_flight[key]
+        done.set_result(None)
+        return False
+
+    async def finish(self, key: str, fingerprint: str, response: Optional[StoredResponse]) -> None:
+        """Stores the response (if any) and wakes the requests waiting on the key"""
+        try:
+            if response is not None:
+                await self.put(key, fingerprint, response)
+        finally:
+            _, done = self._in_flight.pop(key)
+            done.set_result(None)
+            if self.shared is not None:
+                await self.shared.delete(f"idempotency:{key}:running")
+
+
+class IdempotencyMiddleware:
+    """Replays the stored response for requests that carry a known `Idempotency-Key`"""
+
+    def __init__(self, app: ASGIApp, *, store: IdempotencyStore):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in METHODS:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(HEADER)
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await JSONResponse(
+                {"detail": f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"}, status_code=400
+            )(scope, receive, send)
+            return
+
+        body, receive = await _buffer_body(receive)
+        # Scoped to the credentials, so one client can't replay another's responses
+        key = _digest(headers.get(b"authorization", b""), idempotency_key)
+        fingerprint = _digest(scope["method"].encode(), scope["path"].encode(), scope["query_string"], body)
+
+        while True:
+            record = await self.store.get(key)
+            if record is not None:
+                if record[0] != fingerprint:
+                    await _reused(scope, receive, send)
+                else:
+                    await _replay(record[1], send)
+                return
+            pending = self.store.in_flight(key)
+            if pending is not None:
+                if pending[0] != fingerprint:
+                    await _reused(scope, receive, send)
+                    return
+                # A retry of a request that is still running: wait for its response. If it
+                # isn't stored (the request failed), the next pass runs this one instead.
+                await asyncio.shield(pending[1])
+                continue
+            if await self.store.begin(key, fingerprint):
+                break
+            # Running on another worker: poll for its response the same way
+            running = await self.store.running_elsewhere(key)
+            if running is not None and running != fingerprint:
+                await _reused(scope, receive, send)
+                return
+            await asyncio.sleep(self.store.poll_interval)
+
+        status = 500
+        response_headers: list[tuple[bytes, bytes]] = []
+        chunks: Optional[list[bytes]] = []
+        size = 0
+        complete = False
+
+        async def capture(message: Message) -> None:
+            nonlocal status, response_headers, chunks, size, complete
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body" and chunks is not None:
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if size > MAX_STORED_BODY:
+                    chunks = None
+                else:
+                    chunks.append(chunk)
+                complete = not message.get("more_body", False)
+            await send(message)
+
+        response = None
+        try:
+            await self.app(scope, receive, capture)
+            if 200 <= status < 300 and complete and chunks is not None:
+                response = StoredResponse(status, response_headers, b"".join(chunks))
+        finally:
+            await self.store.finish(key, fingerprint, response)
+
+
+def _digest(*parts: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+async def _buffer_body(receive: Receive) -> tuple[bytes, Receive]:
+    """Reads the whole request body, returning it with a receive that hands it to the app"""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    body = b"".join(chunks)
+    sent = False
+
+    async def replay_receive() -> Message:
+        nonlocal sent
+        if sent:
+            return await receive()
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return body, replay_receive
+
+
+async def _reused(scope: Scope, receive: Receive, send: Send) -> None:
+    response = JSONResponse({"detail": "Idempotency-Key was already used for a different request"}, status_code=422)
+    await response(scope, receive, send)
+
+
+async def _replay(response: StoredResponse, send: Send) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": response.status,
+            "headers": [*response.headers, (b"idempotent-replayed", b"true")],
+        }
+    )
+    await send({"type": "http.response.body", "body": response.body})
@@ -0,0 +1,164 @@
+"""Sampling profiler for individual requests
+
+A request is profiled when it carries the profiling token (the `X-Profile`
+header or a `profile` query parameter) or is picked at random at
+PROFILE_SAMPLE_RATE. While profiled requests are in flight, one background
+thread samples the event loop thread's stack every PROFILE_INTERVAL_MS and
+keeps the samples that fall inside a profiled request. The middleware is only
+installed when profiling is configured, so it costs nothing otherwise.
+
+Profiles are written to PROFILE_DIR in folded-stack format ("frame;frame;frame
+count" per line), which flamegraph.pl, speedscope and inferno read directly; the
+file name is returned in the `X-Profile-Id` response header. Samples taken while
+the request was suspended (awaiting the database or the LLM, or queued behind
+other requests) are counted under a "(waiting)" frame, so the graph also shows
+where wall-clock time went.
+"""
+import asyncio
+import hmac
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Optional
+from urllib.parse import parse_qs
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+WAITING = "(waiting)"
+
+
+class Profile:
+    __slots__ = ("root", "frame", "thread_id", "samples")
+
+    def __init__(self, root: str, frame: FrameType, thread_id: int):
+        self.root = root
+        self.frame = frame
+        self.thread_id = thread_id
+        self.samples: Counter[tuple[str, ...]] = Counter()
+
+    def folded(self) -> str:
+        return "".join(f"{';'.join((self.root, *stack))} {count}\n" for stack, count in self.samples.most_common())
+
+
+class Sampler:
+    """Samples the stacks of active profiles from a background thread
+
+    The thread only runs while at least one profile is active.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._profiles: set[Profile] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._labels: dict[CodeType, str] = {}
+
+    def start(self, root: str, frame: FrameType) -> Profile:
+        profile = Profile(root, frame, threading.get_ident())
+        with self._lock:
+            self._profiles.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def stop(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.discard(profile)
+
+    def _label(self, frame: FrameType) -> str:
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = self._labels[code] = f"{frame.f_globals.get('__name__', '?')}:{name}"
+        return label
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+                profiles = list(self._profiles)
+            frames = sys._current_frames()
+            for profile in profiles:
+                self._sample(profile, frames.get(profile.thread_id))
+            del frames
+            time.sleep(self.interval)
+
+    def _sample(self, profile: Profile, frame: Optional[FrameType]) -> None:
+        stack = []
+        # Walk up from the running frame; the request is on-CPU if we reach its root frame
+        while frame is not None and frame is not profile.frame:
+            stack.append(frame)
+            frame = frame.f_back
+        if frame is None:
+            profile.samples[(WAITING,)] += 1
+        else:
+            profile.samples[tuple(self._label(f) for f in reversed(stack))] += 1
+
+
+class ProfilingMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        token: str = "",
+        sample_rate: float = 0.0,
+        interval_ms: float = 5.0,
+        directory: str = "profiles",
+    ):
+        """Profiles requests that carry `token` or are sampled at `sample_rate`
+
+        Args:
+            app (ASGIApp): The wrapped application
+            token (str, optional): Secret enabling on-demand profiling; empty disables it. Defaults to "".
+            sample_rate (float, optional): Fraction of all requests to profile. Defaults to 0.0.
+            interval_ms (float, optional): Time between stack samples. Defaults to 5.0.
+            directory (str, optional): Where profiles are written. Defaults to "profiles".
+        """
+        self.app = app
+        self.token = token.encode()
+        self.sample_rate = sample_rate
+        self.directory = Path(directory)
+        self.sampler = Sampler(interval_ms / 1000)
+
+    def _requested(self, scope: Scope) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if not self.token:
+            return False
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                return hmac.compare_digest(value, self.token)
+        values = parse_qs(scope.get("query_string", b"").decode()).get("profile")
+        return bool(values) and hmac.compare_digest(values[0].encode(), self.token)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        profile = self.sampler.start(f"{scope['method']} {scope['path']}", sys._getframe())
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            self.sampler.stop(profile)
+            await asyncio.to_thread(self._write, profile_id, profile)
+
+    def _write(self, profile_id: str, profile: Profile) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / f"{profile_id}.folded").write_text(profile.folded())
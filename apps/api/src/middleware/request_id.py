@@ -0,0 +1,50 @@
+import logging
+import time
+import uuid
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..log import request_id
+
+logger = logging.getLogger("src.access")
+
+
+class RequestIDMiddleware:
+    """Tags each request with an ID for its log records and logs one access line
+
+    The ID is taken from an incoming `X-Request-ID` header (so it can be traced
+    across services) or generated, and is echoed in the response.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rid = next((value.decode() for name, value in scope["headers"] if name == b"x-request-id"), None)
+        rid = rid[:64] if rid else uuid.uuid4().hex
+        token = request_id.set(rid)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", rid.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            logger.info(
+                "%s %s %s",
+                scope["method"],
+                scope["path"],
+                status,
+                extra={"status": status, "duration_ms": round((time.perf_counter() - start) * 1000, 2)},
+            )
+            request_id.reset(token)
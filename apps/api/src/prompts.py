@@ -0,0 +1,488 @@
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Mapping, Optional
+
+# Prompts and response schemas used for every LLM call, defined once at import
+# time. Each prompt has an id and a version; bump the version whenever the
+# wording, model or schema changes so cache keys and stored results built on
+# `Prompt.key` / `Prompt.fingerprint` stop matching the old output.
+
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+@dataclass(frozen=True)
+class Prompt:
+    """A versioned chat prompt with its static request parts pre-serialized
+
+    Args:
+        id (str): Registry id, e.g. "mindmap.generate"
+        version (int): Bumped whenever the prompt's output would change
+        model (str): OpenRouter model id
+        user (str): User message template, filled with str.format
+        system (Optional[str], optional): Static system message. Defaults to None.
+        response_format (Optional[dict], optional): Structured output format. Defaults to None.
+    """
+
+    id: str
+    version: int
+    model: str
+    user: str
+    system: Optional[str] = None
+    response_format: Optional[dict] = None
+    key: str = field(init=False)
+    fingerprint: str = field(init=False)
+    _head: bytes = field(init=False, repr=False)
+    _response_format: bytes = field(init=False, repr=False)
+
+    def __post_init__(self):
+        set_ = object.__setattr__
+        set_(self, "key", f"{self.id}@v{self.version}")
+        messages = [{"role": "system", "content": self.system}] if self.system else []
+        # Everything before the user message, e.g. {"model":"...","messages":[{system},
+        head = _dumps({"model": self.model})[:-1] + b',"messages":[' + b"".join(_dumps(m) + b"," for m in messages)
+        set_(self, "_head", head)
+        set_(self, "_response_format", _dumps(self.response_format) if self.response_format else b"")
+        digest = hashlib.blake2b(head + self.user.encode() + self._response_format, digest_size=8)
+        set_(self, "fingerprint", f"{self.key}:{digest.hexdigest()}")
+
+    def render(self, variables: Mapping[str, Any]) -> str:
+        """Fills in the user message template"""
+        return self.user.format(**variables)
+
+    def messages(self, variables: Mapping[str, Any]) -> list[dict[str, str]]:
+        messages = [{"role": "system", "content": self.system}] if self.system else []
+        return messages + [{"role": "user", "content": self.render(variables)}]
+
+    def payload(
+        self,
+        variables: Mapping[str, Any],
+        *,
+        stream: bool = False,
+        response_format: Optional[bytes] = None,
+    ) -> bytes:
+        """Builds the chat completions request body
+
+        Only the user message is serialized per call; the model, system message
+        and response format were serialized when the prompt was defined.
+
+        Args:
+            variables (Mapping[str, Any]): Values for the user message template
+            stream (bool, optional): Request a streamed response. Defaults to False.
+            response_format (Optional[bytes], optional): Pre-serialized format overriding the prompt's. Defaults to None.
+
+        Returns:
+            bytes: JSON request body
+        """
+        body = self._head + _dumps({"role": "user", "content": self.render(variables)}) + b"]"
+        response_format = response_format or self._response_format
+        if response_format:
+            body += b',"response_format":' + response_format
+        if stream:
+            body += b',"stream":true'
+        return body + b"}"
+
+
+PROMPTS: dict[str, Prompt] = {}
+
+
+def register(prompt: Prompt) -> Prompt:
+    if prompt.id in PROMPTS:
+        raise ValueError(f"Prompt {prompt.id!r} is already registered")
+    PROMPTS[prompt.id] = prompt
+    return prompt
+
+
+def get_prompt(prompt_id: str) -> Prompt:
+    return PROMPTS[prompt_id]
+
+
+# Mindmap generation (POST /assessments/generate-mindmap)
+
+MINDMAP_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "topic": {
+            "type": "object",
+            "properties": {
+                "name": {
+                    "type": "string",
+                    "description": "Main topic name extracted from content"
+                },
+                "description": {
+                    "type": "string",
+                    "description": "Brief description of the topic (1-2 sentences)"
+                },
+                "subtopics": {
+                    "type": "array",
+                    "description": "Array of 3-5 key subtopics from the content",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": {
+                                "type": "string",
+                                "description": "Subtopic name"
+                            },
+                            "description": {
+                                "type": "string",
+                                "description": "Brief description of the subtopic (1-2 sentences)"
+                            },
+                            "subtopics": {
+                                "type": "array",
+                                "description": "Optional nested subtopics (maximum 2-3 per subtopic)",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "name": {
+                                            "type": "string",
+                                            "description": "Sub-subtopic name"
+                                        },
+                                        "description": {
+                                            "type": "string",
+                                            "description": "Brief description of the sub-subtopic (1 sentence)"
+                                        },
+                                        "subtopics": {
+                                            "type": "array",
+                                            "description": "Empty array as we only support 2 levels of nesting",
+                                            "items": {
+                                                "type": "object",
+                                                "properties": {},
+                                                "additionalProperties": False
+                                            }
+                                        }
+                                    },
+                                    "required": ["name", "description", "subtopics"],
+                                    "additionalProperties": False
+                                }
+                            }
+                        },
+                        "required": ["name", "description", "subtopics"],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["name", "description", "subtopics"],
+            "additionalProperties": False
+        }
+    },
+    "required": ["topic"],
+    "additionalProperties": False
+}
+
+
+MINDMAP_SYSTEM_PROMPT = """
+    Generate a mindmap from this educational content. The user will give you title,
+    description, and content. You will break apart info in the input overview into subtopics 
+    and sub-subtopics.
+
+    ALSO: If the user provides you syllabus text or policies, don't include that in the mindmap.
+    
+    IN SUM:
+    - Identify the main topic
+    - Extract 3-5 key subtopics
+    - Generate concise descriptions
+    - Create up to 2 levels of nesting
+    
+    Here's an example mindmap that you should follow:
+{
+  "topic": {
+    "name": "",
+    "description": "",
+    "assessmentCriteria": {
+      "excellentUnderstanding": [
+        "",
+        "",
+        ""
+      ],
+      "adequateUnderstanding": [
+        "",
+        ""
+      ],
+      "misconceptions": [
+        "",
+        "",
+        ""
+      ],
+      "tutorGuidance": ""
+    },
+    "subtopics": [
+      {
+        "name": "",
+        "description": "",
+        "assessmentCriteria": {
+          "excellentUnderstanding": [
+            "",
+            "",
+            ""
+          ],
+          "adequateUnderstanding": [
+            "",
+            ""
+          ],
+          "misconceptions": [
+            "",
+            "",
+            ""
+          ]
+        },
+        "subtopics": [
+          {
+            "name": "",
+            "description": ""
+          },
+          {
+            "name": "",
+            "description": ""
+          },
+          {
+            "name": "",
+            "description": ""
+          }
+        ]
+      },
+      {
+        "name": "",
+        "description": "",
+        "assessmentCriteria": {
+          "excellentUnderstanding": [
+            "",
+            "",
+            ""
+          ],
+          "adequateUnderstanding": [
+            "",
+            ""
+          ],
+          "misconceptions": [
+            "",
+            "",
+            ""
+          ]
+        },
+        "subtopics": [
+          {
+            "name": "",
+            "description": ""
+          },
+          {
+            "name": "",
+            "description": ""
+          },
+          {
+            "name": "",
+            "description": ""
+          }
+        ]
+      },
+      {
+        "name": "",
+        "description": "",
+        "assessmentCriteria": {
+          "excellentUnderstanding": [
+            "",
+            "",
+            ""
+          ],
+          "adequateUnderstanding": [
+            "",
+            ""
+          ],
+          "misconceptions": [
+            "",
+            "",
+            ""
+          ]
+        },
+        "subtopics": [
+          {
+            "name": "",
+            "description": ""
+          },
+          {
+            "name": "",
+            "description": ""
+          },
+          {
+            "name": "",
+            "description": ""
+          }
+        ]
+      },
+      {
+        "name": "",
+        "description": "",
+        "assessmentCriteria": {
+          "excellentUnderstanding": [
+            "",
+            "",
+            ""
+          ],
+          "adequateUnderstanding": [
+            "",
+            ""
+          ],
+          "misconceptions": [
+            "",
+            "",
+            ""
+          ]
+        },
+        "subtopics": [
+          {
+            "name": "",
+            "description": ""
+          },
+          {
+            "name": "",
+            "description": ""
+          },
+          {
+            "name": "",
+            "description": ""
+          }
+        ]
+      },
+      {
+        "name": "",
+        "description": "",
+        "assessmentCriteria": {
+          "excellentUnderstanding": [
+            "",
+            "",
+            ""
+          ],
+          "adequateUnderstanding": [
+            "",
+            ""
+          ],
+          "misconceptions": [
+            "",
+            "",
+            ""
+          ]
+        },
+        "subtopics": [
+          {
+            "name": "",
+            "description": ""
+          },
+          {
+            "name": "",
+            "description": ""
+          },
+          {
+            "name": "",
+            "description": ""
+          }
+        ]
+      }
+    ]
+  }
+}
+"""
+
+GENERATE_MINDMAP = register(
+    Prompt(
+        id="mindmap.generate",
+        version=1,
+        model="openai/gpt-4o",  # or any model that supports structured outputs
+        system=MINDMAP_SYSTEM_PROMPT,
+        user="Content: {text}",
+        response_format={
+            "type": "json_schema",
+            "json_schema": {
+                "name": "mindmap",
+                "strict": True,
+                "schema": MINDMAP_SCHEMA,
+            },
+        },
+    )
+)
+
+
+# Single result processing (GET /assessment-results/{id}/process)
+
+FILL_MINDMAP = register(
+    Prompt(
+        id="result.fill_mindmap",
+        version=1,
+        model="google/gemini-2.0-flash-001",
+        user=(
+            'Given this transcript of a student\'s interview with a teacher: "{transcript}"\n\n'
+            "Please analyze it and fill out the following template with relevant information. "
+            "You'll need to fill in the studentResponse and understandingLevel (1-5) fields for each "
+            "topic and subtopic.\n"
+            "Respond ONLY with the completed JSON template, maintaining the exact same structure:\n"
+            "{template}"
+        ),
+    )
+)
+
+RESULT_INSIGHTS = register(
+    Prompt(
+        id="result.insights",
+        version=1,
+        model="openai/gpt-4o",
+        user=(
+            "Based on this assessment data:\n"
+            "{mindmap}\n\n"
+            "Generate 3-5 specific, actionable insights for the teacher to help this student improve. "
+            "Each insight should be concrete and implementable. Format the response as a JSON array of strings."
+        ),
+    )
+)
+
+
+# Class insights map-reduce (GET /assessments/{id}/process)
+
+CLASS_MAP = register(
+    Prompt(
+        id="class.map",
+        version=1,
+        model="google/gemini-2.0-flash-001",
+        user="""You are an experienced educational analyst. Below are assessment results for a group of students from the same class, as one line per topic: the understanding level (1-5) and an excerpt of the student's answer.
+
+{students}
+
+Summarize this group in 3-5 short observations: shared strengths, shared gaps and recurring misconceptions. Refer to topics, not to individual students.
+
+IMPORTANT: Respond with ONLY a valid JSON array of strings.""",
+    )
+)
+
+CLASS_REDUCE = register(
+    Prompt(
+        id="class.reduce",
+        version=1,
+        model="google/gemini-2.0-flash-001",
+        user="""You are an experienced educational analyst. Below are observations about different groups of students from the same class.
+
+{summaries}
+
+Merge them into 3-5 observations that hold across the groups, keeping the most important strengths, gaps and misconceptions.
+
+IMPORTANT: Respond with ONLY a valid JSON array of strings.""",
+    )
+)
+
+CLASS_FINAL = register(
+    Prompt(
+        id="class.final",
+        version=1,
+        model="google/gemini-2.0-flash-001",
+        user="""You are an experienced educational analyst specializing in analyzing student assessments and providing actionable insights for teachers.
+
+Per-topic understanding levels (1-5) across the class:
+{summary}
+
+Observations from reading the students' answers:
+{observations}
+
+Generate 3-5 key insights that would be valuable for the teacher. Focus on patterns across students and topics, common strengths and gaps, and specific, actionable recommendations for the class as a whole.
+
+IMPORTANT: You must respond with ONLY a valid JSON array of strings. Example format:
+["Insight 1 text here", "Insight 2 text here", "Insight 3 text here"]""",
+    )
+)
@@ -1,5 +1,9 @@
 from .spell import Spell, SpellCreate, SpellSearchResults, SpellUpdate
-from .assessment import Assessment, AssessmentCreate, AssessmentUpdate
-from .assessment_result import AssessmentResult, AssessmentResultCreate, AssessmentResultUpdate
-from .student import Student, StudentCreate, StudentUpdate
-from .teacher import Teacher, TeacherCreate, TeacherUpdate
+from .assessment import Assessment, AssessmentCreate, AssessmentPatch, AssessmentUpdate
+from .assessment_result import AssessmentResult, AssessmentResultCreate, AssessmentResultPatch, AssessmentResultUpdate
+from .student import Student, StudentCreate, StudentPatch, StudentUpdate
+from .teacher import Teacher, TeacherCreate, TeacherPatch, TeacherUpdate
+from .assessment_stats import AssessmentStats, AssessmentStatsCreate, AssessmentStatsUpdate, NodeStats
+from .transcript_segment import Transcript, TranscriptSegment, TranscriptSegmentCreate, TranscriptSegmentIn, TranscriptSegmentUpdate
+from .assignment import Assignment, AssignmentChange, AssignmentCreate, AssignmentRequest, AssignmentUpdate
+from .dashboard import AssessmentSummary, TeacherDashboard
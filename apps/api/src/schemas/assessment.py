@@ -1,6 +1,6 @@
 from typing import Optional, ClassVar
 
-from .base import CreateBase, ResponseBase, UpdateBase
+from .base import CreateBase, PatchBase, ResponseBase, UpdateBase
 
 class AssessmentBase(CreateBase):
     name: str
@@ -17,5 +17,14 @@ class AssessmentCreate(AssessmentBase):
 class AssessmentUpdate(AssessmentBase, UpdateBase):
     pass
 
+class AssessmentPatch(PatchBase):
+    name: Optional[str] = None
+    first_question: Optional[str] = None
+    system_prompt: Optional[str] = None
+    mindmap_template: Optional[str] = None
+    teacher_id: Optional[int] = None
+    student_id: Optional[int] = None
+    required: ClassVar[frozenset[str]] = frozenset({"name", "first_question", "system_prompt", "mindmap_template"})
+
 class Assessment(AssessmentBase, ResponseBase):
     pass 
\ No newline at end of file
@@ -1,6 +1,6 @@
 from typing import Optional, ClassVar
 
-from .base import CreateBase, ResponseBase, UpdateBase
+from .base import CreateBase, PatchBase, ResponseBase, UpdateBase
 
 class AssessmentResultBase(CreateBase):
     assessment_id: int
@@ -18,6 +18,16 @@ class AssessmentResultCreate(AssessmentResultBase):
 class AssessmentResultUpdate(AssessmentResultBase, UpdateBase):
     pass
 
+class AssessmentResultPatch(PatchBase):
+    assessment_id: Optional[int] = None
+    teacher_id: Optional[int] = None
+    student_id: Optional[int] = None
+    voice_recording_id: Optional[int] = None
+    transcript: Optional[str] = None
+    mindmap: Optional[str] = None
+    insights: Optional[str] = None
+    required: ClassVar[frozenset[str]] = frozenset({"assessment_id", "teacher_id", "student_id"})
+
 class AssessmentResultResponse(AssessmentResultBase, ResponseBase):
     model_config = {
         "json_schema_extra": {
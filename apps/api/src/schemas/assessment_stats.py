@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import ClassVar, Optional
+
+from pydantic import BaseModel, Field, computed_field, field_serializer
+
+from .base import CreateBase, ResponseBase, UpdateBase
+
+
+class NodeStats(BaseModel):
+    """Running understandingLevel totals for one mindmap node"""
+
+    sum: float = 0
+    count: int = 0
+    # Number of results at each understanding level, 1-5
+    histogram: list[int] = Field(default_factory=lambda: [0] * 5)
+
+
+class AssessmentStatsBase(CreateBase):
+    assessment_id: int
+    result_count: int = 0
+    processed_count: int = 0
+    # Keyed by node path, e.g. "Topic / Subtopic"
+    node_stats: dict[str, NodeStats] = Field(default_factory=dict)
+    # When a result of the assessment was last created, updated or processed
+    last_activity_at: Optional[datetime] = None
+    # Bumped on every write, so concurrent writers can tell they raced (see services/assessment_stats.py)
+    version: int = 0
+    table_name: ClassVar[str] = "AssessmentStats"
+
+    @field_serializer("last_activity_at")
+    def _serialize_last_activity_at(self, value: Optional[datetime]) -> Optional[str]:
+        # Written to the database as is, so as ISO text rather than a datetime
+        return value.isoformat() if value is not None else None
+
+    @property
+    def average_understanding(self) -> Optional[float]:
+        """Mean understanding level over every scored node of every processed result"""
+        count = sum(node.count for node in self.node_stats.values())
+        return round(sum(node.sum for node in self.node_stats.values()) / count, 2) if count else None
+
+class AssessmentStatsCreate(AssessmentStatsBase):
+    pass
+
+class AssessmentStatsUpdate(AssessmentStatsBase, UpdateBase):
+    pass
+
+class AssessmentStats(AssessmentStatsBase, ResponseBase):
+    @computed_field
+    @property
+    def node_means(self) -> dict[str, Optional[float]]:
+        return {
+            path: round(node.sum / node.count, 2) if node.count else None
+            for path, node in self.node_stats.items()
+        }
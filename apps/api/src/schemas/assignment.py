@@ -0,0 +1,34 @@
+from typing import ClassVar
+
+from pydantic import BaseModel, Field
+
+from .base import CreateBase, ResponseBase, UpdateBase
+
+
+class AssignmentBase(CreateBase):
+    student_id: int
+    assessment_id: int
+    table_name: ClassVar[str] = "Assignment"
+
+class AssignmentCreate(AssignmentBase):
+    pass
+
+class AssignmentUpdate(AssignmentBase, UpdateBase):
+    pass
+
+class Assignment(AssignmentBase, ResponseBase):
+    pass
+
+
+class AssignmentRequest(BaseModel):
+    """Students to assign an assessment to, or to unassign it from"""
+
+    student_ids: list[int] = Field(min_length=1)
+
+
+class AssignmentChange(BaseModel):
+    assessment_id: int
+    # Students whose assignment changed (the others already were, or weren't, assigned)
+    changed: list[int]
+    # Students assigned the assessment after the change
+    student_ids: list[int]
@@ -1,5 +1,5 @@
 from typing import ClassVar
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, model_validator
 from datetime import datetime
 
 # Shared properties
@@ -26,6 +26,31 @@ class UpdateBase(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+# Properties to receive on partial update (PATCH)
+# in
+class PatchBase(BaseModel):
+    """Base class for patch schemas: every field optional, only the fields sent are written
+
+    Fields listed in `required` are NOT NULL columns, so they may be left out but
+    not set to null.
+    """
+
+    required: ClassVar[frozenset[str]] = frozenset()
+
+    model_config = ConfigDict(from_attributes=True, extra="forbid")
+
+    @model_validator(mode="after")
+    def _check_required(self):
+        nulled = sorted(name for name in self.required & self.model_fields_set if getattr(self, name) is None)
+        if nulled:
+            raise ValueError(f"{', '.join(nulled)} can't be null")
+        return self
+
+    def changes(self) -> dict:
+        """The fields that were sent, as column values"""
+        return self.model_dump(exclude_unset=True)
+
+
 # response
 # Properties shared by models stored in DB
 class InDBBase(BaseModel):
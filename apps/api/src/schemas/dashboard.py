@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class AssessmentSummary(BaseModel):
+    """One assessment of a teacher's dashboard, with its results aggregated"""
+
+    id: int
+    name: str
+    created_at: datetime
+    # Students assigned the assessment
+    assigned_count: int
+    result_count: int
+    processed_count: int
+    unprocessed_count: int
+    # Mean understanding level (1-5) over the nodes of the processed results
+    average_understanding: Optional[float] = None
+    last_activity_at: Optional[datetime] = None
+
+
+class TeacherDashboard(BaseModel):
+    teacher_id: int
+    assessments: list[AssessmentSummary]
+    result_count: int
+    processed_count: int
+    unprocessed_count: int
+    last_activity_at: Optional[datetime] = None
@@ -1,6 +1,6 @@
-from typing import List, ClassVar
+from typing import List, ClassVar, Optional
 
-from .base import CreateBase, ResponseBase, UpdateBase
+from .base import CreateBase, PatchBase, ResponseBase, UpdateBase
 
 class StudentBase(CreateBase):
     name: str
@@ -13,5 +13,10 @@ class StudentCreate(StudentBase):
 class StudentUpdate(StudentBase, UpdateBase):
     pass
 
+class StudentPatch(PatchBase):
+    name: Optional[str] = None
+    assessment_ids: Optional[List[int]] = None
+    required: ClassVar[frozenset[str]] = frozenset({"name", "assessment_ids"})
+
 class Student(StudentBase, ResponseBase):
     pass 
\ No newline at end of file
@@ -1,5 +1,5 @@
-from typing import ClassVar
-from .base import CreateBase, ResponseBase, UpdateBase
+from typing import ClassVar, Optional
+from .base import CreateBase, PatchBase, ResponseBase, UpdateBase
 
 class TeacherBase(CreateBase):
     table_name: ClassVar[str] = "Teacher"
@@ -12,5 +12,9 @@ class TeacherCreate(TeacherBase):
 class TeacherUpdate(TeacherBase, UpdateBase):
     pass
 
+class TeacherPatch(PatchBase):
+    name: Optional[str] = None
+    required: ClassVar[frozenset[str]] = frozenset({"name"})
+
 class Teacher(TeacherBase, ResponseBase):
     pass 
\ No newline at end of file
@@ -0,0 +1,35 @@
+from typing import ClassVar
+
+from pydantic import BaseModel, Field
+
+from .base import CreateBase, ResponseBase, UpdateBase
+
+
+class TranscriptSegmentIn(BaseModel):
+    """One utterance of a live interview, as sent by the client"""
+
+    speaker: str
+    # Milliseconds since the start of the interview
+    offset_ms: int = Field(ge=0)
+    text: str
+
+
+class TranscriptSegmentBase(TranscriptSegmentIn, CreateBase):
+    result_id: int
+    table_name: ClassVar[str] = "TranscriptSegment"
+
+class TranscriptSegmentCreate(TranscriptSegmentBase):
+    pass
+
+class TranscriptSegmentUpdate(TranscriptSegmentBase, UpdateBase):
+    pass
+
+class TranscriptSegment(TranscriptSegmentBase, ResponseBase):
+    pass
+
+
+class Transcript(BaseModel):
+    result_id: int
+    transcript: str
+    # Segments not yet folded into the result's transcript column
+    pending_segments: int
@@ -0,0 +1,155 @@
+import asyncio
+import math
+import time
+from typing import Callable, Optional
+
+from ..config import settings
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request can't be admitted within the wait limits"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Too many requests, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of refusing
+
+    Taking a token when the bucket is empty drives it negative; the deficit over
+    the refill rate is how long the caller has to wait for its token. A rate of
+    0 or less means unlimited.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = self.burst
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        """Takes a token and returns the delay until it is actually available"""
+        if self.rate <= 0:
+            return 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return max(-self.tokens / self.rate, 0.0)
+
+    def refund(self) -> None:
+        self.tokens = min(self.burst, self.tokens + 1)
+
+
+class AdmissionController:
+    """Admits requests through a global and a per-client token bucket
+
+    Clients are told apart by a key, e.g. their IP address (every client shares
+    the one API key). Past `max_keys` clients, buckets that have refilled are
+    dropped, as a fresh bucket for the client would be the same.
+
+    A request that can't be admitted immediately waits for its tokens, as long
+    as fewer than `queue_size` requests are already waiting and the wait is at
+    most `max_wait` seconds. Otherwise it is rejected straight away with the
+    time after which a retry would likely be admitted, so admitted requests
+    keep a bounded queueing delay under a spike.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: float,
+        burst: float,
+        key_rate: float,
+        key_burst: float,
+        queue_size: int,
+        max_wait: float,
+        max_keys: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.key_rate = key_rate
+        self.key_burst = key_burst
+        self.max_keys = max_keys
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.clock = clock
+        self.bucket = TokenBucket(rate, burst, clock())
+        self.key_buckets: dict[str, TokenBucket] = {}
+        self.waiting = 0
+
+    def _key_bucket(self, key: str, now: float) -> TokenBucket:
+        bucket = self.key_buckets.get(key)
+        if bucket is None:
+            if len(self.key_buckets) >= self.max_keys:
+                self._prune(now)
+            bucket = self.key_buckets[key] = TokenBucket(self.key_rate, self.key_burst, now)
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        """Drops the buckets that have refilled, or failing that the oldest half"""
+        full = [
+            key
+            for key, bucket in self.key_buckets.items()
+            if bucket.rate <= 0 or bucket.tokens + (now - bucket.updated) * bucket.rate >= bucket.burst
+        ]
+        for key in full or list(self.key_buckets)[: len(self.key_buckets) // 2]:
+            del self.key_buckets[key]
+
+    def reserve(self, key: str) -> float:
+        """Reserves tokens for a request and returns how long it must wait
+
+        Raises:
+            AdmissionRejected: If the wait queue is full or the wait would be too long
+        """
+        now = self.clock()
+        buckets = (self.bucket, self._key_bucket(key, now))
+        delay = max(bucket.reserve(now) for bucket in buckets)
+        if delay > 0 and (self.waiting >= self.queue_size or delay > self.max_wait):
+            for bucket in buckets:
+                bucket.refund()
+            raise AdmissionRejected(delay)
+        return delay
+
+    async def admit(self, key: str) -> None:
+        """Waits until the request may proceed
+
+        Raises:
+            AdmissionRejected: If the request is shed instead
+        """
+        delay = self.reserve(key)
+        if delay <= 0:
+            return
+        self.waiting += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            # The client went away while queued; give its tokens back
+            self.bucket.refund()
+            self._key_bucket(key, self.clock()).refund()
+            raise
+        finally:
+            self.waiting -= 1
+
+
+def retry_after_header(seconds: float) -> dict[str, str]:
+    return {"Retry-After": str(max(math.ceil(seconds), 1))}
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_controller() -> AdmissionController:
+    """Returns the process-wide controller for LLM-backed requests, configured from settings"""
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController(
+            rate=settings.LLM_ADMISSION_RATE,
+            burst=settings.LLM_ADMISSION_BURST,
+            key_rate=settings.LLM_ADMISSION_KEY_RATE,
+            key_burst=settings.LLM_ADMISSION_KEY_BURST,
+            queue_size=settings.LLM_ADMISSION_QUEUE_SIZE,
+            max_wait=settings.LLM_ADMISSION_MAX_WAIT,
+        )
+    return _controller
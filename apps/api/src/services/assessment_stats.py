@@ -0,0 +1,114 @@
+"""Per-assessment statistics, kept up to date as results change
+
+result_count and processed_count are kept by triggers on "AssessmentResult"
+(supabase/migrations/20261019000700_assessment_stats_counts.sql), so results the
+web app writes straight through Supabase are counted as well. The per-node
+understanding totals need the parsed mindmap and are maintained here, from the
+changes made through the API; /process fills the mindmap of every result.
+
+Several workers may change results of the same assessment at once, so the
+stats row is never overwritten blindly: each change is applied to the row as
+read and written back only if its version is unchanged (a compare-and-set).
+A writer that loses re-reads the row and applies its change again. If it keeps
+losing, the row is dropped and rebuilt from the results on its next read.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Union
+
+from ..storage import StorageBackend
+
+from ..crud.assessment_stats import assessment_stats
+from ..schemas.assessment_result import AssessmentResult
+from ..schemas.assessment_stats import AssessmentStats, AssessmentStatsCreate, AssessmentStatsUpdate, NodeStats
+from .mindmap_tree import MindmapTree
+
+# Compare-and-set attempts before a contended stats row is dropped, to be rebuilt
+MAX_ATTEMPTS = 5
+
+logger = logging.getLogger(__name__)
+
+
+def _apply(stats: Union[AssessmentStats, AssessmentStatsCreate], result: AssessmentResult, sign: int) -> None:
+    """Adds (sign=1) or removes (sign=-1) one result's contribution to the node stats"""
+    tree = MindmapTree.loads(result.mindmap) if result.mindmap else None
+    if tree is None:
+        return
+    for path, level in zip(tree.paths, tree.scores.tolist()):
+        if level != level:  # NaN, level not set
+            continue
+        node = stats.node_stats.setdefault(path, NodeStats())
+        node.sum += sign * level
+        node.count += sign
+        node.histogram[int(round(level)) - 1] += sign
+        if node.count <= 0:
+            del stats.node_stats[path]
+
+
+# The result columns the stats are computed from
+STATS_COLUMNS = ["id", "created_at", "assessment_id", "teacher_id", "student_id", "mindmap"]
+
+
+def stats_from_results(assessment_id: int, records: list[dict]) -> AssessmentStatsCreate:
+    """Computes an assessment's stats from its result rows (with at least STATS_COLUMNS)"""
+    stats = AssessmentStatsCreate(assessment_id=assessment_id)
+    for record in records:
+        result = AssessmentResult(**record)
+        # Counted as the triggers count them: processed once the mindmap is set
+        stats.result_count += 1
+        stats.processed_count += bool(result.mindmap)
+        _apply(stats, result, 1)
+        if stats.last_activity_at is None or result.created_at > stats.last_activity_at:
+            stats.last_activity_at = result.created_at
+    return stats
+
+
+async def rebuild_stats(db: StorageBackend, assessment_id: int) -> AssessmentStatsCreate:
+    """Recomputes an assessment's stats from all of its results"""
+    # Everything but the transcript, which the stats don't use
+    records = await db.select(AssessmentResult.table_name, columns=STATS_COLUMNS, where={"assessment_id": assessment_id})
+    return stats_from_results(assessment_id, records)
+
+
+async def get_stats(db: StorageBackend, assessment_id: int) -> AssessmentStats:
+    """Returns the stored stats, building them once from the results if missing"""
+    stats = await assessment_stats.get_by_assessment(db, assessment_id=assessment_id)
+    if stats is not None:
+        return stats
+    created = await assessment_stats.create_if_missing(db, obj_in=await rebuild_stats(db, assessment_id))
+    # None when another request built them first
+    return created or await assessment_stats.get_by_assessment(db, assessment_id=assessment_id)
+
+
+async def record_result_change(
+    db: StorageBackend,
+    *,
+    old: Optional[AssessmentResult] = None,
+    new: Optional[AssessmentResult] = None,
+) -> None:
+    """Updates the node stats for a created (old=None), updated or processed result
+
+    The counts were already updated by the database when the result was written.
+    Only the difference between the old and new version of the result is applied,
+    so the cost doesn't depend on how many results the assessment has.
+    """
+    assessment_id = (new or old).assessment_id
+    for _ in range(MAX_ATTEMPTS):
+        stats = await assessment_stats.get_by_assessment(db, assessment_id=assessment_id)
+        if stats is None:
+            # First change since the stats were introduced: the rebuild already includes it
+            if await assessment_stats.create_if_missing(db, obj_in=await rebuild_stats(db, assessment_id)):
+                return
+            continue
+        if old is not None:
+            _apply(stats, old, -1)
+        if new is not None:
+            _apply(stats, new, 1)
+        stats.last_activity_at = datetime.now(timezone.utc)
+        updated = await assessment_stats.update_if_unchanged(
+            db, obj_in=AssessmentStatsUpdate(**stats.model_dump(exclude={"created_at"}))
+        )
+        if updated is not None:
+            return
+    logger.warning("Assessment stats contended, dropping them to be rebuilt", extra={"assessment_id": assessment_id})
+    await assessment_stats.delete_by_assessment(db, assessment_id=assessment_id)
@@ -0,0 +1,156 @@
+"""Assessment assignments, indexed both ways
+
+A student's assignments are its Student.assessment_ids array. The Assignment
+table holds one (student_id, assessment_id) row per entry, indexed on both
+columns, so "which assessments does this student have" and "which students
+have this assessment" are both index lookups rather than a Student table scan.
+
+The database keeps the table in step with the array, with triggers on
+"Student" that run in the same transaction as the write
+(supabase/migrations/20261019000800_student_assignments_trigger.sql), so
+students written straight through Supabase (the web app) or by the importer
+are indexed too. The writes of assessment_ids made by the API go through this
+module: student create and PATCH, the bulk assign / unassign endpoints and
+deleting an assessment.
+
+Several writers may change a student's assessment_ids at once, so the API
+never overwrites the array blindly: each change is applied to the array as
+read and written back only if the row's version is unchanged (a
+compare-and-set), and a writer that loses re-reads the row and tries again.
+The triggers bump the version of writes that don't, so the API also retries
+over the web app's. Assessment ids are checked before anything is written.
+"""
+import asyncio
+from typing import Iterable, Union
+
+from ..crud.assessment import assessment
+from ..crud.assignment import assignment
+from ..crud.student import student
+from ..schemas.student import Student, StudentCreate, StudentPatch
+from ..storage import StorageBackend
+
+# Compare-and-set attempts before a change to a contended student is given up
+MAX_ATTEMPTS = 5
+
+
+class UnknownStudents(LookupError):
+    """Raised when an assignment names students that don't exist"""
+
+    def __init__(self, student_ids: list[int]):
+        super().__init__(f"Students not found: {', '.join(map(str, student_ids))}")
+        self.student_ids = student_ids
+
+
+class UnknownAssessments(LookupError):
+    """Raised when a student is given assessments that don't exist"""
+
+    def __init__(self, assessment_ids: list[int]):
+        super().__init__(f"Assessments not found: {', '.join(map(str, assessment_ids))}")
+        self.assessment_ids = assessment_ids
+
+
+class ConcurrentChange(RuntimeError):
+    """Raised when a student kept changing under a change for MAX_ATTEMPTS attempts"""
+
+    def __init__(self, student_id: int):
+        super().__init__(f"Student {student_id} is being changed concurrently, try again")
+        self.student_id = student_id
+
+
+async def _check_assessments(db: StorageBackend, assessment_ids: Iterable[int]) -> None:
+    assessment_ids = list(dict.fromkeys(assessment_ids))
+    existing = await assessment.existing_ids(db, ids=assessment_ids)
+    missing = [a for a in assessment_ids if a not in existing]
+    if missing:
+        raise UnknownAssessments(missing)
+
+
+async def create_student(db: StorageBackend, *, obj_in: StudentCreate) -> Student:
+    """Creates a student, which the database indexes the assignments of
+
+    Raises:
+        UnknownAssessments: If any of the assessments doesn't exist; nothing is written
+    """
+    await _check_assessments(db, obj_in.assessment_ids)
+    return await student.create(db, obj_in=obj_in)
+
+
+async def patch_student(
+    db: StorageBackend, *, id: int, obj_in: StudentPatch, returning: bool = True
+) -> Union[Student, bool, None]:
+    """Patches a student, updating its assignments if assessment_ids was sent
+
+    Returns what crud.student.patch does: the student, or whether it exists if not `returning`.
+
+    Raises:
+        UnknownAssessments: If any of the assessments sent doesn't exist; nothing is written
+        ConcurrentChange: If the student kept changing under the patch
+    """
+    if "assessment_ids" not in obj_in.model_fields_set:
+        return await student.patch(db, id=id, obj_in=obj_in, returning=returning)
+    await _check_assessments(db, obj_in.assessment_ids)
+    for _ in range(MAX_ATTEMPTS):
+        # Read past the cache, which may hold another worker's older copy
+        rows = await db.select(student.model.table_name, columns=["version"], where={"id": id})
+        if not rows:
+            return None if returning else False
+        patched = await student.patch_if_unchanged(
+            db, id=id, obj_in=obj_in, version=rows[0]["version"], returning=returning
+        )
+        if patched:
+            return patched
+    raise ConcurrentChange(id)
+
+
+async def _change_one(db: StorageBackend, assessment_id: int, row: dict, assign: bool) -> bool:
+    """Adds or removes the assessment from one student's row as read, returning whether it changed"""
+    for _ in range(MAX_ATTEMPTS):
+        old_ids = row["assessment_ids"]
+        if (assessment_id in old_ids) == assign:
+            return False
+        new_ids = [*old_ids, assessment_id] if assign else [a for a in old_ids if a != assessment_id]
+        if await student.patch_if_unchanged(
+            db, id=row["id"], obj_in=StudentPatch(assessment_ids=new_ids), version=row["version"], returning=False
+        ):
+            return True
+        rows = await db.select(student.model.table_name, columns=["id", "assessment_ids", "version"], where={"id": row["id"]})
+        if not rows:
+            return False
+        row = rows[0]
+    raise ConcurrentChange(row["id"])
+
+
+async def _change(db: StorageBackend, assessment_id: int, student_ids: list[int], assign: bool) -> list[int]:
+    student_ids = sorted(set(student_ids))
+    rows = await db.select(student.model.table_name, columns=["id", "assessment_ids", "version"], where={"id": student_ids})
+    missing = sorted(set(student_ids) - {row["id"] for row in rows})
+    if missing:
+        raise UnknownStudents(missing)
+    changed = await asyncio.gather(*(_change_one(db, assessment_id, row, assign) for row in rows))
+    return [row["id"] for row, was_changed in zip(rows, changed) if was_changed]
+
+
+async def assign(db: StorageBackend, assessment_id: int, student_ids: list[int]) -> list[int]:
+    """Assigns an assessment to students, returning those that didn't have it yet
+
+    Raises:
+        UnknownStudents: If any of the students doesn't exist; nothing is changed
+        ConcurrentChange: If one of the students kept changing under the change
+    """
+    return await _change(db, assessment_id, student_ids, assign=True)
+
+
+async def unassign(db: StorageBackend, assessment_id: int, student_ids: list[int]) -> list[int]:
+    """Unassigns an assessment from students, returning those that had it
+
+    Raises:
+        UnknownStudents: If any of the students doesn't exist; nothing is changed
+        ConcurrentChange: If one of the students kept changing under the change
+    """
+    return await _change(db, assessment_id, student_ids, assign=False)
+
+
+async def unassign_all(db: StorageBackend, assessment_id: int) -> list[int]:
+    """Unassigns an assessment from every student that has it, e.g. before it is deleted"""
+    student_ids = await assignment.get_student_ids(db, assessment_id=assessment_id)
+    return await unassign(db, assessment_id, student_ids) if student_ids else []
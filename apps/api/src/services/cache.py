@@ -0,0 +1,349 @@
+"""A two-tier cache: an in-process LRU in front of an optional shared Redis tier
+
+Used for CRUD lookups by id (crud/base.py), LLM results (services/openrouter.py)
+and idempotency records (middleware/idempotency.py).
+
+Values are stored encoded in both tiers, as compact JSON (zlib-compressed when
+large) behind a one-byte tag, so the local tier's memory is bounded by bytes as
+well as entries and callers never share a mutable object.
+
+With several workers, the shared tier (CACHE_REDIS_URL) lets one worker's load
+serve the others. Each worker still keeps local copies, for at most
+CACHE_LOCAL_TTL seconds for data that can change (as invalidating a key only
+reaches the other workers' local tiers once their copies expire). The shared
+tier is best effort: when it errors or times out it is treated as a miss and
+skipped for a few seconds, so a Redis outage slows requests down without
+failing them.
+
+Misses are loaded once: concurrent get_or_load calls for a key in a worker wait
+for the first one, and across workers a short lock in the shared tier lets one
+load while the others poll for its result. Deleting a key while it is being
+loaded detaches the load: its value, read before the change, is returned to
+the callers already waiting but not cached, and later calls load again.
+"""
+import asyncio
+import logging
+import time
+import zlib
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Generic, Optional, TypeVar
+
+from pydantic import TypeAdapter
+
+from ..config import settings
+from .redis_client import RedisClient, RedisError
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# Tags of the encoded values
+RAW = b"j"
+ZLIB = b"z"
+
+
+class Codec(Generic[T]):
+    """Encodes values of a type as JSON, compressed above `compress_over` bytes
+
+    Args:
+        type_ (type, optional): Type to validate decoded values as, e.g. a model. Defaults to Any.
+        compress_over (int, optional): Size (bytes) from which the JSON is compressed. Defaults to 1024.
+    """
+
+    def __init__(self, type_: Any = Any, *, compress_over: int = 1024):
+        self.adapter = TypeAdapter(type_)
+        self.compress_over = compress_over
+
+    def dumps(self, value: T) -> bytes:
+        data = self.adapter.dump_json(value)
+        if len(data) >= self.compress_over:
+            return ZLIB + zlib.compress(data)
+        return RAW + data
+
+    def loads(self, data: bytes) -> T:
+        tag, payload = data[:1], data[1:]
+        return self.adapter.validate_json(zlib.decompress(payload) if tag == ZLIB else payload)
+
+
+class LocalCache:
+    """Encoded values by key, evicting the least recently used past `max_entries` or `max_bytes`"""
+
+    def __init__(
+        self, *, max_entries: int, max_bytes: Optional[int] = None, clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self.clock():
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: str, data: bytes, ttl: float) -> None:
+        if self.max_bytes is not None and len(data) > self.max_bytes:
+            return
+        self.delete(key)
+        self._entries[key] = (self.clock() + ttl, data)
+        self.size += len(data)
+        while len(self._entries) > self.max_entries or (self.max_bytes is not None and self.size > self.max_bytes):
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def delete(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+class SharedCache:
+    """The Redis tier: errors are logged and read as misses, then the tier is skipped for `retry_after` seconds
+
+    Args:
+        client (RedisClient): Connection to the server
+        prefix (str, optional): Prepended to every key. Defaults to "alterview:".
+        retry_after (float, optional): Seconds the tier is skipped after an error. Defaults to 5.
+    """
+
+    def __init__(
+        self,
+        client: RedisClient,
+        *,
+        prefix: str = "alterview:",
+        retry_after: float = 5,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.retry_after = retry_after
+        self.clock = clock
+        self.errors = 0
+        self._down_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return self.clock() >= self._down_until
+
+    async def _call(self, method: str, *args, **kwargs) -> Any:
+        if not self.available:
+            raise RedisError("Shared cache is unavailable")
+        try:
+            return await getattr(self.client, method)(*args, **kwargs)
+        except RedisError as e:
+            self.errors += 1
+            self._down_until = self.clock() + self.retry_after
+            logger.warning("Shared cache error, skipping it for a while", extra={"error": str(e)})
+            raise
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self._call("get", self.prefix + key)
+        except RedisError:
+            return None
+
+    async def set(self, key: str, data: bytes, ttl: float) -> None:
+        try:
+            await self._call("set", self.prefix + key, data, ttl=ttl)
+        except RedisError:
+            pass
+
+    async def delete(self, *keys: str) -> None:
+        try:
+            await self._call("delete", *(self.prefix + key for key in keys))
+        except RedisError:
+            pass
+
+    async def add(self, key: str, data: bytes, ttl: float) -> bool:
+        """Stores a value unless the key is already set; also True when the tier is down, so callers go ahead"""
+        try:
+            return await self._call("set", self.prefix + key, data, ttl=ttl, only_new=True)
+        except RedisError:
+            return True
+
+    async def lock(self, key: str, ttl: float) -> bool:
+        """Takes a lock that expires after `ttl` seconds; also True when the tier is down, so callers go ahead"""
+        return await self.add(f"{key}:lock", b"1", ttl)
+
+    async def unlock(self, key: str) -> None:
+        await self.delete(f"{key}:lock")
+
+
+class Cache:
+    """Looks values up in the local tier, then the shared tier (if any), loading them on a miss
+
+    Args:
+        local (LocalCache): In-process tier
+        shared (Optional[SharedCache], optional): Tier shared by the workers. Defaults to None.
+        local_ttl (float, optional): Cap (seconds) on how long local copies of changeable data are served. Defaults to 5.
+        lock_ttl (float, optional): Seconds another worker waits on a load before loading itself. Defaults to 10.
+        poll_interval (float, optional): Seconds between checks of the shared tier while waiting. Defaults to 0.05.
+    """
+
+    def __init__(
+        self,
+        local: LocalCache,
+        shared: Optional[SharedCache] = None,
+        *,
+        local_ttl: float = 5,
+        lock_ttl: float = 10,
+        poll_interval: float = 0.05,
+    ):
+        self.local = local
+        self.shared = shared
+        self.local_ttl = local_ttl
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self.stats: Counter[str] = Counter()
+        self._loading: dict[str, asyncio.Future] = {}
+
+    async def get(self, key: str, codec: Codec[T]) -> Optional[T]:
+        data = self.local.get(key)
+        if data is not None:
+            self.stats["local_hits"] += 1
+            return codec.loads(data)
+        if self.shared is not None:
+            data = await self.shared.get(key)
+            if data is not None:
+                self.stats["shared_hits"] += 1
+                # Kept locally no longer than local_ttl, as the remaining TTL isn't known
+                self.local.set(key, data, self.local_ttl)
+                return codec.loads(data)
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: T, *, ttl: float, codec: Codec[T], immutable: bool = False) -> None:
+        """Stores a value in both tiers for `ttl` seconds
+
+        Local copies of values that aren't `immutable` are kept at most local_ttl seconds.
+        """
+        data = codec.dumps(value)
+        self.local.set(key, data, self._local_ttl(ttl, immutable))
+        if self.shared is not None:
+            await self.shared.set(key, data, ttl)
+
+    def _local_ttl(self, ttl: float, immutable: bool) -> float:
+        return ttl if immutable else min(ttl, self.local_ttl)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.local.delete(key)
+            self._loading.pop(key, None)
+        if self.shared is not None and keys:
+            await self.shared.delete(*keys)
+
+    async def get_or_load(
+        self, key: str, load: Callable[[], Awaitable[Optional[T]]], *, ttl: float, codec: Codec[T], immutable: bool = False
+    ) -> Optional[T]:
+        """Returns the cached value, or the value `load` returns, which is then cached (unless None)
+
+        Concurrent calls for a key share one load; if it raises, they all do.
+        """
+        value = await self.get(key, codec)
+        if value is not None:
+            return value
+        while (pending := self._loading.get(key)) is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The load was cancelled rather than this caller: load again
+                if not pending.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            value = await self._load(key, future, load, ttl=ttl, codec=codec, immutable=immutable)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Marks it retrieved, in case no one was waiting
+            future.exception()
+            raise
+        finally:
+            if self._loading.get(key) is future:
+                del self._loading[key]
+        future.set_result(value)
+        return value
+
+    async def _load(
+        self,
+        key: str,
+        future: asyncio.Future,
+        load: Callable[[], Awaitable[Optional[T]]],
+        *,
+        ttl: float,
+        codec: Codec[T],
+        immutable: bool,
+    ) -> Optional[T]:
+        if self.shared is not None and not await self.shared.lock(key, self.lock_ttl):
+            # Another worker is loading it: wait for its result, for as long as its lock lasts
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.lock_ttl
+            while loop.time() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                data = await self.shared.get(key)
+                if data is not None:
+                    self.stats["shared_hits"] += 1
+                    self.local.set(key, data, self._local_ttl(ttl, immutable))
+                    return codec.loads(data)
+            return await self._load_and_set(key, future, load, ttl=ttl, codec=codec, immutable=immutable)
+        try:
+            return await self._load_and_set(key, future, load, ttl=ttl, codec=codec, immutable=immutable)
+        finally:
+            if self.shared is not None:
+                await self.shared.unlock(key)
+
+    async def _load_and_set(
+        self,
+        key: str,
+        future: asyncio.Future,
+        load: Callable[[], Awaitable[Optional[T]]],
+        *,
+        ttl: float,
+        codec: Codec[T],
+        immutable: bool,
+    ) -> Optional[T]:
+        self.stats["loads"] += 1
+        value = await load()
+        if self._loading.get(key) is not future:
+            # Deleted during the load, so the value may predate the change
+            self.stats["stale_loads"] += 1
+        elif value is not None:
+            await self.set(key, value, ttl=ttl, codec=codec, immutable=immutable)
+        return value
+
+
+_shared: Optional[SharedCache] = None
+_cache: Optional[Cache] = None
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """Returns the process-wide shared tier, or None without CACHE_REDIS_URL"""
+    global _shared
+    if _shared is None and settings.CACHE_REDIS_URL:
+        _shared = SharedCache(RedisClient(settings.CACHE_REDIS_URL, timeout=settings.CACHE_REDIS_TIMEOUT))
+    return _shared
+
+
+def get_cache() -> Cache:
+    """Returns the process-wide cache"""
+    global _cache
+    if _cache is None:
+        _cache = Cache(
+            LocalCache(max_entries=settings.CACHE_LOCAL_SIZE, max_bytes=settings.CACHE_LOCAL_MAX_BYTES),
+            get_shared_cache(),
+            local_ttl=settings.CACHE_LOCAL_TTL,
+        )
+    return _cache
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Mapping, Optional, Sequence
+
+from ..prompts import CLASS_FINAL, CLASS_MAP, CLASS_REDUCE, Prompt
+from .class_summary import format_summary
+from .mindmap_tree import MindmapTree
+from .llm_scheduler import Priority
+from .openrouter import OpenRouterError, chat_completion_json
+
+logger = logging.getLogger(__name__)
+
+MAX_RESPONSE_CHARS = 300
+
+Completion = Callable[[Prompt, Mapping[str, str]], Awaitable[Any]]
+
+
+def describe_mindmap(tree: MindmapTree) -> str:
+    """Renders one student's filled mindmap as compact per-topic lines"""
+    lines = []
+    for path, node in tree:
+        level = node.get("understandingLevel")
+        response = " ".join(str(node.get("studentResponse") or "").split())[:MAX_RESPONSE_CHARS]
+        lines.append(f"- {path} [{level if level is not None else '?'}]: {response}")
+    return "\n".join(lines)
+
+
+def _chunks(items: Sequence[Any], size: int) -> list[Sequence[Any]]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def _check_items(items: Any) -> list[str]:
+    if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+        raise ValueError("LLM response is not a JSON array of strings")
+    return items
+
+
+async def _complete(prompt: Prompt, variables: Mapping[str, str]) -> Any:
+    # Checked inside the call too, so a malformed response is never cached
+    return await chat_completion_json(prompt, variables, expect=list, validate=_check_items, priority=Priority.BATCH)
+
+
+async def generate_class_insights(
+    mindmaps: Sequence[Any],
+    summary: dict,
+    *,
+    fan_in: int,
+    concurrency: int,
+    complete: Optional[Completion] = None,
+) -> dict:
+    """Generates class-wide insights with a hierarchical map-reduce over mindmaps
+
+    Students are split into groups of `fan_in` that are summarized in parallel
+    (map), then group summaries are merged `fan_in` at a time until a single set
+    of observations remains (reduce). The final call combines those observations
+    with the numeric class summary into insights for the teacher.
+
+    Args:
+        mindmaps (Sequence[Any]): Filled mindmaps, one per result
+        summary (dict): Numeric class summary from summarize_class
+        fan_in (int): Students per map group and summaries per reduce step
+        concurrency (int): Maximum number of LLM calls in flight
+        complete (Optional[Completion], optional): (prompt, variables) -> parsed JSON completion. Defaults to OpenRouter.
+
+    Raises:
+        OpenRouterError: If every call in a map or reduce stage fails
+
+    Returns:
+        dict: {"insights": [...], "groups": n, "failed_groups": n}, where failed_groups
+        counts the groups left out of the insights by failed map or reduce calls
+    """
+    complete = complete or _complete
+    fan_in = max(fan_in, 2)
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run(prompt: Prompt, variables: Mapping[str, str]) -> list[str]:
+        async with semaphore:
+            items = await complete(prompt, variables)
+        return _check_items(items)
+
+    async def stage(
+        prompt: Prompt, calls: list[dict[str, str]], weights: list[int]
+    ) -> tuple[list[list[str]], list[int], int]:
+        """Runs one stage; returns the successful outputs, their weights and the weight lost to failures"""
+        outcomes = await asyncio.gather(*(run(prompt, variables) for variables in calls), return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                logger.warning("Insight request failed", extra={"prompt": prompt.key, "error": str(outcome)})
+        succeeded = [
+            (outcome, weight) for outcome, weight in zip(outcomes, weights) if not isinstance(outcome, BaseException)
+        ]
+        if not succeeded:
+            raise OpenRouterError(f"All {len(calls)} insight requests failed: {outcomes[0]}")
+        return (
+            [outcome for outcome, _ in succeeded],
+            [weight for _, weight in succeeded],
+            sum(weights) - sum(weight for _, weight in succeeded),
+        )
+
+    described = [describe_mindmap(tree) for tree in map(MindmapTree.loads, mindmaps) if tree is not None]
+    groups = _chunks(described, fan_in)
+
+    # Map: summarize each group of students. Each summary is weighted by the
+    # number of groups it covers, so a failed reduce reports the groups it drops
+    summaries, weights, failed_groups = await stage(
+        CLASS_MAP,
+        [
+            {"students": "\n\n".join(f"Student {i + 1}:\n{text}" for i, text in enumerate(group))}
+            for group in groups
+        ],
+        [1] * len(groups),
+    )
+
+    # Reduce: merge group summaries until a single set of observations is left
+    while len(summaries) > 1:
+        summaries, weights, failed = await stage(
+            CLASS_REDUCE,
+            [
+                {
+                    "summaries": "\n\n".join(
+                        f"Group {i + 1}:\n" + "\n".join(f"- {item}" for item in group_summary)
+                        for i, group_summary in enumerate(chunk)
+                    )
+                }
+                for chunk in _chunks(summaries, fan_in)
+            ],
+            [sum(chunk) for chunk in _chunks(weights, fan_in)],
+        )
+        failed_groups += failed
+
+    observations = "\n".join(f"- {item}" for item in summaries[0])
+    insights = await run(CLASS_FINAL, {"summary": format_summary(summary), "observations": observations})
+    return {"insights": insights, "groups": len(groups), "failed_groups": failed_groups}
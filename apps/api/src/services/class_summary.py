@@ -0,0 +1,91 @@
+from typing import Any, Sequence
+
+import numpy as np
+
+from .mindmap_tree import LEVELS, PATH_SEPARATOR, MindmapTree, score_matrix
+
+
+def summarize_class(
+    mindmaps: Sequence[Any],
+    student_ids: Sequence[int],
+    *,
+    outlier_z: float = 1.5,
+) -> dict:
+    """Computes per-node understanding statistics for a class
+
+    Args:
+        mindmaps (Sequence[Any]): Filled mindmaps, one per result
+        student_ids (Sequence[int]): Student id for each mindmap
+        outlier_z (float, optional): |z-score| at which a student counts as an outlier. Defaults to 1.5.
+
+    Returns:
+        dict: {"students": n, "nodes": [...], "outliers": {"low": [...], "high": [...]}}
+    """
+    parsed = [(MindmapTree.loads(m), s) for m, s in zip(mindmaps, student_ids)]
+    parsed = [(tree, s) for tree, s in parsed if tree is not None]
+    ids = np.array([s for _, s in parsed])
+    paths, matrix = score_matrix([tree for tree, _ in parsed])
+
+    answered = ~np.isnan(matrix)
+    counts = answered.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sums = np.nansum(matrix, axis=0)
+        means = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        deviations = np.where(answered, matrix - means, 0.0)
+        stds = np.sqrt((deviations ** 2).sum(axis=0) / np.maximum(counts, 1))
+        z = np.where(answered & (stds > 0), deviations / np.where(stds > 0, stds, 1), 0.0)
+    histogram = np.stack([(matrix == level).sum(axis=0) for level in LEVELS], axis=1)
+
+    nodes = []
+    for j, path in enumerate(paths):
+        low = ids[z[:, j] <= -outlier_z].tolist()
+        high = ids[z[:, j] >= outlier_z].tolist()
+        nodes.append(
+            {
+                "path": path,
+                "depth": path.count(PATH_SEPARATOR),
+                "count": int(counts[j]),
+                "mean": None if counts[j] == 0 else round(float(means[j]), 2),
+                "std": None if counts[j] == 0 else round(float(stds[j]), 2),
+                "distribution": dict(zip(LEVELS, histogram[j].tolist())),
+                "low_outliers": low,
+                "high_outliers": high,
+            }
+        )
+
+    # Whole-mindmap outliers: students whose average z-score across nodes stands out
+    answered_per_student = answered.sum(axis=1)
+    student_z = z.sum(axis=1) / np.maximum(answered_per_student, 1)
+    with np.errstate(invalid="ignore"):
+        spread = student_z.std() if len(student_z) else 0.0
+    student_z = (student_z - student_z.mean()) / spread if spread > 0 else np.zeros_like(student_z)
+    return {
+        "students": len(parsed),
+        "nodes": nodes,
+        "outliers": {
+            "low": ids[student_z <= -outlier_z].tolist(),
+            "high": ids[student_z >= outlier_z].tolist(),
+        },
+    }
+
+
+def format_summary(summary: dict) -> str:
+    """Renders a class summary as compact text for an LLM prompt"""
+    lines = [f"Students assessed: {summary['students']}"]
+    for node in summary["nodes"]:
+        if not node["count"]:
+            continue
+        distribution = " ".join(f"{level}:{n}" for level, n in node["distribution"].items())
+        line = (
+            f"{'  ' * node['depth']}- {node['path'].rsplit(PATH_SEPARATOR, 1)[-1]}: "
+            f"mean {node['mean']}, sd {node['std']}, n {node['count']}, levels [{distribution}]"
+        )
+        if node["low_outliers"]:
+            line += f", struggling students {len(node['low_outliers'])}"
+        lines.append(line)
+    outliers = summary["outliers"]
+    lines.append(
+        f"Students well below the class overall: {len(outliers['low'])}; "
+        f"well above: {len(outliers['high'])}"
+    )
+    return "\n".join(lines)
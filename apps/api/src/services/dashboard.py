@@ -0,0 +1,75 @@
+"""The teacher dashboard, aggregated in a fixed number of queries
+
+Everything comes from small rows: the teacher's assessments without their
+prompts and templates, the assessments' AssessmentStats rows (maintained as
+results change, see services/assessment_stats.py) and the assignment index. No
+result is read, unless an assessment has no stats row yet: those are computed
+from their results' mindmaps in one more query, and stored when the assessment
+is next read or changed as usual.
+"""
+import asyncio
+from typing import Union
+
+from ..crud.assignment import assignment
+from ..schemas.assessment import Assessment
+from ..schemas.assessment_result import AssessmentResult
+from ..schemas.assessment_stats import AssessmentStats, AssessmentStatsCreate
+from ..schemas.dashboard import AssessmentSummary, TeacherDashboard
+from ..storage import StorageBackend
+from .assessment_stats import STATS_COLUMNS, stats_from_results
+
+
+async def _stats(db: StorageBackend, assessment_ids: list[int]) -> dict[int, Union[AssessmentStats, AssessmentStatsCreate]]:
+    rows = await db.select(AssessmentStats.table_name, where={"assessment_id": assessment_ids})
+    stats = {row["assessment_id"]: AssessmentStats(**row) for row in rows}
+    missing = [assessment_id for assessment_id in assessment_ids if assessment_id not in stats]
+    if missing:
+        results = await db.select(AssessmentResult.table_name, columns=STATS_COLUMNS, where={"assessment_id": missing})
+        for assessment_id in missing:
+            stats[assessment_id] = stats_from_results(
+                assessment_id, [result for result in results if result["assessment_id"] == assessment_id]
+            )
+    return stats
+
+
+async def _assigned_counts(db: StorageBackend, assessment_ids: list[int]) -> dict[int, int]:
+    rows = await db.select(assignment.model.table_name, columns=["assessment_id"], where={"assessment_id": assessment_ids})
+    counts: dict[int, int] = {}
+    for row in rows:
+        counts[row["assessment_id"]] = counts.get(row["assessment_id"], 0) + 1
+    return counts
+
+
+async def teacher_dashboard(db: StorageBackend, teacher_id: int) -> TeacherDashboard:
+    """Returns each of the teacher's assessments with its result counts, understanding and last activity"""
+    assessments = await db.select(
+        Assessment.table_name, columns=["id", "name", "created_at"], where={"teacher_id": teacher_id}, order_by="id"
+    )
+    assessment_ids = [row["id"] for row in assessments]
+    if not assessment_ids:
+        return TeacherDashboard(teacher_id=teacher_id, assessments=[], result_count=0, processed_count=0, unprocessed_count=0)
+    stats, assigned = await asyncio.gather(_stats(db, assessment_ids), _assigned_counts(db, assessment_ids))
+
+    summaries = []
+    for row in assessments:
+        assessment_stats = stats[row["id"]]
+        summaries.append(
+            AssessmentSummary(
+                **row,
+                assigned_count=assigned.get(row["id"], 0),
+                result_count=assessment_stats.result_count,
+                processed_count=assessment_stats.processed_count,
+                unprocessed_count=assessment_stats.result_count - assessment_stats.processed_count,
+                average_understanding=assessment_stats.average_understanding,
+                last_activity_at=assessment_stats.last_activity_at,
+            )
+        )
+    activity = [summary.last_activity_at for summary in summaries if summary.last_activity_at is not None]
+    return TeacherDashboard(
+        teacher_id=teacher_id,
+        assessments=summaries,
+        result_count=sum(summary.result_count for summary in summaries),
+        processed_count=sum(summary.processed_count for summary in summaries),
+        unprocessed_count=sum(summary.unprocessed_count for summary in summaries),
+        last_activity_at=max(activity, default=None),
+    )
@@ -0,0 +1,323 @@
+"""Push notifications of result activity, streamed to subscribers as Server-Sent Events
+
+Clients subscribe to teachers, assessments and/or results (GET /events) and
+receive an event when one of their results is created or updated, when
+transcript segments arrive and when processing finishes, instead of polling.
+
+Each connection has a bounded queue. Publishing never waits for a subscriber:
+when a slow client's queue is full its oldest event is dropped, and the client
+is sent a "lagged" event with the number dropped before the next ones, so it
+knows to refetch. Idle streams get a heartbeat comment, which keeps proxies
+from closing them and notices clients that went away. Events carry increasing
+ids and the most recent are kept, so a client that reconnects with
+Last-Event-ID gets the ones it missed.
+
+With CACHE_REDIS_URL set, events go through a Redis channel (SharedEventBus):
+every worker hears every event, whichever worker published it, and ids come
+from a counter kept in Redis, so a client can resume on any worker. Without
+it, the bus is per process and a client only hears about activity handled by
+the worker it is connected to.
+
+Ids are "<epoch>-<n>", with an epoch drawn when the bus (or, shared, the Redis
+data) is created, and a client that reconnects with an id the bus can't resume
+from (another process's, one from before a restart) is sent a "reset" event
+first: the events it missed can't be known, so it has to refetch everything.
+"""
+import asyncio
+import json
+import logging
+import secrets
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Iterable, Iterator, Optional
+
+from ..config import settings
+from .cache import get_shared_cache
+from .redis_client import RedisClient, RedisError
+
+logger = logging.getLogger(__name__)
+
+# A subscription key: ("teacher" | "assessment" | "result", id)
+Topic = tuple[str, int]
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    type: str
+    topics: frozenset[Topic]
+    data: dict[str, Any]
+    epoch: str = ""
+
+    def encode(self) -> str:
+        return f"id: {self.epoch}-{self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, default=str)}\n\n"
+
+
+def _get(result, name: str):
+    return result[name] if isinstance(result, dict) else getattr(result, name)
+
+
+def result_topics(result) -> frozenset[Topic]:
+    """The topics of a result (a model or row dict with id, assessment_id and teacher_id)"""
+    return frozenset(
+        {("result", _get(result, "id")), ("assessment", _get(result, "assessment_id")), ("teacher", _get(result, "teacher_id"))}
+    )
+
+
+@dataclass(eq=False)
+class Subscription:
+    """One connection's bounded queue of events"""
+
+    topics: frozenset[Topic]
+    max_queue: int
+    dropped: int = 0
+    # Set when the client resumed from an event this bus didn't send
+    reset: bool = False
+    _queue: deque = field(default_factory=deque, init=False)
+    _ready: asyncio.Event = field(default_factory=asyncio.Event, init=False)
+
+    def offer(self, event: Event) -> None:
+        if len(self._queue) >= self.max_queue:
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append(event)
+        self._ready.set()
+
+    async def drain(self, timeout: float) -> tuple[list[Event], int]:
+        """Waits up to `timeout` seconds for events, returning all queued and how many were dropped"""
+        if not self._queue and not self.dropped:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._ready.clear()
+        events, dropped = list(self._queue), self.dropped
+        self._queue.clear()
+        self.dropped = 0
+        return events, dropped
+
+
+class EventBus:
+    """Delivers published events to the subscriptions of any of their topics"""
+
+    def __init__(self, *, history: int = 1000):
+        self._subscriptions: defaultdict[Topic, set[Subscription]] = defaultdict(set)
+        self._history: deque[Event] = deque(maxlen=history)
+        self._last_id = 0
+        self.epoch = secrets.token_hex(4)
+
+    def publish(self, type: str, topics: Iterable[Topic], data: dict[str, Any]) -> Event:
+        """Delivers an event to this process's subscribers"""
+        self._last_id += 1
+        event = Event(self._last_id, type, frozenset(topics), data, self.epoch)
+        self._deliver(event)
+        return event
+
+    async def send(self, type: str, topics: Iterable[Topic], data: dict[str, Any]) -> None:
+        """Publishes an event to every subscriber the bus reaches"""
+        self.publish(type, topics, data)
+
+    async def start(self) -> None:
+        """Gets the bus ready to deliver, before a subscription"""
+
+    def _deliver(self, event: Event) -> None:
+        self._history.append(event)
+        # An event on several of a subscription's topics is delivered once
+        subscriptions = set().union(*(self._subscriptions.get(topic, ()) for topic in event.topics))
+        for subscription in subscriptions:
+            subscription.offer(event)
+
+    def _lost(self, count: int) -> None:
+        """Reports events that couldn't be delivered to every subscription, as dropped"""
+        for subscription in set().union(*self._subscriptions.values()):
+            subscription.dropped += count
+            subscription._ready.set()
+
+    @contextmanager
+    def subscribe(
+        self, topics: Iterable[Topic], *, max_queue: int = 100, last_event_id: Optional[str] = None
+    ) -> Iterator[Subscription]:
+        """Subscribes to the topics for the duration of the block
+
+        With `last_event_id`, the kept events after it are queued first; if some
+        were already forgotten, they count as dropped. If this bus didn't send it,
+        the subscription is marked `reset` instead.
+        """
+        subscription = Subscription(frozenset(topics), max_queue)
+        last_id = None
+        if last_event_id is not None:
+            epoch, _, n = last_event_id.partition("-")
+            if epoch != self.epoch or not n.isdigit() or int(n) > self._last_id:
+                subscription.reset = True
+            else:
+                last_id = int(n)
+        if last_id is not None and last_id < self._last_id:
+            first = self._history[0].id if self._history else self._last_id + 1
+            if first > last_id + 1:
+                subscription.dropped += first - last_id - 1
+            for event in self._history:
+                if event.id > last_id and event.topics & subscription.topics:
+                    subscription.offer(event)
+        for topic in subscription.topics:
+            self._subscriptions[topic].add(subscription)
+        try:
+            yield subscription
+        finally:
+            for topic in subscription.topics:
+                self._subscriptions[topic].discard(subscription)
+                if not self._subscriptions[topic]:
+                    del self._subscriptions[topic]
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(set().union(*self._subscriptions.values()))
+
+
+class SharedEventBus(EventBus):
+    """An EventBus whose events go through a Redis channel, so every worker delivers them
+
+    Ids come from a counter in Redis and the epoch is kept there too, so they
+    mean the same on every worker. Each worker subscribes to the channel and
+    keeps its own recent events for clients that resume. Events published
+    while a worker isn't subscribed (Redis unreachable, or the connection
+    dropped) are reported to its subscribers as dropped.
+
+    Args:
+        client (RedisClient): Connection to the server
+        history (int, optional): Recent events kept for resuming. Defaults to 1000.
+        prefix (str, optional): Prepended to the channel and keys. Defaults to "alterview:events:".
+        retry_after (float, optional): Seconds between attempts to resubscribe. Defaults to 1.
+    """
+
+    def __init__(
+        self, client: RedisClient, *, history: int = 1000, prefix: str = "alterview:events:", retry_after: float = 1
+    ):
+        super().__init__(history=history)
+        self.client = client
+        self.prefix = prefix
+        self.retry_after = retry_after
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed: Optional[asyncio.Event] = None
+
+    async def start(self) -> None:
+        """Subscribes to the channel, waiting up to the client's timeout for it"""
+        if self._listener is None or self._listener.done():
+            self._subscribed = asyncio.Event()
+            self._listener = asyncio.create_task(self._listen())
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), self.client.timeout)
+        except asyncio.TimeoutError:
+            pass  # The listener keeps trying; meanwhile events are missed
+
+    async def send(self, type: str, topics: Iterable[Topic], data: dict[str, Any]) -> None:
+        await self.start()
+        try:
+            id = await self.client.incr(self.prefix + "seq")
+            message = {"id": id, "type": type, "topics": sorted(topics), "data": data}
+            await self.client.publish(self.prefix + "channel", json.dumps(message, default=str).encode())
+        except RedisError as e:
+            logger.warning("Failed to publish an event", extra={"type": type, "error": str(e)})
+            self._lost(1)
+
+    def _receive(self, message: bytes) -> None:
+        payload = json.loads(message)
+        topics = frozenset((kind, id) for kind, id in payload["topics"])
+        self._last_id = max(self._last_id, payload["id"])
+        self._deliver(Event(payload["id"], payload["type"], topics, payload["data"], self.epoch))
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = await self.client.subscribe(self.prefix + "channel")
+            except RedisError as e:
+                logger.warning("Failed to subscribe to events, retrying", extra={"error": str(e)})
+                await asyncio.sleep(self.retry_after)
+                continue
+            try:
+                await self.client.set(self.prefix + "epoch", secrets.token_hex(4).encode(), only_new=True)
+                epoch = (await self.client.get(self.prefix + "epoch") or b"").decode()
+                seq = int(await self.client.get(self.prefix + "seq") or 0)
+                if epoch != self.epoch:
+                    # First subscription, or Redis lost its data: earlier ids mean nothing now
+                    self.epoch = epoch
+                    self._history.clear()
+                elif seq > self._last_id:
+                    # Published while this worker wasn't subscribed
+                    self._lost(seq - self._last_id)
+                self._last_id = seq
+                self._subscribed.set()
+                async for message in pubsub:
+                    self._receive(message)
+            except RedisError as e:
+                logger.warning("Lost the event subscription, resubscribing", extra={"error": str(e)})
+            finally:
+                pubsub.close()
+            await asyncio.sleep(self.retry_after)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+async def event_stream(
+    bus: EventBus,
+    topics: Iterable[Topic],
+    *,
+    heartbeat: float = 15,
+    max_queue: int = 100,
+    last_event_id: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """Yields the Server-Sent Events of a subscription until the client disconnects
+
+    Events queued while the client was being sent the previous ones go out in
+    one write.
+    """
+    await bus.start()
+    with bus.subscribe(topics, max_queue=max_queue, last_event_id=last_event_id) as subscription:
+        # Sent straight away, so the client knows the subscription is live
+        chunk = f"retry: 3000\n: subscribed to {len(subscription.topics)} topics\n\n"
+        if subscription.reset:
+            logger.info("Event subscriber resumed from an unknown event", extra={"last_event_id": last_event_id})
+            # With this bus's id, so the client resumes from here next time
+            chunk += f"id: {bus.epoch}-{bus.last_id}\nevent: reset\ndata: {{}}\n\n"
+        yield chunk
+        while True:
+            events, dropped = await subscription.drain(heartbeat)
+            if not events and not dropped:
+                yield ": heartbeat\n\n"
+                continue
+            chunk = f"event: lagged\ndata: {json.dumps({'dropped': dropped})}\n\n" if dropped else ""
+            if dropped:
+                logger.info("Slow event subscriber, dropped events", extra={"dropped": dropped})
+            yield chunk + "".join(event.encode() for event in events)
+
+
+_bus: Optional[EventBus] = None
+
+
+def get_bus() -> EventBus:
+    """Returns the process-wide event bus, shared through Redis with CACHE_REDIS_URL"""
+    global _bus
+    if _bus is None:
+        shared = get_shared_cache()
+        if shared is not None:
+            _bus = SharedEventBus(shared.client, history=settings.SSE_REPLAY_SIZE)
+        else:
+            _bus = EventBus(history=settings.SSE_REPLAY_SIZE)
+    return _bus
+
+
+async def publish_result(type: str, result, **data) -> None:
+    """Publishes an event about a result (a model or row dict) to its result, assessment and teacher"""
+    keys = {name: _get(result, name) for name in ("assessment_id", "teacher_id", "student_id")}
+    await get_bus().send(type, result_topics(result), {"result_id": _get(result, "id"), **keys, **data})
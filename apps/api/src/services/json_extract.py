@@ -0,0 +1,174 @@
+import json
+from typing import Any, Optional
+
+_CLOSERS = {"{": "}", "[": "]"}
+# How many cut points to try when repairing a truncated value before giving up
+MAX_REPAIR_ATTEMPTS = 32
+
+
+class JSONExtractionError(ValueError):
+    """Raised when no JSON object or array can be recovered from the text"""
+
+
+def strip_trailing_commas(text: str) -> str:
+    """Removes commas directly before a closing bracket, ignoring string contents"""
+    out: list[str] = []
+    in_string = escape = False
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "}]":
+            # Drop the comma (and the whitespace after it) left before this bracket
+            end = len(out)
+            while end and out[end - 1].isspace():
+                end -= 1
+            if end and out[end - 1] == ",":
+                del out[end - 1 :]
+        out.append(char)
+    return "".join(out)
+
+
+class JSONExtractor:
+    """Finds the first balanced JSON object or array in text fed in chunks
+
+    Scanning resumes where the previous chunk stopped, so feeding a streamed
+    completion chunk by chunk costs about the same as parsing it once. Prose and
+    markdown fences around the value are skipped, bracketed prose that isn't JSON
+    is stepped over, and trailing commas are tolerated. If the stream ends before the value is closed, `finish`
+    repairs the truncated value by closing open strings and brackets, dropping
+    incomplete trailing members if needed.
+
+    Usage:
+        extractor = JSONExtractor()
+        for chunk in chunks:
+            value = extractor.feed(chunk)
+            if extractor.done:
+                break
+        value = extractor.finish()
+    """
+
+    def __init__(self, expect: Optional[type] = None):
+        """
+        Args:
+            expect (Optional[type], optional): dict or list to only accept objects or arrays. Defaults to either.
+        """
+        self._openers = {dict: "{", list: "["}.get(expect, "{[")
+        self._buffer = ""
+        self._pos = 0
+        self._reset_candidate()
+        self.done = False
+        # Whether `finish` had to repair a truncated value
+        self.repaired = False
+        self.value: Any = None
+
+    def _reset_candidate(self) -> None:
+        self._start: Optional[int] = None
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        # (position, open brackets) at which the value can be cut when repairing
+        self._cuts: list[tuple[int, str]] = []
+
+    def feed(self, chunk: str) -> Optional[Any]:
+        """Scans a chunk, returning the value once it is complete (else None)"""
+        if self.done:
+            return self.value
+        self._buffer += chunk
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer):
+            char = buffer[pos]
+            if self._start is None:
+                if char in self._openers:
+                    self._start = pos
+                    self._stack.append(char)
+                    self._cuts.append((pos + 1, char))
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in _CLOSERS:
+                self._stack.append(char)
+                self._cuts.append((pos + 1, "".join(self._stack)))
+            elif char in "}]":
+                if _CLOSERS[self._stack[-1]] != char:
+                    # Mismatched bracket: this wasn't JSON, look for the next candidate
+                    pos = self._start + 1
+                    self._reset_candidate()
+                    continue
+                self._stack.pop()
+                if not self._stack:
+                    try:
+                        self.value = json.loads(strip_trailing_commas(buffer[self._start : pos + 1]))
+                    except json.JSONDecodeError:
+                        pos = self._start + 1
+                        self._reset_candidate()
+                        continue
+                    self.done = True
+                    self._pos = pos + 1
+                    return self.value
+            elif char == ",":
+                self._cuts.append((pos, "".join(self._stack)))
+            pos += 1
+        self._pos = pos
+        return None
+
+    def finish(self) -> Any:
+        """Returns the extracted value, repairing a truncated one if necessary
+
+        Raises:
+            JSONExtractionError: If no value can be recovered
+        """
+        if self.done:
+            return self.value
+        if self._start is None:
+            raise JSONExtractionError("No JSON object or array found in the text")
+
+        fragment = self._buffer[self._start :]
+        # Close an unterminated string, dropping a dangling escape character
+        if self._in_string:
+            fragment = fragment[:-1] if self._escape else fragment
+            fragment += '"'
+        candidates = [(fragment, "".join(self._stack))]
+        candidates += [
+            (self._buffer[self._start : cut], stack) for cut, stack in reversed(self._cuts[-MAX_REPAIR_ATTEMPTS:])
+        ]
+        for text, stack in candidates:
+            closing = "".join(_CLOSERS[bracket] for bracket in reversed(stack))
+            try:
+                self.value = json.loads(strip_trailing_commas(text.rstrip().rstrip(",") + closing))
+            except json.JSONDecodeError:
+                continue
+            self.done = self.repaired = True
+            return self.value
+        raise JSONExtractionError("Could not repair the truncated JSON value")
+
+
+def extract_json(text: str, expect: Optional[type] = None) -> Any:
+    """Extracts the first JSON object or array from LLM output
+
+    Args:
+        text (str): Model output, possibly wrapped in prose or markdown fences
+        expect (Optional[type], optional): dict or list to only accept objects or arrays. Defaults to either.
+
+    Raises:
+        JSONExtractionError: If no value can be recovered
+
+    Returns:
+        Any: The parsed object or array
+    """
+    extractor = JSONExtractor(expect)
+    extractor.feed(text)
+    return extractor.finish()
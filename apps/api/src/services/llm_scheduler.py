@@ -0,0 +1,137 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import AsyncIterator, Callable, Optional
+
+from ..config import settings
+
+
+class Priority(IntEnum):
+    """LLM call classes, most urgent first"""
+
+    # Someone is waiting on the response (e.g. generate-mindmap)
+    INTERACTIVE = 0
+    # Background processing (result processing, class insights)
+    BATCH = 1
+
+
+class LLMScheduler:
+    """Orders every LLM call by priority under per-class and provider-wide budgets
+
+    Each priority class has its own concurrency budget, and all classes share a
+    token bucket of `rate` calls per second (bursting to `burst`) that models the
+    provider's rate limit. Waiting calls are served in priority order, FIFO within
+    a class: a class that is at its concurrency budget doesn't hold up the others,
+    but a waiting interactive call always gets the next rate token, so batch work
+    only soaks up the capacity interactive calls leave unused.
+    """
+
+    def __init__(
+        self,
+        *,
+        concurrency: dict[Priority, int],
+        rate: float,
+        burst: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            concurrency (dict[Priority, int]): Calls in flight per class
+            rate (float): Calls started per second across all classes, 0 for unlimited
+            burst (float): Calls that may start at once after an idle period
+        """
+        self.concurrency = {priority: max(concurrency.get(priority, 1), 1) for priority in Priority}
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+        self.in_flight = {priority: 0 for priority in Priority}
+        self.waiting: dict[Priority, deque[asyncio.Future]] = {priority: deque() for priority in Priority}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _take_token(self) -> float:
+        """Takes a rate token if one is available, else returns the wait for the next one"""
+        if self.rate <= 0:
+            return 0.0
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        for priority in Priority:
+            queue = self.waiting[priority]
+            while queue and self.in_flight[priority] < self.concurrency[priority]:
+                if queue[0].done():  # Cancelled while waiting
+                    queue.popleft()
+                    continue
+                wait = self._take_token()
+                if wait > 0:
+                    # Out of rate budget: nobody of lower priority may take the next token either
+                    if self._timer is None:
+                        loop = asyncio.get_running_loop()
+                        self._timer = loop.call_later(wait, self._on_timer)
+                        self._timer_loop = loop
+                    return
+                self.in_flight[priority] += 1
+                queue.popleft().set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority) -> AsyncIterator[None]:
+        """Waits for a slot for one LLM call of the given priority, holding it for the block"""
+        loop = asyncio.get_running_loop()
+        if self._timer is not None and self._timer_loop is not loop:
+            self._timer = None
+        waiter = loop.create_future()
+        self.waiting[priority].append(waiter)
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the caller was cancelled
+                self._release(priority)
+            raise
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    def _release(self, priority: Priority) -> None:
+        self.in_flight[priority] -= 1
+        self._dispatch()
+
+    def stats(self) -> dict:
+        return {
+            priority.name.lower(): {"in_flight": self.in_flight[priority], "waiting": len(self.waiting[priority])}
+            for priority in Priority
+        }
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_scheduler() -> LLMScheduler:
+    """Returns the process-wide scheduler all LLM calls go through, configured from settings"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler(
+            concurrency={
+                Priority.INTERACTIVE: settings.LLM_INTERACTIVE_CONCURRENCY,
+                Priority.BATCH: settings.LLM_BATCH_CONCURRENCY,
+            },
+            rate=settings.LLM_RATE_LIMIT,
+            burst=settings.LLM_RATE_BURST,
+        )
+    return _scheduler
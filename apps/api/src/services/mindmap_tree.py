@@ -0,0 +1,173 @@
+import json
+from typing import Any, Iterator, Optional, Sequence
+
+import numpy as np
+
+from ..schemas.mindmap import MindmapResponse
+
+PATH_SEPARATOR = " / "
+LEVELS = (1, 2, 3, 4, 5)
+
+
+def parse_mindmap(raw: Any) -> Optional[dict]:
+    """Parses a stored mindmap into a dict
+
+    Mindmaps are stored as text and are sometimes double encoded, so strings are
+    decoded until a dict comes out (or parsing fails).
+
+    Args:
+        raw (Any): The stored mindmap (str or dict)
+
+    Returns:
+        Optional[dict]: The mindmap root, or None if it can't be parsed
+    """
+    for _ in range(3):
+        if isinstance(raw, dict):
+            return raw
+        if not isinstance(raw, str):
+            return None
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+    return raw if isinstance(raw, dict) else None
+
+
+def coerce_level(value: Any) -> float:
+    """Returns an understandingLevel as a float in 1-5, or NaN if it isn't one"""
+    try:
+        level = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return level if LEVELS[0] <= level <= LEVELS[-1] else np.nan
+
+
+class MindmapTree:
+    """Flattened, indexed mindmap
+
+    Nodes are stored in document (pre-order) order as parallel arrays: `parents`
+    holds each node's parent index (-1 for the root), `depths` its nesting level
+    and `scores` its understandingLevel (NaN when unset). `index` maps a node path
+    ("Topic / Subtopic / ...") to its position, so lookups are O(1). The remaining
+    node fields are kept per node in `attrs` so the original JSON can be dumped
+    back unchanged.
+    """
+
+    __slots__ = ("paths", "index", "parents", "depths", "scores", "attrs", "_has_subtopics", "_wrapped")
+
+    def __init__(self, mindmap: dict):
+        root = mindmap.get("topic", mindmap)
+        self._wrapped = "topic" in mindmap
+        self.paths: list[str] = []
+        self.attrs: list[dict] = []
+        self._has_subtopics: list[bool] = []
+        parents: list[int] = []
+        depths: list[int] = []
+
+        stack: list[tuple[Any, int, int]] = [(root, -1, 0)]
+        while stack:
+            node, parent, depth = stack.pop()
+            if not isinstance(node, dict):
+                continue
+            i = len(self.paths)
+            name = str(node.get("name", ""))
+            self.paths.append(f"{self.paths[parent]}{PATH_SEPARATOR}{name}" if parent >= 0 else name)
+            self.attrs.append({key: value for key, value in node.items() if key != "subtopics"})
+            self._has_subtopics.append("subtopics" in node)
+            parents.append(parent)
+            depths.append(depth)
+            # Reversed so nodes come out in document order
+            stack.extend((child, i, depth + 1) for child in reversed(node.get("subtopics") or []))
+
+        # Later duplicates of a path keep the first node's index
+        self.index: dict[str, int] = {}
+        for i, path in enumerate(self.paths):
+            self.index.setdefault(path, i)
+        self.parents = np.array(parents, dtype=np.int32)
+        self.depths = np.array(depths, dtype=np.int8)
+        self.scores = np.array([coerce_level(a.get("understandingLevel")) for a in self.attrs], dtype=np.float64)
+
+    @classmethod
+    def loads(cls, raw: Any) -> Optional["MindmapTree"]:
+        """Builds a tree from a stored mindmap (str or dict), or None if it can't be parsed"""
+        if isinstance(raw, cls):
+            return raw
+        mindmap = parse_mindmap(raw)
+        return cls(mindmap) if mindmap is not None else None
+
+    @classmethod
+    def from_model(cls, model: MindmapResponse) -> "MindmapTree":
+        return cls(model.model_dump())
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.index
+
+    def __iter__(self) -> Iterator[tuple[str, dict]]:
+        """Yields (path, node fields) in document order"""
+        return zip(self.paths, self.attrs)
+
+    def node(self, path: str) -> dict:
+        """Returns the fields of the node at `path` (without its subtopics)"""
+        return self.attrs[self.index[path]]
+
+    def score(self, path: str) -> float:
+        return float(self.scores[self.index[path]])
+
+    def set_score(self, path: str, level: Optional[float]) -> None:
+        i = self.index[path]
+        self.attrs[i]["understandingLevel"] = level
+        self.scores[i] = coerce_level(level)
+
+    def children(self, path: str) -> list[str]:
+        return [self.paths[i] for i in np.flatnonzero(self.parents == self.index[path])]
+
+    def to_dict(self) -> dict:
+        """Rebuilds the nested mindmap in its original JSON shape"""
+        nodes = []
+        for i, attrs in enumerate(self.attrs):
+            node = dict(attrs)
+            if self._has_subtopics[i]:
+                node["subtopics"] = []
+            nodes.append(node)
+            parent = self.parents[i]
+            if parent >= 0:
+                nodes[parent].setdefault("subtopics", []).append(node)
+        root = nodes[0] if nodes else {}
+        return {"topic": root} if self._wrapped else root
+
+    def dumps(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def to_model(self) -> MindmapResponse:
+        return MindmapResponse(**self.to_dict())
+
+    def compare(self, other: "MindmapTree") -> dict[str, tuple[float, float]]:
+        """Returns {path: (self score, other score)} for nodes whose scores differ"""
+        shared = [path for path in self.paths if path in other.index]
+        mine = self.scores[[self.index[p] for p in shared]]
+        theirs = other.scores[[other.index[p] for p in shared]]
+        changed = ~((mine == theirs) | (np.isnan(mine) & np.isnan(theirs)))
+        return {shared[i]: (float(mine[i]), float(theirs[i])) for i in np.flatnonzero(changed)}
+
+
+def score_matrix(trees: Sequence[MindmapTree]) -> tuple[list[str], np.ndarray]:
+    """Lays out understanding levels of many trees as a (trees x nodes) matrix
+
+    Columns are the union of node paths in first-seen order; nodes missing from a
+    tree are NaN.
+
+    Returns:
+        tuple[list[str], np.ndarray]: Node paths (column order) and the level matrix
+    """
+    columns: dict[str, int] = {}
+    positions = [
+        np.fromiter((columns.setdefault(path, len(columns)) for path in tree.paths), dtype=np.intp, count=len(tree))
+        for tree in trees
+    ]
+    matrix = np.full((len(trees), len(columns)), np.nan)
+    for i, tree in enumerate(trees):
+        matrix[i, positions[i]] = tree.scores
+    return list(columns), matrix
@@ -0,0 +1,197 @@
+"""Checks LLM-filled mindmaps against their assessment's template
+
+compile_template turns a template into two things, cached per template:
+
+- A JSON schema sent as the `response_format`, to steer the model. It only
+  uses the subset of JSON Schema that structured-output providers share
+  (type, properties, required, items and description), so it can't pin down
+  node names or the number of subtopics; those are given as descriptions.
+- A validator for the result. It is not a JSON Schema validator: it compares
+  the filled mindmap's flattened tree (services/mindmap_tree.py) with the
+  template's, node by node, which also catches what the schema can't express.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+
+from .mindmap_tree import MindmapTree, parse_mindmap
+
+# Fields the LLM adds to every node when filling in a template
+FILLED_FIELDS = ("studentResponse", "understandingLevel")
+CACHE_SIZE = 256
+
+
+class MindmapValidationError(ValueError):
+    """Raised when a filled mindmap doesn't match its assessment's template"""
+
+    def __init__(self, errors: list[str]):
+        super().__init__("Filled mindmap doesn't match the template: " + "; ".join(errors[:5]))
+        self.errors = errors
+
+
+# The only JSON Schema keywords the emitted schemas use
+SCHEMA_KEYWORDS = frozenset({"type", "properties", "required", "items", "description"})
+
+
+def _value_schema(value: Any) -> dict:
+    if isinstance(value, dict):
+        return {
+            "type": "object",
+            "properties": {key: _value_schema(item) for key, item in value.items()},
+            "required": list(value),
+        }
+    if isinstance(value, list):
+        return {"type": "array", "items": _value_schema(value[0]) if value else {"type": "string"}}
+    if isinstance(value, bool):
+        return {"type": "boolean"}
+    if isinstance(value, (int, float)):
+        return {"type": "number"}
+    return {"type": "string"}
+
+
+def _merge(schemas: list[dict]) -> dict:
+    """One schema that every one of `schemas` (objects of the same shape) fits: shared properties are required"""
+    if not all(schema.get("type") == "object" for schema in schemas):
+        return schemas[0]
+    names = list(dict.fromkeys(name for schema in schemas for name in schema["properties"]))
+    return {
+        "type": "object",
+        "properties": {
+            name: _merge([schema["properties"][name] for schema in schemas if name in schema["properties"]])
+            for name in names
+        },
+        "required": [name for name in names if all(name in schema["required"] for schema in schemas)],
+    }
+
+
+def _node_schema(node: dict) -> dict:
+    properties = {key: _value_schema(value) for key, value in node.items() if key not in ("subtopics", *FILLED_FIELDS)}
+    properties["name"] = {"type": "string"}
+    properties["studentResponse"] = {"type": "string"}
+    properties["understandingLevel"] = {"type": "integer", "description": "1 (none) to 5 (full understanding)"}
+    children = [child for child in node.get("subtopics") or [] if isinstance(child, dict)]
+    child_schemas = [_node_schema(child) for child in children]
+    properties["subtopics"] = {
+        "type": "array",
+        # Siblings share one item schema, so which one goes where is only described
+        "items": _merge(child_schemas) if child_schemas else {"type": "object", "properties": {}, "required": []},
+        "description": f"Exactly {len(children)} entries: "
+        + (", ".join(repr(child.get("name", "")) for child in children) or "none")
+        + ", in this order",
+    }
+    return {"type": "object", "properties": properties, "required": list(properties)}
+
+
+class CompiledTemplate:
+    """A mindmap template compiled for validating filled mindmaps
+
+    Holds the template's JSON schema (also usable as an OpenRouter
+    `response_format`) and the flattened structure every filled mindmap must
+    reproduce: the same node paths, in the same order, under the same parents.
+    """
+
+    __slots__ = (
+        "digest",
+        "template",
+        "template_json",
+        "schema",
+        "response_format",
+        "response_format_json",
+        "_tree",
+        "_required",
+    )
+
+    def __init__(self, digest: str, template: dict):
+        self.digest = digest
+        self.template = template
+        self.template_json = json.dumps(template, indent=2)
+        root = template.get("topic", template)
+        node_schema = _node_schema(root)
+        self.schema = (
+            {"type": "object", "properties": {"topic": node_schema}, "required": ["topic"]}
+            if "topic" in template
+            else node_schema
+        )
+        self.response_format = {
+            "type": "json_schema",
+            "json_schema": {"name": "filled_mindmap", "strict": False, "schema": self.schema},
+        }
+        # Serialized once so every request for this template can splice it in as-is
+        self.response_format_json = json.dumps(self.response_format, separators=(",", ":")).encode()
+        self._tree = MindmapTree(template)
+        self._required = [frozenset(attrs) | set(FILLED_FIELDS) for attrs in self._tree.attrs]
+
+    def validate(self, filled: Any) -> MindmapTree:
+        """Checks a filled mindmap against the template
+
+        Args:
+            filled (Any): The filled mindmap (str or dict)
+
+        Raises:
+            MindmapValidationError: If the structure or filled fields don't match
+
+        Returns:
+            MindmapTree: The parsed filled mindmap
+        """
+        tree = MindmapTree.loads(filled)
+        if tree is None:
+            raise MindmapValidationError(["not a JSON object"])
+        if tree.paths != self._tree.paths or not np.array_equal(tree.parents, self._tree.parents):
+            missing = [path for path in self._tree.paths if path not in tree.index]
+            extra = [path for path in tree.paths if path not in self._tree.index]
+            raise MindmapValidationError(
+                [f"missing node {path!r}" for path in missing]
+                + [f"unexpected node {path!r}" for path in extra]
+                or ["nodes are out of order"]
+            )
+
+        errors = []
+        unscored = np.flatnonzero(np.isnan(tree.scores) | (tree.scores != np.round(tree.scores)))
+        errors += [f"{tree.paths[i]!r} has no integer understandingLevel 1-5" for i in unscored]
+        for path, attrs, required in zip(tree.paths, tree.attrs, self._required):
+            if not required <= attrs.keys():
+                errors.append(f"{path!r} is missing {sorted(required - attrs.keys())}")
+            elif not isinstance(attrs["studentResponse"], str):
+                errors.append(f"{path!r} has a non-string studentResponse")
+        if errors:
+            raise MindmapValidationError(errors)
+        return tree
+
+
+_cache: "OrderedDict[str, CompiledTemplate]" = OrderedDict()
+
+
+def template_digest(template: Any) -> str:
+    """Returns a stable hash of a mindmap template"""
+    text = template if isinstance(template, str) else json.dumps(template, sort_keys=True)
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def compile_template(template: Any) -> CompiledTemplate:
+    """Compiles a mindmap template, reusing the cached result for the same template
+
+    Args:
+        template (Any): The assessment's mindmap_template (str or dict)
+
+    Raises:
+        MindmapValidationError: If the template itself can't be parsed
+
+    Returns:
+        CompiledTemplate: The compiled template
+    """
+    digest = template_digest(template)
+    compiled = _cache.get(digest)
+    if compiled is not None:
+        _cache.move_to_end(digest)
+        return compiled
+
+    parsed = parse_mindmap(template)
+    if parsed is None:
+        raise MindmapValidationError(["mindmap template is not a JSON object"])
+    compiled = _cache[digest] = CompiledTemplate(digest, parsed)
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return compiled
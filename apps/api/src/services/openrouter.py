@@ -0,0 +1,182 @@
+import hashlib
+import json
+from functools import lru_cache
+from typing import Any, Callable, Mapping, Optional
+
+import httpx
+
+from ..config import settings
+from ..prompts import Prompt
+from .cache import Codec, get_cache
+from .json_extract import JSONExtractionError, JSONExtractor
+from .llm_scheduler import Priority, get_scheduler
+
+OPENROUTER_URL = f"{settings.OPENROUTER_BASE_URL.rstrip('/')}/chat/completions"
+
+_client: Optional[httpx.AsyncClient] = None
+_json_codec = Codec()
+
+
+class OpenRouterError(Exception):
+    """Raised when OpenRouter returns an error or an unusable response"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class _Uncacheable(Exception):
+    """Carries a usable value out of a cache load without it being cached"""
+
+    def __init__(self, value: Any):
+        super().__init__("Value not to be cached")
+        self.value = value
+
+
+def get_client() -> httpx.AsyncClient:
+    """Returns the shared HTTP client so connections are reused across calls"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=60.0)
+    return _client
+
+
+@lru_cache(maxsize=1)
+def request_headers() -> dict[str, str]:
+    """Headers for every OpenRouter request, built once"""
+    if not settings.OPENROUTER_API_KEY:
+        raise OpenRouterError("OPENROUTER_API_KEY is missing from settings")
+    return {
+        "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "https://alterview-web.vercel.app",
+        "X-Title": "Alterview Education App",
+    }
+
+
+async def chat_completion(
+    prompt: Prompt,
+    variables: Mapping[str, Any],
+    *,
+    response_format: Optional[bytes] = None,
+    priority: Priority = Priority.BATCH,
+) -> str:
+    """Sends a chat completion request to OpenRouter
+
+    Args:
+        prompt (Prompt): Registered prompt to send
+        variables (Mapping[str, Any]): Values for the prompt's user message
+        response_format (Optional[bytes], optional): Pre-serialized format overriding the prompt's. Defaults to None.
+        priority (Priority, optional): Scheduling class of the call. Defaults to Priority.BATCH.
+
+    Raises:
+        OpenRouterError: On a non-200 response, a network error or a response without content
+
+    Returns:
+        str: Content of the first choice
+    """
+    body = prompt.payload(variables, response_format=response_format)
+    try:
+        async with get_scheduler().slot(priority):
+            response = await get_client().post(OPENROUTER_URL, headers=request_headers(), content=body)
+    except httpx.RequestError as e:
+        raise OpenRouterError(f"Error making request to OpenRouter API: {e}") from e
+
+    if response.status_code != 200:
+        raise OpenRouterError(f"OpenRouter API error: {response.text}", response.status_code)
+
+    try:
+        return response.json()["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        raise OpenRouterError(f"Malformed OpenRouter API response: {e}") from e
+
+
+async def chat_completion_json(
+    prompt: Prompt,
+    variables: Mapping[str, Any],
+    *,
+    response_format: Optional[bytes] = None,
+    expect: Optional[type] = None,
+    validate: Optional[Callable[[Any], Any]] = None,
+    priority: Priority = Priority.BATCH,
+) -> Any:
+    """Streams a chat completion and returns the first JSON value in it
+
+    The streamed content is fed to a JSONExtractor, so the stream is closed as
+    soon as the value is complete, and surrounding prose, markdown fences or a
+    truncated ending are handled without another round trip.
+
+    With LLM_CACHE_TTL set, results are cached for that many seconds by request
+    body, so an identical request (same prompt, variables, model and format),
+    from this worker or another, reuses the answer, and concurrent ones share a
+    call. Only values that passed `validate` and weren't repaired from a
+    truncated response are cached.
+
+    Args:
+        prompt (Prompt): Registered prompt to send
+        variables (Mapping[str, Any]): Values for the prompt's user message
+        response_format (Optional[bytes], optional): Pre-serialized format overriding the prompt's. Defaults to None.
+        expect (Optional[type], optional): dict or list to only accept objects or arrays. Defaults to either.
+        validate (Optional[Callable[[Any], Any]], optional): Raises if the value isn't usable. Defaults to None.
+        priority (Priority, optional): Scheduling class of the call. Defaults to Priority.BATCH.
+
+    Raises:
+        OpenRouterError: On a non-200 response, a network error or no recoverable JSON
+        Exception: Whatever `validate` raises
+
+    Returns:
+        Any: The parsed JSON object or array
+    """
+    body = prompt.payload(variables, stream=True, response_format=response_format)
+
+    async def load() -> Any:
+        extractor = await _stream_json(body, expect, priority)
+        if validate is not None:
+            validate(extractor.value)
+        if extractor.repaired:
+            raise _Uncacheable(extractor.value)
+        return extractor.value
+
+    try:
+        if settings.LLM_CACHE_TTL <= 0:
+            return await load()
+        key = "llm:" + hashlib.sha256(body + (expect.__name__ if expect else "").encode()).hexdigest()
+        return await get_cache().get_or_load(key, load, ttl=settings.LLM_CACHE_TTL, codec=_json_codec, immutable=True)
+    except _Uncacheable as e:
+        # Usable, if repaired: returned (to every caller that shared the load) but not cached
+        return e.value
+
+
+async def _stream_json(body: bytes, expect: Optional[type], priority: Priority) -> JSONExtractor:
+    """Streams the completion into a JSONExtractor, returned once it holds the value"""
+    extractor = JSONExtractor(expect)
+    try:
+        async with get_scheduler().slot(priority), get_client().stream(
+            "POST", OPENROUTER_URL, headers=request_headers(), content=body
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise OpenRouterError(f"OpenRouter API error: {response.text}", response.status_code)
+            async for line in response.aiter_lines():
+                # Server-sent events; lines starting with ":" are keep-alive comments
+                if not line.startswith("data: "):
+                    continue
+                data = line[len("data: ") :]
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                if "error" in event:
+                    raise OpenRouterError(f"OpenRouter API error: {event['error']}")
+                extractor.feed(event["choices"][0]["delta"].get("content") or "")
+                if extractor.done:
+                    break
+    except httpx.RequestError as e:
+        raise OpenRouterError(f"Error making request to OpenRouter API: {e}") from e
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        raise OpenRouterError(f"Malformed OpenRouter API stream: {e}") from e
+
+    try:
+        extractor.finish()
+    except JSONExtractionError as e:
+        raise OpenRouterError(f"No JSON in OpenRouter API response: {e}") from e
+    return extractor
@@ -0,0 +1,180 @@
+"""A minimal asyncio client for the Redis protocol (RESP)
+
+Only what the shared cache tier and event bus need: a small connection pool,
+commands sent as argument lists and pub/sub subscriptions. It speaks to Redis, Valkey, KeyDB or any other server
+of the protocol, such as the stand-in in tests/fakes/redis.py.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Optional
+from urllib.parse import unquote, urlparse
+
+
+class RedisError(Exception):
+    """Raised on an error reply, or when the server can't be reached in time"""
+
+
+def encode_command(*args: Any) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """Reads one reply: str for simple strings, int, bytes or None for bulk strings, list for arrays
+
+    Error replies are returned as RedisError rather than raised, so the caller
+    can put the connection back first.
+    """
+    line = await reader.readuntil(b"\r\n")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        return RedisError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        return None if length < 0 else (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        length = int(payload)
+        return None if length < 0 else [await read_reply(reader) for _ in range(length)]
+    raise RedisError(f"Unexpected reply {line!r}")
+
+
+class RedisClient:
+    """Sends commands to the server at `url` (redis://[:password@]host[:port][/db]) over pooled connections
+
+    Args:
+        url (str): Server address
+        pool_size (int, optional): Connections kept open. Defaults to 4.
+        timeout (float, optional): Seconds to connect or get a reply before RedisError. Defaults to 1.
+    """
+
+    def __init__(self, url: str, *, pool_size: int = 4, timeout: float = 1.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(pool_size)
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        setup = ([("AUTH", self.password)] if self.password else []) + ([("SELECT", self.db)] if self.db else [])
+        for command in setup:
+            writer.write(encode_command(*command))
+            await writer.drain()
+            reply = await read_reply(reader)
+            if isinstance(reply, RedisError):
+                writer.close()
+                raise reply
+        return reader, writer
+
+    @staticmethod
+    async def _roundtrip(connection: tuple[asyncio.StreamReader, asyncio.StreamWriter], args: tuple) -> Any:
+        reader, writer = connection
+        writer.write(encode_command(*args))
+        await writer.drain()
+        return await read_reply(reader)
+
+    async def execute(self, *args: Any) -> Any:
+        """Sends one command and returns its reply
+
+        Raises:
+            RedisError: On an error reply, a timeout or a connection failure
+        """
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            try:
+                if connection is None:
+                    connection = await asyncio.wait_for(self._connect(), self.timeout)
+                reply = await asyncio.wait_for(self._roundtrip(connection, args), self.timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                # The connection may be midway through a reply, so it isn't reused
+                if connection is not None:
+                    connection[1].close()
+                raise RedisError(f"{type(e).__name__}: {e}") from e
+            self._idle.append(connection)
+            if isinstance(reply, RedisError):
+                raise reply
+            return reply
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.execute("GET", key)
+
+    async def set(self, key: str, value: bytes, *, ttl: Optional[float] = None, only_new: bool = False) -> bool:
+        """Stores value under key, expiring after `ttl` seconds; with only_new, only if the key is free"""
+        args = ["SET", key, value]
+        if ttl:
+            args += ["PX", max(int(ttl * 1000), 1)]
+        if only_new:
+            args.append("NX")
+        return await self.execute(*args) is not None
+
+    async def delete(self, *keys: str) -> int:
+        return await self.execute("DEL", *keys)
+
+    async def incr(self, key: str) -> int:
+        return await self.execute("INCR", key)
+
+    async def publish(self, channel: str, message: bytes) -> int:
+        """Sends a message to the channel's subscribers, returning how many got it"""
+        return await self.execute("PUBLISH", channel, message)
+
+    async def subscribe(self, channel: str) -> "PubSub":
+        """Subscribes a connection of its own to the channel, returning once the server confirmed it
+
+        Raises:
+            RedisError: On an error reply, a timeout or a connection failure
+        """
+        writer = None
+        try:
+            reader, writer = await asyncio.wait_for(self._connect(), self.timeout)
+            writer.write(encode_command("SUBSCRIBE", channel))
+            await writer.drain()
+            reply = await asyncio.wait_for(read_reply(reader), self.timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+            if writer is not None:
+                writer.close()
+            raise RedisError(f"{type(e).__name__}: {e}") from e
+        if isinstance(reply, RedisError):
+            writer.close()
+            raise reply
+        return PubSub(reader, writer)
+
+    async def close(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+class PubSub:
+    """A connection subscribed to a channel; iterating it yields the messages published there
+
+    Messages are waited for without a timeout, as a subscribed connection is
+    quiet until something is published. Iteration raises RedisError when the
+    connection is lost.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            while True:
+                reply = await read_reply(self._reader)
+                if isinstance(reply, RedisError):
+                    raise reply
+                if isinstance(reply, list) and reply[0] == b"message":
+                    yield reply[2]
+        except (OSError, asyncio.IncompleteReadError) as e:
+            raise RedisError(f"{type(e).__name__}: {e}") from e
+
+    def close(self) -> None:
+        self._writer.close()
@@ -0,0 +1,120 @@
+"""Streaming export of assessment results as NDJSON or CSV
+
+Results are read from the database a page at a time and each page is encoded
+and handed to the response before the next is fetched, so an export holds one
+page in memory whatever its size.
+
+With `scores`, each row also carries its mindmap's understanding levels by node
+path ("Topic / Subtopic"). In NDJSON they are a "scores" object. In CSV they get
+one "score:<path>" column per node of the assessment's template when the
+export covers a single assessment, and otherwise a "scores" column holding the
+JSON object, since results of different assessments have different nodes.
+"""
+import csv
+import io
+import json
+import math
+from typing import AsyncIterator, Optional
+
+from ..crud.assessment_result import assessment_result
+from ..storage import StorageBackend
+from .mindmap_tree import MindmapTree
+from .transcripts import assemble
+
+COLUMNS = (
+    "id",
+    "created_at",
+    "assessment_id",
+    "teacher_id",
+    "student_id",
+    "voice_recording_id",
+    "transcript",
+    "mindmap",
+    "insights",
+)
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def parse_columns(spec: Optional[str]) -> list[str]:
+    """Returns the columns named in a comma separated `spec`, or all of them
+
+    Raises:
+        ValueError: If a column doesn't exist
+    """
+    if not spec:
+        return list(COLUMNS)
+    columns = [column.strip() for column in spec.split(",") if column.strip()]
+    unknown = [column for column in columns if column not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}. Available: {', '.join(COLUMNS)}")
+    return columns
+
+
+def template_paths(mindmap_template: str) -> Optional[list[str]]:
+    """Returns the node paths of an assessment's template, the score columns of its CSV export"""
+    tree = MindmapTree.loads(mindmap_template)
+    return list(tree.index) if tree is not None else None
+
+
+def mindmap_scores(raw_mindmap) -> dict[str, Optional[float]]:
+    """Returns the understanding level of each node of a stored mindmap (None if unset)"""
+    tree = MindmapTree.loads(raw_mindmap) if raw_mindmap else None
+    if tree is None:
+        return {}
+    levels = tree.scores.tolist()
+    return {path: None if math.isnan(levels[i]) else levels[i] for path, i in tree.index.items()}
+
+
+async def export_results(
+    db: StorageBackend,
+    *,
+    where: dict,
+    fmt: str = "ndjson",
+    columns: Optional[list[str]] = None,
+    scores: bool = False,
+    score_paths: Optional[list[str]] = None,
+    page_size: int = 500,
+) -> AsyncIterator[bytes]:
+    """Yields the matching results, encoded, one page at a time
+
+    Args:
+        db (StorageBackend): Database to read from
+        where (dict): Result filter, e.g. {"teacher_id": 1}
+        fmt (str, optional): "ndjson" or "csv". Defaults to "ndjson".
+        columns (list[str], optional): Result columns to include. Defaults to all.
+        scores (bool, optional): Add each result's flattened mindmap scores. Defaults to False.
+        score_paths (list[str], optional): Node paths to give their own CSV column
+        page_size (int, optional): Results fetched per query. Defaults to 500.
+    """
+    columns = columns or list(COLUMNS)
+    fetched = [*columns, "mindmap"] if scores and "mindmap" not in columns else columns
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer is not None:
+        header = list(columns)
+        if scores:
+            header += [f"score:{path}" for path in score_paths] if score_paths is not None else ["scores"]
+        writer.writerow(header)
+
+    async for page in assessment_result.iter_pages(db, where=where, columns=fetched, page_size=page_size):
+        if "transcript" in columns:
+            await assemble(db, page)
+        for row in page:
+            levels = mindmap_scores(row.get("mindmap")) if scores else None
+            if writer is None:
+                record = {column: row.get(column) for column in columns}
+                if scores:
+                    record["scores"] = levels
+                buffer.write(json.dumps(record, default=str))
+                buffer.write("\n")
+                continue
+            cells = [row.get(column) for column in columns]
+            if scores:
+                cells += [levels.get(path) for path in score_paths] if score_paths is not None else [json.dumps(levels)]
+            writer.writerow(cells)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():  # Only the CSV header, for an empty export
+        yield buffer.getvalue().encode()
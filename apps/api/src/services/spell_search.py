@@ -0,0 +1,142 @@
+"""In-process spell search index
+
+Spells are a small, rarely changing table that's searched on every keystroke,
+so instead of an `ilike '%keyword%'` scan per query the whole table is indexed
+in memory: each field's text is split into trigrams (words padded like
+pg_trgm, so the first trigrams of a word double as its prefixes) with a
+posting list per trigram. A query only scores the spells sharing a trigram
+with it, ranking exact matches first, then prefix, word prefix and substring
+matches, then fuzzy matches by the fraction of the query's trigrams they
+contain, which is what tolerates typos ("levosa" finds "Leviosa").
+
+The index is rebuilt from the table after SPELL_INDEX_TTL seconds, or on the
+next search after a spell is written through the API (see crud/spell.py).
+"""
+import asyncio
+import heapq
+import re
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Iterable, Optional
+
+from ..config import settings
+from ..schemas.spell import Spell
+from ..storage import StorageBackend
+
+FIELDS = ("id", "name", "description")
+# Minimum fraction of the query's trigrams a fuzzy match must contain
+MIN_SIMILARITY = 0.5
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize(text: str) -> str:
+    """Case- and accent-insensitive form of `text`, with runs of punctuation and space collapsed"""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_WORD.sub(" ", stripped).strip()
+
+
+def trigrams(text: str) -> set[str]:
+    """Trigrams of each word of normalized `text`, padded with two spaces in front and one behind"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SpellIndex:
+    """Trigram index over the id, name and description of a set of spells"""
+
+    def __init__(self, spells: Iterable[Spell]):
+        self.spells = list(spells)
+        self.texts: dict[str, list[str]] = {field: [] for field in FIELDS}
+        self.postings: dict[str, dict[str, list[int]]] = {field: defaultdict(list) for field in FIELDS}
+        for i, spell in enumerate(self.spells):
+            for field in FIELDS:
+                text = normalize(getattr(spell, field))
+                self.texts[field].append(text)
+                for gram in trigrams(text):
+                    self.postings[field][gram].append(i)
+
+    def search(self, query: str, *, field: str = "name", limit: Optional[int] = 10) -> list[Spell]:
+        """Returns the spells best matching `query` on `field`, best first
+
+        Args:
+            query (str): Search text, possibly partial or misspelled
+            field (str, optional): "id", "name" or "description". Defaults to "name".
+            limit (int, optional): Maximum number of results, None for all. Defaults to 10.
+
+        Returns:
+            list[Spell]: Matching spells, ranked by relevance
+        """
+        needle = normalize(query)
+        query_grams = trigrams(needle)
+        if not query_grams:
+            return []
+        shared: Counter[int] = Counter()
+        postings = self.postings[field]
+        for gram in query_grams:
+            shared.update(postings.get(gram, ()))
+
+        texts = self.texts[field]
+        ranked = []
+        for i, count in shared.items():
+            text = texts[i]
+            similarity = count / len(query_grams)
+            if text == needle:
+                tier = 4
+            elif text.startswith(needle):
+                tier = 3
+            elif f" {needle}" in f" {text}":
+                tier = 2
+            elif needle in text:
+                tier = 1
+            elif similarity >= MIN_SIMILARITY:
+                tier = 0
+            else:
+                continue
+            # Shorter texts first among equals: "Lumos" before "Lumos Maxima"
+            ranked.append((-tier, -similarity, len(text), text, i))
+        best = sorted(ranked) if limit is None else heapq.nsmallest(limit, ranked)
+        return [self.spells[entry[-1]] for entry in best]
+
+
+_index: Optional[SpellIndex] = None
+_built_at = 0.0
+_building: Optional[asyncio.Future] = None
+# Bumped on every write, so a rebuild that read the table before the write isn't kept
+_generation = 0
+
+
+def invalidate() -> None:
+    """Makes the next search rebuild the index, after a spell was written"""
+    global _index, _building, _generation
+    _index = _building = None
+    _generation += 1
+
+
+async def get_index(db: StorageBackend) -> SpellIndex:
+    """Returns the spell index, (re)building it from the table when missing or stale
+
+    Concurrent searches during a rebuild wait for the same rebuild.
+    """
+    global _building
+    if _index is not None and time.monotonic() - _built_at < settings.SPELL_INDEX_TTL:
+        return _index
+    loop = asyncio.get_running_loop()
+    if _building is None or _building.done() or _building.get_loop() is not loop:
+        _building = loop.create_task(_build(db))
+    return await asyncio.shield(_building)
+
+
+async def _build(db: StorageBackend) -> SpellIndex:
+    global _index, _built_at
+    started, generation = time.monotonic(), _generation
+    rows = await db.select(Spell.table_name)
+    index = SpellIndex(Spell(**row) for row in rows)
+    if generation == _generation:
+        _index, _built_at = index, started
+    return index
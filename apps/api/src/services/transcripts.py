@@ -0,0 +1,71 @@
+"""Live transcripts stored as appended segments
+
+While an interview runs, each utterance is appended as a TranscriptSegment
+row, so a live update writes only that segment instead of the whole result.
+A result's full transcript is its `transcript` column (whatever was written
+with the row) followed by its pending segments, one "Speaker: text" line each,
+in interview order. It is only assembled when something reads it. Processing
+the result folds the segments into the column and deletes them (`compact`).
+Writing the column through the API (a PUT, or a PATCH that sends it) replaces
+the full transcript, as read back with the segments, so they are deleted too.
+"""
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from ..crud.transcript_segment import transcript_segment
+from ..schemas.transcript_segment import TranscriptSegment
+from ..storage import StorageBackend
+
+# Results whose segments are fetched per query, to stay within query size limits
+CHUNK = 500
+
+
+def render(transcript: Optional[str], segments: Iterable[TranscriptSegment]) -> Optional[str]:
+    """Returns the stored transcript followed by the segments' lines"""
+    lines = [f"{segment.speaker}: {segment.text}" for segment in segments]
+    if not lines:
+        return transcript
+    return "\n".join([transcript, *lines] if transcript else lines)
+
+
+async def pending_segments(db: StorageBackend, result_ids: list[int]) -> dict[int, list[TranscriptSegment]]:
+    """Returns the segments not yet folded into each result's transcript, a query per CHUNK results"""
+    by_result: dict[int, list[TranscriptSegment]] = defaultdict(list)
+    for start in range(0, len(result_ids), CHUNK):
+        chunk = result_ids[start:start + CHUNK]
+        for segment in await transcript_segment.get_by_results(db, result_ids=chunk):
+            by_result[segment.result_id].append(segment)
+    return by_result
+
+
+async def pending_for(db: StorageBackend, result_id: int) -> list[TranscriptSegment]:
+    """Returns the segments not yet folded into one result's transcript"""
+    return (await pending_segments(db, [result_id])).get(result_id, [])
+
+
+async def assemble(db: StorageBackend, results: list) -> list:
+    """Fills in the full transcript of each result (models or row dicts) that has pending segments"""
+    def get(result, field):
+        return result[field] if isinstance(result, dict) else getattr(result, field)
+
+    segments = await pending_segments(db, [get(result, "id") for result in results])
+    for result in results:
+        pending = segments.get(get(result, "id"))
+        if not pending:
+            continue
+        transcript = render(get(result, "transcript"), pending)
+        if isinstance(result, dict):
+            result["transcript"] = transcript
+        else:
+            result.transcript = transcript
+    return results
+
+
+async def compact(db: StorageBackend, segments: list[TranscriptSegment]) -> None:
+    """Deletes segments once the transcript they were rendered into has been written to the result
+
+    Only the given segments are deleted, so segments appended since they were
+    read stay pending.
+    """
+    if segments:
+        await transcript_segment.delete_many(db, ids=[segment.id for segment in segments])
@@ -0,0 +1,5 @@
+from .base import StorageBackend, StorageError
+from .blobs import BlobStore, LocalBlobStore, SupabaseBlobStore
+from .large_text import LargeTextBackend, LazyRow
+from .postgrest import PostgrestBackend
+from .sqlite import SQLiteBackend
@@ -0,0 +1,72 @@
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, Mapping, Optional, Sequence
+
+if TYPE_CHECKING:
+    from src.services.cache import Cache
+
+# `where` values of these types are matched with IN, anything else with =
+IN_TYPES = (list, tuple, set, frozenset)
+
+
+class StorageError(Exception):
+    """Raised by a storage backend when a query fails
+
+    Carries the same `code` and `details` as PostgREST errors so the CRUD objects
+    can report failures the same way whichever backend is in use.
+    """
+
+    def __init__(self, message: str, code: Optional[str] = None, details: Optional[str] = None):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.details = details
+
+
+class StorageBackend(ABC):
+    """Row storage behind the CRUD objects and services
+
+    Rows are plain dicts keyed by column name. Filters are given as `where`, a
+    mapping of column to value (or to a list/tuple/set of values to match any
+    of), `ilike`, a mapping of column to case-insensitive pattern, and `after`,
+    a mapping of column to a value it must be greater than (for keyset paging:
+    order by the column and pass the last value of the previous page).
+    """
+
+    # Caches CRUD lookups by id when set (see create_backend); backends made directly are uncached
+    cache: Optional["Cache"] = None
+
+    @abstractmethod
+    async def select(
+        self,
+        table: str,
+        *,
+        columns: Optional[Sequence[str]] = None,
+        where: Optional[Mapping[str, Any]] = None,
+        ilike: Optional[Mapping[str, str]] = None,
+        after: Optional[Mapping[str, Any]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+    ) -> list[dict]:
+        """Returns the matching rows, with all columns unless `columns` is given"""
+
+    @abstractmethod
+    async def insert(self, table: str, rows: Sequence[Mapping[str, Any]]) -> list[dict]:
+        """Inserts rows and returns them as stored (with ids and defaults)"""
+
+    @abstractmethod
+    async def update(
+        self, table: str, values: Mapping[str, Any], *, where: Mapping[str, Any], returning: bool = True
+    ) -> list[dict]:
+        """Updates the matching rows and returns them as stored
+
+        If not `returning`, only the number of rows matched is sent back: the
+        result is then an empty dict per matched row.
+        """
+
+    @abstractmethod
+    async def delete(self, table: str, *, where: Mapping[str, Any]) -> list[dict]:
+        """Deletes the matching rows and returns them"""
+
+    async def close(self) -> None:
+        """Releases the backend's connections"""
@@ -0,0 +1,87 @@
+import asyncio
+import secrets
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from storage3.utils import StorageException
+from supabase._async.client import AsyncClient
+
+
+class BlobStore(ABC):
+    """Object storage for values too large to keep in their row
+
+    Keys are "/" separated paths, e.g. "AssessmentResult/transcript/<sha256>".
+    """
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes) -> None:
+        """Stores data under key, replacing what was there"""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes:
+        """Returns the data stored under key
+
+        Raises:
+            KeyError: If nothing is stored under key
+        """
+
+    @abstractmethod
+    async def delete(self, keys: list[str]) -> None:
+        """Deletes the data stored under each key, skipping keys with nothing stored"""
+
+
+class LocalBlobStore(BlobStore):
+    """Stores blobs as files under a directory, standing in for object storage locally and in tests"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        path = (self.directory / key).resolve()
+        if not path.is_relative_to(self.directory.resolve()):
+            raise KeyError(key)
+        return path
+
+    async def put(self, key: str, data: bytes) -> None:
+        def write() -> None:
+            path = self._path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Written aside and renamed, so a reader never sees half a blob
+            temporary = path.with_name(f".{path.name}.{secrets.token_hex(4)}.tmp")
+            temporary.write_bytes(data)
+            temporary.replace(path)
+
+        await asyncio.to_thread(write)
+
+    async def get(self, key: str) -> bytes:
+        try:
+            return await asyncio.to_thread(self._path(key).read_bytes)
+        except FileNotFoundError:
+            raise KeyError(key) from None
+
+    async def delete(self, keys: list[str]) -> None:
+        def remove() -> None:
+            for key in keys:
+                self._path(key).unlink(missing_ok=True)
+
+        await asyncio.to_thread(remove)
+
+
+class SupabaseBlobStore(BlobStore):
+    """Stores blobs in a Supabase Storage bucket"""
+
+    def __init__(self, client: AsyncClient, bucket: str):
+        self.bucket = client.storage.from_(bucket)
+
+    async def put(self, key: str, data: bytes) -> None:
+        await self.bucket.upload(key, data, {"content-type": "application/octet-stream", "upsert": "true"})
+
+    async def get(self, key: str) -> bytes:
+        try:
+            return await self.bucket.download(key)
+        except StorageException as e:
+            raise KeyError(key) from e
+
+    async def delete(self, keys: list[str]) -> None:
+        if keys:
+            await self.bucket.remove(keys)
@@ -0,0 +1,246 @@
+"""Compressed and offloaded storage of large text columns
+
+Transcripts make up most of the bytes of the results table. LargeTextBackend
+wraps another backend and packs them on write: values of at least `min_size`
+bytes are stored zlib compressed (base64, behind a marker, so the column stays
+TEXT), and with a blob store, compressed values of at least `offload_size`
+bytes go to object storage and the row keeps only a reference to them.
+
+Only columns that nothing but the API reads are packed: the web app reads
+"Assessment" prompts and templates and writes result mindmaps straight through
+Supabase, so those stay plain text.
+
+Packed values are unpacked when read through the API. Rows come back as
+LazyRows, which unpack a value the first time it is read: that saves the work
+for code that handles raw rows (exports, stats) and skips a column, but CRUD
+reads build models, which read every field, so there it is all unpacked at
+once. Offloaded values are fetched when their row is selected, for the columns
+selected (reads are synchronous, so they can't be fetched on access); select
+only the columns you need to skip them.
+
+Packed columns can't be filtered on (`where` / `ilike`) except for null.
+Each offloaded value gets its own blob, which is deleted once its row is
+deleted or the column is overwritten. A failed delete only leaves the blob
+behind.
+"""
+import asyncio
+import base64
+import logging
+import secrets
+import zlib
+from typing import Any, Mapping, Optional, Sequence
+
+from .base import StorageBackend, StorageError
+from .blobs import BlobStore
+
+# The columns that are packed, per table (only ones the web app doesn't read directly)
+LARGE_COLUMNS = {
+    "AssessmentResult": frozenset({"transcript"}),
+}
+# Packed values start with a control character that plain text never does
+# (values that happen to are packed whatever their size, to stay unambiguous)
+MARKER = "\x1f"
+COMPRESSED = MARKER + "z:"
+OFFLOADED = MARKER + "blob:"
+LEVEL = 6
+
+logger = logging.getLogger(__name__)
+
+
+def unpack(value):
+    """Returns the text of a packed value (compressed bytes or an inline marker), or the value as is"""
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode()
+    if isinstance(value, str) and value.startswith(COMPRESSED):
+        return zlib.decompress(base64.b64decode(value[len(COMPRESSED):])).decode()
+    return value
+
+
+class LazyRow(dict):
+    """A row whose packed values are unpacked the first time they are read
+
+    Reading goes through __getitem__ however the row is used (r[k], r.get(k),
+    items(), dict(r), **r, json.dumps(r)): overriding __iter__ makes CPython
+    copy and unpack dict subclasses through the mapping protocol instead of
+    their raw storage.
+    """
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if isinstance(value, bytes) or (isinstance(value, str) and value.startswith(MARKER)):
+            value = unpack(value)
+            super().__setitem__(key, value)
+        return value
+
+    def __iter__(self):
+        return super().__iter__()
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def copy(self) -> "LazyRow":
+        return LazyRow(super().items())
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        return super().pop(key, *default)
+
+
+class LargeTextBackend(StorageBackend):
+    """Packs the LARGE_COLUMNS of rows written to `inner` and unpacks them on read
+
+    Args:
+        inner (StorageBackend): Backend that stores the rows
+        min_size (int, optional): Bytes from which a value is compressed; None stores new values as plain text
+        blobs (BlobStore, optional): Object storage for offloaded values, also needed to read them back
+        offload_size (int, optional): Compressed bytes from which a value is offloaded to `blobs`
+    """
+
+    def __init__(
+        self,
+        inner: StorageBackend,
+        *,
+        min_size: Optional[int] = 1024,
+        blobs: Optional[BlobStore] = None,
+        offload_size: int = 64 * 1024,
+    ):
+        self.inner = inner
+        self.min_size = min_size
+        self.blobs = blobs
+        self.offload_size = offload_size
+
+    async def _pack(self, table: str, rows: Sequence[Mapping[str, Any]]) -> tuple[list[dict], dict[str, str]]:
+        """Returns the rows as stored, and the text behind each packed value"""
+        columns = LARGE_COLUMNS.get(table, frozenset())
+        packed_rows, originals, uploads = [], {}, {}
+        for row in rows:
+            row = dict(row)
+            for column in columns & row.keys():
+                text = row[column]
+                if not isinstance(text, str):
+                    continue
+                data = text.encode()
+                forced = text.startswith(MARKER)
+                if not forced and (self.min_size is None or len(data) < self.min_size):
+                    continue
+                compressed = zlib.compress(data, LEVEL)
+                if self.blobs is not None and len(compressed) >= self.offload_size:
+                    key = f"{table}/{column}/{secrets.token_hex(16)}"
+                    uploads[key] = compressed
+                    stored = OFFLOADED + key
+                else:
+                    stored = COMPRESSED + base64.b64encode(compressed).decode()
+                    if len(stored) >= len(data) and not forced:
+                        continue  # Incompressible, kept as plain text
+                row[column] = stored
+                originals[stored] = text
+            packed_rows.append(row)
+        await asyncio.gather(*(self.blobs.put(key, data) for key, data in uploads.items()))
+        return packed_rows, originals
+
+    async def _unpack(self, table: str, rows: list[dict], originals: Optional[dict[str, str]] = None) -> list[dict]:
+        """Wraps rows as LazyRows, restoring just-written values and fetching offloaded ones"""
+        columns = LARGE_COLUMNS.get(table)
+        if not columns:
+            return rows
+        rows = [LazyRow(row) for row in rows]
+        offloaded = []
+        for row in rows:
+            for column in columns & row.keys():
+                value = dict.__getitem__(row, column)
+                if not isinstance(value, str) or not value.startswith(MARKER):
+                    continue
+                if originals and value in originals:
+                    dict.__setitem__(row, column, originals[value])
+                elif value.startswith(OFFLOADED):
+                    offloaded.append((row, column, value[len(OFFLOADED):]))
+        if offloaded:
+            keys = list({key for _, _, key in offloaded})
+            fetched = dict(zip(keys, await asyncio.gather(*(self._fetch(key) for key in keys))))
+            for row, column, key in offloaded:
+                dict.__setitem__(row, column, fetched[key])
+        return rows
+
+    def _offloaded(self, table: str, rows: list[dict]) -> list[str]:
+        """Returns the keys of the blobs that rows as stored refer to"""
+        columns = LARGE_COLUMNS.get(table, frozenset())
+        return [
+            row[column][len(OFFLOADED):]
+            for row in rows
+            for column in columns & row.keys()
+            if isinstance(row[column], str) and row[column].startswith(OFFLOADED)
+        ]
+
+    async def _delete_blobs(self, keys: list[str]) -> None:
+        if self.blobs is None or not keys:
+            return
+        try:
+            await self.blobs.delete(keys)
+        except Exception as e:
+            logger.warning("Failed to delete offloaded values", extra={"keys": keys, "error": str(e)})
+
+    async def _fetch(self, key: str) -> bytes:
+        if self.blobs is None:
+            raise StorageError(f"{key} is offloaded but no blob store is configured", "58P01")
+        try:
+            return await self.blobs.get(key)
+        except KeyError:
+            raise StorageError(f"{key} is missing from the blob store", "58P01") from None
+
+    async def select(
+        self,
+        table: str,
+        *,
+        columns: Optional[Sequence[str]] = None,
+        where: Optional[Mapping[str, Any]] = None,
+        ilike: Optional[Mapping[str, str]] = None,
+        after: Optional[Mapping[str, Any]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+    ) -> list[dict]:
+        rows = await self.inner.select(
+            table,
+            columns=columns,
+            where=where,
+            ilike=ilike,
+            after=after,
+            order_by=order_by,
+            descending=descending,
+            limit=limit,
+        )
+        return await self._unpack(table, rows)
+
+    async def insert(self, table: str, rows: Sequence[Mapping[str, Any]]) -> list[dict]:
+        packed, originals = await self._pack(table, rows)
+        return await self._unpack(table, await self.inner.insert(table, packed), originals)
+
+    async def update(
+        self, table: str, values: Mapping[str, Any], *, where: Mapping[str, Any], returning: bool = True
+    ) -> list[dict]:
+        overwritten = list(LARGE_COLUMNS.get(table, frozenset()) & values.keys())
+        # The blobs of the values being overwritten, deleted once the update is done
+        old = await self.inner.select(table, columns=overwritten, where=where) if self.blobs and overwritten else []
+        (packed,), originals = await self._pack(table, [values])
+        updated = await self.inner.update(table, packed, where=where, returning=returning)
+        await self._delete_blobs(self._offloaded(table, old))
+        return await self._unpack(table, updated, originals)
+
+    async def delete(self, table: str, *, where: Mapping[str, Any]) -> list[dict]:
+        deleted = await self.inner.delete(table, where=where)
+        # Read back before their blobs go
+        rows = await self._unpack(table, deleted)
+        await self._delete_blobs(self._offloaded(table, deleted))
+        return rows
+
+    async def close(self) -> None:
+        await self.inner.close()
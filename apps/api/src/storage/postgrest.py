@@ -0,0 +1,80 @@
+import logging
+from typing import Any, Mapping, Optional, Sequence
+
+from postgrest.exceptions import APIError
+from postgrest.types import CountMethod, ReturnMethod
+from supabase._async.client import AsyncClient
+
+from .base import IN_TYPES, StorageBackend, StorageError
+
+logger = logging.getLogger(__name__)
+
+
+class PostgrestBackend(StorageBackend):
+    """Stores rows in the Supabase project through its PostgREST API"""
+
+    def __init__(self, client: AsyncClient):
+        self.client = client
+
+    @staticmethod
+    def _filter(query, where: Optional[Mapping[str, Any]], ilike: Optional[Mapping[str, str]] = None):
+        for column, value in (where or {}).items():
+            if isinstance(value, IN_TYPES):
+                query = query.in_(column, list(value))
+            elif value is None:
+                # IS NULL, as in the SQLite backend (eq.null would compare with the string "null")
+                query = query.is_(column, None)
+            else:
+                query = query.eq(column, value)
+        for column, pattern in (ilike or {}).items():
+            query = query.ilike(column, pattern)
+        return query
+
+    @staticmethod
+    async def _send(query):
+        try:
+            return await query.execute()
+        except APIError as e:
+            logger.warning("PostgREST query failed", extra={"code": e.code, "error": e.message, "details": e.details})
+            raise StorageError(e.message or str(e), e.code, e.details) from e
+
+    @classmethod
+    async def _execute(cls, query) -> list[dict]:
+        return (await cls._send(query)).data
+
+    async def select(
+        self,
+        table: str,
+        *,
+        columns: Optional[Sequence[str]] = None,
+        where: Optional[Mapping[str, Any]] = None,
+        ilike: Optional[Mapping[str, str]] = None,
+        after: Optional[Mapping[str, Any]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+    ) -> list[dict]:
+        query = self._filter(self.client.table(table).select(", ".join(columns) if columns else "*"), where, ilike)
+        for column, value in (after or {}).items():
+            query = query.gt(column, value)
+        if order_by is not None:
+            query = query.order(order_by, desc=descending)
+        if limit is not None:
+            query = query.limit(limit)
+        return await self._execute(query)
+
+    async def insert(self, table: str, rows: Sequence[Mapping[str, Any]]) -> list[dict]:
+        return await self._execute(self.client.table(table).insert([dict(row) for row in rows]))
+
+    async def update(
+        self, table: str, values: Mapping[str, Any], *, where: Mapping[str, Any], returning: bool = True
+    ) -> list[dict]:
+        if returning:
+            return await self._execute(self._filter(self.client.table(table).update(dict(values)), where))
+        # Just the count of matched rows, in the Content-Range header
+        query = self.client.table(table).update(dict(values), count=CountMethod.exact, returning=ReturnMethod.minimal)
+        response = await self._send(self._filter(query, where))
+        return [{} for _ in range(response.count or 0)]
+
+    async def delete(self, table: str, *, where: Mapping[str, Any]) -> list[dict]:
+        return await self._execute(self._filter(self.client.table(table).delete(), where))
@@ -0,0 +1,322 @@
+import asyncio
+import json
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Mapping, Optional, Sequence, TypeVar
+
+from .base import IN_TYPES, StorageBackend, StorageError
+
+T = TypeVar("T")
+logger = logging.getLogger(__name__)
+# SQLITE_MAX_VARIABLE_NUMBER of the SQLite versions Python ships with (3.32+)
+MAX_PARAMETERS = 32766
+
+# The Supabase tables, with array/jsonb columns stored as JSON text
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS "Teacher" (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS "Student" (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    name TEXT NOT NULL,
+    assessment_ids TEXT NOT NULL DEFAULT '[]',
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS "Assessment" (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    name TEXT NOT NULL,
+    first_question TEXT NOT NULL,
+    system_prompt TEXT NOT NULL,
+    mindmap_template TEXT NOT NULL,
+    teacher_id INTEGER,
+    student_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS "Assessment_teacher_id" ON "Assessment" (teacher_id);
+CREATE TABLE IF NOT EXISTS "AssessmentResult" (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    assessment_id INTEGER NOT NULL,
+    teacher_id INTEGER NOT NULL,
+    student_id INTEGER NOT NULL,
+    voice_recording_id INTEGER,
+    transcript TEXT,
+    mindmap TEXT,
+    insights TEXT
+);
+CREATE INDEX IF NOT EXISTS "AssessmentResult_assessment_id" ON "AssessmentResult" (assessment_id);
+CREATE INDEX IF NOT EXISTS "AssessmentResult_teacher_id" ON "AssessmentResult" (teacher_id);
+CREATE INDEX IF NOT EXISTS "AssessmentResult_student_id" ON "AssessmentResult" (student_id);
+CREATE TABLE IF NOT EXISTS "AssessmentStats" (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    assessment_id INTEGER NOT NULL UNIQUE,
+    result_count INTEGER NOT NULL DEFAULT 0,
+    processed_count INTEGER NOT NULL DEFAULT 0,
+    node_stats TEXT NOT NULL DEFAULT '{}',
+    last_activity_at TEXT,
+    version INTEGER NOT NULL DEFAULT 0
+);
+-- Result counts are kept by triggers, as in Postgres
+-- (supabase/migrations/20261019000700_assessment_stats_counts.sql)
+CREATE TRIGGER IF NOT EXISTS "AssessmentResult_stats_insert" AFTER INSERT ON "AssessmentResult" BEGIN
+    UPDATE "AssessmentStats"
+    SET result_count = result_count + 1,
+        processed_count = processed_count + (coalesce(NEW.mindmap, '') <> ''),
+        last_activity_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now'),
+        version = version + 1
+    WHERE assessment_id = NEW.assessment_id;
+END;
+CREATE TRIGGER IF NOT EXISTS "AssessmentResult_stats_update" AFTER UPDATE OF assessment_id, mindmap ON "AssessmentResult"
+WHEN OLD.assessment_id IS NOT NEW.assessment_id OR OLD.mindmap IS NOT NEW.mindmap BEGIN
+    UPDATE "AssessmentStats"
+    SET result_count = result_count - 1,
+        processed_count = processed_count - (coalesce(OLD.mindmap, '') <> ''),
+        version = version + 1
+    WHERE assessment_id = OLD.assessment_id;
+    UPDATE "AssessmentStats"
+    SET result_count = result_count + 1,
+        processed_count = processed_count + (coalesce(NEW.mindmap, '') <> ''),
+        last_activity_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now'),
+        version = version + 1
+    WHERE assessment_id = NEW.assessment_id;
+END;
+CREATE TRIGGER IF NOT EXISTS "AssessmentResult_stats_delete" AFTER DELETE ON "AssessmentResult" BEGIN
+    UPDATE "AssessmentStats"
+    SET result_count = result_count - 1,
+        processed_count = processed_count - (coalesce(OLD.mindmap, '') <> ''),
+        version = version + 1
+    WHERE assessment_id = OLD.assessment_id;
+END;
+CREATE TABLE IF NOT EXISTS "TranscriptSegment" (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    result_id INTEGER NOT NULL,
+    speaker TEXT NOT NULL,
+    offset_ms INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS "TranscriptSegment_result_id" ON "TranscriptSegment" (result_id, offset_ms);
+CREATE TABLE IF NOT EXISTS "Assignment" (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    student_id INTEGER NOT NULL,
+    assessment_id INTEGER NOT NULL,
+    UNIQUE (student_id, assessment_id)
+);
+CREATE INDEX IF NOT EXISTS "Assignment_assessment_id" ON "Assignment" (assessment_id, student_id);
+-- Assignment and Student.version follow Student.assessment_ids, as in Postgres
+-- (supabase/migrations/20261019000800_student_assignments_trigger.sql)
+CREATE TRIGGER IF NOT EXISTS "Student_version" AFTER UPDATE OF assessment_ids ON "Student"
+WHEN NEW.version = OLD.version AND NEW.assessment_ids IS NOT OLD.assessment_ids BEGIN
+    UPDATE "Student" SET version = OLD.version + 1 WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS "Student_assignments_insert" AFTER INSERT ON "Student" BEGIN
+    INSERT OR IGNORE INTO "Assignment" (student_id, assessment_id)
+    SELECT DISTINCT NEW.id, a.id FROM json_each(NEW.assessment_ids) AS assigned JOIN "Assessment" a ON a.id = assigned.value;
+END;
+CREATE TRIGGER IF NOT EXISTS "Student_assignments_update" AFTER UPDATE OF assessment_ids ON "Student" BEGIN
+    DELETE FROM "Assignment"
+    WHERE student_id = NEW.id AND assessment_id NOT IN (SELECT value FROM json_each(NEW.assessment_ids));
+    INSERT OR IGNORE INTO "Assignment" (student_id, assessment_id)
+    SELECT DISTINCT NEW.id, a.id FROM json_each(NEW.assessment_ids) AS assigned JOIN "Assessment" a ON a.id = assigned.value;
+END;
+CREATE TRIGGER IF NOT EXISTS "Student_assignments_delete" AFTER DELETE ON "Student" BEGIN
+    DELETE FROM "Assignment" WHERE student_id = OLD.id;
+END;
+CREATE TABLE IF NOT EXISTS "spells" (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+"""
+
+JSON_COLUMNS = {
+    "Student": frozenset({"assessment_ids"}),
+    "AssessmentStats": frozenset({"node_stats"}),
+}
+
+
+class SQLiteBackend(StorageBackend):
+    """Stores rows in an embedded SQLite database with the same tables as Supabase
+
+    All queries run on one dedicated thread that owns the connection, so they are
+    serialized without locking and never block the event loop. Use ":memory:" for
+    a throwaway database (tests, benchmarks).
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._columns: dict[str, frozenset[str]] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._columns = {
+                table: frozenset(row["name"] for row in conn.execute(f'PRAGMA table_info("{table}")'))
+                for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            }
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        def call() -> T:
+            conn = self._connect()
+            try:
+                with conn:
+                    return fn(conn)
+            except sqlite3.IntegrityError as e:
+                code = "23505" if "UNIQUE" in str(e) else "23502" if "NOT NULL" in str(e) else "23000"
+                raise StorageError(str(e), code, str(e)) from e
+            except sqlite3.Error as e:
+                raise StorageError(str(e), type(e).__name__, str(e)) from e
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        except StorageError as e:
+            logger.warning("SQLite query failed", extra={"code": e.code, "error": e.message})
+            raise
+
+    def _check(self, table: str, columns) -> None:
+        known = self._columns.get(table)
+        if known is None:
+            raise StorageError(f'relation "{table}" does not exist', "42P01")
+        for column in columns:
+            if column not in known:
+                raise StorageError(f'column {table}.{column} does not exist', "42703")
+
+    def _where(
+        self,
+        table: str,
+        where: Optional[Mapping[str, Any]],
+        ilike: Optional[Mapping[str, str]] = None,
+        after: Optional[Mapping[str, Any]] = None,
+    ):
+        clauses, params = [], []
+        for column, value in (where or {}).items():
+            self._check(table, (column,))
+            if isinstance(value, IN_TYPES):
+                values = list(value)
+                clauses.append(f'"{column}" IN ({", ".join("?" * len(values))})')
+                params += values
+            elif value is None:
+                clauses.append(f'"{column}" IS NULL')
+            else:
+                clauses.append(f'"{column}" = ?')
+                params.append(value)
+        for column, pattern in (ilike or {}).items():
+            self._check(table, (column,))
+            # LIKE is case-insensitive for ASCII in SQLite
+            clauses.append(f'"{column}" LIKE ?')
+            params.append(pattern)
+        for column, value in (after or {}).items():
+            self._check(table, (column,))
+            clauses.append(f'"{column}" > ?')
+            params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _encode(self, table: str, row: Mapping[str, Any]) -> dict:
+        self._check(table, row)
+        json_columns = JSON_COLUMNS.get(table, frozenset())
+        return {column: json.dumps(value) if column in json_columns else value for column, value in row.items()}
+
+    @staticmethod
+    def _decode(table: str, rows: list[sqlite3.Row]) -> list[dict]:
+        json_columns = JSON_COLUMNS.get(table, frozenset())
+        decoded = []
+        for row in rows:
+            row = dict(row)
+            for column in json_columns & row.keys():
+                if row[column] is not None:
+                    row[column] = json.loads(row[column])
+            decoded.append(row)
+        return decoded
+
+    async def select(
+        self,
+        table: str,
+        *,
+        columns: Optional[Sequence[str]] = None,
+        where: Optional[Mapping[str, Any]] = None,
+        ilike: Optional[Mapping[str, str]] = None,
+        after: Optional[Mapping[str, Any]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+    ) -> list[dict]:
+        def run(conn: sqlite3.Connection) -> list[dict]:
+            self._check(table, columns or ())
+            self._check(table, (order_by,) if order_by else ())
+            clause, params = self._where(table, where, ilike, after)
+            selected = ", ".join(f'"{column}"' for column in columns) if columns else "*"
+            sql = f'SELECT {selected} FROM "{table}"{clause}'
+            if order_by is not None:
+                sql += f' ORDER BY "{order_by}"{" DESC" if descending else ""}'
+            if limit is not None:
+                sql += " LIMIT ?"
+                params.append(limit)
+            return self._decode(table, conn.execute(sql, params).fetchall())
+
+        return await self._run(run)
+
+    async def insert(self, table: str, rows: Sequence[Mapping[str, Any]]) -> list[dict]:
+        def run(conn: sqlite3.Connection) -> list[dict]:
+            inserted = []
+            # Consecutive rows with the same columns go in one multi-row INSERT, in
+            # chunks that stay under SQLite's limit on bound parameters
+            encoded = [self._encode(table, row) for row in rows]
+            start = 0
+            while start < len(encoded):
+                keys = encoded[start].keys()
+                chunk_size = max(MAX_PARAMETERS // max(len(keys), 1), 1)
+                end = start + 1
+                while end < len(encoded) and end - start < chunk_size and encoded[end].keys() == keys:
+                    end += 1
+                chunk = encoded[start:end]
+                columns = ", ".join(f'"{column}"' for column in keys)
+                values = ", ".join([f"({', '.join('?' * len(keys))})"] * len(chunk))
+                sql = f'INSERT INTO "{table}" ({columns}) VALUES {values} RETURNING *'
+                inserted += conn.execute(sql, [value for row in chunk for value in row.values()]).fetchall()
+                start = end
+            return self._decode(table, inserted)
+
+        return await self._run(run)
+
+    async def update(
+        self, table: str, values: Mapping[str, Any], *, where: Mapping[str, Any], returning: bool = True
+    ) -> list[dict]:
+        def run(conn: sqlite3.Connection) -> list[dict]:
+            row = self._encode(table, values)
+            clause, params = self._where(table, where)
+            assignments = ", ".join(f'"{column}" = ?' for column in row)
+            sql = f'UPDATE "{table}" SET {assignments}{clause}{" RETURNING *" if returning else ""}'
+            cursor = conn.execute(sql, [*row.values(), *params])
+            return self._decode(table, cursor.fetchall()) if returning else [{} for _ in range(cursor.rowcount)]
+
+        return await self._run(run)
+
+    async def delete(self, table: str, *, where: Mapping[str, Any]) -> list[dict]:
+        def run(conn: sqlite3.Connection) -> list[dict]:
+            clause, params = self._where(table, where)
+            return self._decode(table, conn.execute(f'DELETE FROM "{table}"{clause} RETURNING *', params).fetchall())
+
+        return await self._run(run)
+
+    async def close(self) -> None:
+        def run() -> None:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        await asyncio.get_running_loop().run_in_executor(self._executor, run)
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,10 @@
+-- Per-assessment aggregates maintained incrementally by the API
+-- (src/services/assessment_stats.py), served by GET /assessments/{id}/stats
+create table if not exists public."AssessmentStats" (
+    id bigint generated by default as identity primary key,
+    created_at timestamp with time zone not null default now(),
+    assessment_id bigint not null unique references public."Assessment" (id) on delete cascade,
+    result_count integer not null default 0,
+    processed_count integer not null default 0,
+    node_stats jsonb not null default '{}'::jsonb
+);
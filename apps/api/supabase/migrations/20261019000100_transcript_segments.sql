@@ -0,0 +1,13 @@
+-- Live interview transcripts, appended a segment at a time
+-- (POST /assessment-results/{id}/transcript) and folded into
+-- "AssessmentResult".transcript when the result is processed
+create table if not exists public."TranscriptSegment" (
+    id bigint generated by default as identity primary key,
+    created_at timestamp with time zone not null default now(),
+    result_id bigint not null references public."AssessmentResult" (id) on delete cascade,
+    speaker text not null,
+    offset_ms integer not null,
+    text text not null
+);
+
+create index if not exists "TranscriptSegment_result_id" on public."TranscriptSegment" (result_id, offset_ms);
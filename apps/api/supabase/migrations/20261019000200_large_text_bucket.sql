@@ -0,0 +1,5 @@
+-- Private bucket for large text offloaded from its row
+-- (LARGE_TEXT_STORAGE=offload, see src/storage/large_text.py)
+insert into storage.buckets (id, name, public)
+values ('large-text', 'large-text', false)
+on conflict (id) do nothing;
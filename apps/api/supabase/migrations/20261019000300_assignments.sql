@@ -0,0 +1,19 @@
+-- Student assignments indexed both ways: one row per entry of
+-- "Student".assessment_ids, kept in step by the API (src/services/assignments.py)
+create table if not exists public."Assignment" (
+    id bigint generated by default as identity primary key,
+    created_at timestamp with time zone not null default now(),
+    student_id bigint not null references public."Student" (id) on delete cascade,
+    assessment_id bigint not null references public."Assessment" (id) on delete cascade,
+    unique (student_id, assessment_id)
+);
+
+create index if not exists "Assignment_assessment_id" on public."Assignment" (assessment_id, student_id);
+
+-- Index the assignments made before the table existed
+insert into public."Assignment" (student_id, assessment_id)
+select distinct s.id, a.id
+from public."Student" s
+cross join lateral unnest(s.assessment_ids) as assigned(assessment_id)
+join public."Assessment" a on a.id = assigned.assessment_id
+on conflict (student_id, assessment_id) do nothing;
@@ -0,0 +1,7 @@
+-- When a result of the assessment was last created, updated or processed,
+-- for the teacher dashboard (GET /teachers/{id}/dashboard)
+alter table public."AssessmentStats" add column if not exists last_activity_at timestamp with time zone;
+
+update public."AssessmentStats" s
+set last_activity_at = (select max(r.created_at) from public."AssessmentResult" r where r.assessment_id = s.assessment_id)
+where s.last_activity_at is null;
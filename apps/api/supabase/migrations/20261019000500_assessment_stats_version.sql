@@ -0,0 +1,3 @@
+-- Bumped on every write of a stats row, so the API workers can update it with a
+-- compare-and-set instead of overwriting each other (src/services/assessment_stats.py)
+alter table public."AssessmentStats" add column if not exists version integer not null default 0;
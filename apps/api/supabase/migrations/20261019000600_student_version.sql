@@ -0,0 +1,4 @@
+-- Bumped on every write of a student's assessment_ids, so the API workers can
+-- update it with a compare-and-set instead of overwriting each other
+-- (src/services/assignments.py)
+alter table public."Student" add column if not exists version integer not null default 0;
@@ -0,0 +1,55 @@
+-- Result counts are kept by the database, so results written straight through
+-- Supabase (the web app creates them before calling /process) are counted too.
+-- The API only maintains node_stats (src/services/assessment_stats.py); the
+-- version bump makes its compare-and-set retry over these writes.
+-- Mirrored for SQLite in src/storage/sqlite.py.
+create or replace function public.assessment_stats_count_result() returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        update public."AssessmentStats"
+        set result_count = result_count - 1,
+            processed_count = processed_count - (coalesce(old.mindmap, '') <> '')::integer,
+            version = version + 1
+        where assessment_id = old.assessment_id;
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        update public."AssessmentStats"
+        set result_count = result_count + 1,
+            processed_count = processed_count + (coalesce(new.mindmap, '') <> '')::integer,
+            last_activity_at = now(),
+            version = version + 1
+        where assessment_id = new.assessment_id;
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists "AssessmentResult_stats_counts" on public."AssessmentResult";
+create trigger "AssessmentResult_stats_counts"
+after insert or delete on public."AssessmentResult"
+for each row execute function public.assessment_stats_count_result();
+
+drop trigger if exists "AssessmentResult_stats_counts_update" on public."AssessmentResult";
+create trigger "AssessmentResult_stats_counts_update"
+after update of assessment_id, mindmap on public."AssessmentResult"
+for each row
+when (old.assessment_id is distinct from new.assessment_id or old.mindmap is distinct from new.mindmap)
+execute function public.assessment_stats_count_result();
+
+-- Recount the stats built before the trigger existed
+update public."AssessmentStats" s
+set result_count = counts.result_count,
+    processed_count = counts.processed_count,
+    version = s.version + 1
+from (
+    select assessment_id,
+           count(*) as result_count,
+           count(*) filter (where coalesce(mindmap, '') <> '') as processed_count
+    from public."AssessmentResult"
+    group by assessment_id
+) counts
+where counts.assessment_id = s.assessment_id;
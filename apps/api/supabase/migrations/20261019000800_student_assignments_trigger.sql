@@ -0,0 +1,60 @@
+-- The database keeps "Assignment" and "Student".version in step with
+-- "Student".assessment_ids, in the same transaction as the write, whoever makes
+-- it: the API (src/services/assignments.py) or the web app through Supabase.
+-- Mirrored for SQLite in src/storage/sqlite.py.
+
+-- A write of assessment_ids that doesn't bump the version itself (anything but
+-- the API's compare-and-set) gets it bumped, so the API retries over it
+create or replace function public.student_bump_version() returns trigger
+language plpgsql
+as $$
+begin
+    if new.version = old.version then
+        new.version := old.version + 1;
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists "Student_version" on public."Student";
+create trigger "Student_version"
+before update of assessment_ids on public."Student"
+for each row
+when (old.assessment_ids is distinct from new.assessment_ids)
+execute function public.student_bump_version();
+
+create or replace function public.student_index_assignments() returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    delete from public."Assignment"
+    where student_id = new.id
+      and not (assessment_id = any (coalesce(new.assessment_ids, '{}')));
+    insert into public."Assignment" (student_id, assessment_id)
+    select distinct new.id, a.id
+    from unnest(coalesce(new.assessment_ids, '{}')) as assigned(assessment_id)
+    join public."Assessment" a on a.id = assigned.assessment_id
+    on conflict (student_id, assessment_id) do nothing;
+    return null;
+end;
+$$;
+
+drop trigger if exists "Student_assignments" on public."Student";
+create trigger "Student_assignments"
+after insert or update of assessment_ids on public."Student"
+for each row execute function public.student_index_assignments();
+
+-- Bring the index back in step with the arrays after writes it missed
+delete from public."Assignment" x
+using public."Student" s
+where s.id = x.student_id
+  and not (x.assessment_id = any (coalesce(s.assessment_ids, '{}')));
+
+insert into public."Assignment" (student_id, assessment_id)
+select distinct s.id, a.id
+from public."Student" s
+cross join lateral unnest(s.assessment_ids) as assigned(assessment_id)
+join public."Assessment" a on a.id = assigned.assessment_id
+on conflict (student_id, assessment_id) do nothing;
@@ -0,0 +1,8 @@
+import os
+
+# Settings requires these; tests never talk to the real services
+for name in ("API_KEY", "OPENROUTER_API_KEY", "DB_URL", "DB_API_KEY", "DB_EMAIL", "DB_PASSWORD"):
+    os.environ.setdefault(name, "test")
+
+# Off by default, but a developer's environment may turn it on; tests that cover the cache set it themselves
+os.environ.setdefault("LLM_CACHE_TTL", "0")
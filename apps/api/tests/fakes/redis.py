@@ -0,0 +1,146 @@
+"""Local stand-in for a Redis server, enough for the shared cache tier and event bus
+
+Speaks the Redis protocol over TCP and keeps keys in memory, with expiry.
+Supports PING, AUTH, SELECT, GET, SET (with PX/EX and NX), DEL, INCR,
+FLUSHALL, PUBLISH and SUBSCRIBE (one channel per command); anything else gets
+an error reply. Every command is counted, so tests can
+assert how many round trips were made:
+
+    python -m tests.fakes.redis --port 6380
+    CACHE_REDIS_URL=redis://127.0.0.1:6380/0 uvicorn src.main:app --workers 4
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from typing import Optional
+
+from src.services.redis_client import RedisError, read_reply
+
+
+class FakeRedis:
+    def __init__(self, *, password: Optional[str] = None):
+        self.password = password
+        self.commands: Counter[str] = Counter()
+        self._data: dict[bytes, tuple[Optional[float], bytes]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: set[asyncio.StreamWriter] = set()
+        self._subscribers: dict[bytes, set[asyncio.StreamWriter]] = {}
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"redis://{host}:{port}/0"
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> "FakeRedis":
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        self._server.close()
+        for writer in self._connections:
+            writer.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self) -> "FakeRedis":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires is not None and expires <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def handle(self, args: list[bytes], state: dict) -> bytes:
+        """Returns the encoded reply to one command"""
+        name = args[0].decode().upper()
+        self.commands[name] += 1
+        if name == "AUTH":
+            state["authed"] = self.password is None or args[-1].decode() == self.password
+            return b"+OK\r\n" if state["authed"] else b"-WRONGPASS invalid password\r\n"
+        if not state["authed"]:
+            return b"-NOAUTH Authentication required\r\n"
+        if name in ("PING", "SELECT", "FLUSHALL"):
+            if name == "FLUSHALL":
+                self._data.clear()
+            return b"+PONG\r\n" if name == "PING" else b"+OK\r\n"
+        if name == "GET":
+            value = self._get(args[1])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == "SET":
+            key, value, options = args[1], args[2], [arg.decode().upper() for arg in args[3:]]
+            if "NX" in options and self._get(key) is not None:
+                return b"$-1\r\n"
+            expires = None
+            for unit, scale in (("PX", 1000), ("EX", 1)):
+                if unit in options:
+                    expires = time.monotonic() + int(options[options.index(unit) + 1]) / scale
+            self._data[key] = (expires, value)
+            return b"+OK\r\n"
+        if name == "INCR":
+            value = int(self._get(args[1]) or 0) + 1
+            self._data[args[1]] = (None, str(value).encode())
+            return b":%d\r\n" % value
+        if name == "SUBSCRIBE":
+            self._subscribers.setdefault(args[1], set()).add(state["writer"])
+            return b"*3\r\n$9\r\nsubscribe\r\n$%d\r\n%s\r\n:1\r\n" % (len(args[1]), args[1])
+        if name == "PUBLISH":
+            channel, message = args[1], args[2]
+            subscribers = self._subscribers.get(channel, set())
+            for writer in subscribers:
+                writer.write(
+                    b"*3\r\n$7\r\nmessage\r\n$%d\r\n%s\r\n$%d\r\n%s\r\n" % (len(channel), channel, len(message), message)
+                )
+            return b":%d\r\n" % len(subscribers)
+        if name == "DEL":
+            deleted = [key for key in args[1:] if self._get(key) is not None]
+            for key in deleted:
+                del self._data[key]
+            return b":%d\r\n" % len(deleted)
+        return b"-ERR unknown command '%s'\r\n" % name.encode()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        state = {"authed": self.password is None, "writer": writer}
+        self._connections.add(writer)
+        try:
+            while True:
+                command = await read_reply(reader)
+                if isinstance(command, RedisError) or not isinstance(command, list):
+                    break
+                writer.write(self.handle(command, state))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            for subscribers in self._subscribers.values():
+                subscribers.discard(writer)
+            writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    parser.add_argument("--password")
+    args = parser.parse_args()
+
+    async def serve():
+        server = await FakeRedis(password=args.password).start(args.host, args.port)
+        await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.config import settings
+from src.main import app
+from src.services import admission
+from src.services.admission import AdmissionController, AdmissionRejected
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def controller(clock, **limits) -> AdmissionController:
+    options = dict(rate=10, burst=2, key_rate=1, key_burst=1, queue_size=1, max_wait=5)
+    return AdmissionController(**{**options, **limits}, clock=clock)
+
+
+def test_buckets_queue_and_shed():
+    clock = Clock()
+    limiter = controller(clock, burst=3)
+    assert limiter.reserve("a") == 0
+    # Key "a" has used its burst; the next token comes in 1 s
+    assert limiter.reserve("a") == pytest.approx(1.0)
+    assert limiter.reserve("b") == 0
+    # Global burst spent too: "c" waits for the global bucket
+    assert limiter.reserve("c") == pytest.approx(0.1)
+
+    # With the wait queue full, anything that would have to wait is shed
+    limiter.waiting = 1
+    with pytest.raises(AdmissionRejected):
+        limiter.reserve("d")
+    clock.now = 10
+    assert limiter.reserve("d") == 0
+
+
+def test_rejects_waits_over_the_limit():
+    clock = Clock()
+    limiter = controller(clock, key_rate=0.1, queue_size=10)
+    limiter.reserve("a")
+    with pytest.raises(AdmissionRejected) as rejected:
+        limiter.reserve("a")
+    assert rejected.value.retry_after == pytest.approx(10)
+    # Rejected reservations are refunded
+    clock.now = 10
+    assert limiter.reserve("a") == 0
+
+
+
+def test_refilled_client_buckets_are_pruned():
+    clock = Clock()
+    limiter = controller(clock, max_keys=2)
+    limiter.reserve("a")
+    clock.now = 0.5
+    limiter.reserve("b")
+    # "a" has refilled by now but "b" hasn't, so only "a" is dropped
+    clock.now = 1
+    limiter.reserve("c")
+    assert set(limiter.key_buckets) == {"b", "c"}
+
+def test_llm_endpoints_answer_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(
+        admission, "_controller", AdmissionController(rate=0, burst=1, key_rate=0.5, key_burst=1, queue_size=0, max_wait=0)
+    )
+
+    async def call():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            headers = {"Authorization": f"Bearer {settings.API_KEY}"}
+            url = f"{settings.API_VERSION}/assessments/generate-mindmap"
+            # The invalid body is rejected after admission, without calling the LLM
+            first = await client.post(url, headers=headers, json={"text": ""})
+            second = await client.post(url, headers=headers, json={"text": ""})
+            return first, second
+
+    first, second = asyncio.run(call())
+    assert first.status_code == 422
+    assert second.status_code == 429 and second.headers["retry-after"] == "2"
@@ -0,0 +1,35 @@
+import asyncio
+import json
+
+from src.schemas.assessment_result import AssessmentResult
+from src.services.assessment_stats import get_stats, record_result_change
+from src.storage import SQLiteBackend
+
+TEMPLATE = {"topic": {"name": "Cells", "description": "Cell biology", "subtopics": []}}
+
+
+def mindmap(level):
+    return json.dumps({"topic": {**TEMPLATE["topic"], "understandingLevel": level}})
+
+
+def test_concurrent_changes_are_all_counted():
+    db = SQLiteBackend()
+
+    async def run():
+        await db.insert(
+            "Assessment",
+            [{"name": "A", "first_question": "?", "system_prompt": "", "mindmap_template": json.dumps(TEMPLATE)}],
+        )
+        await get_stats(db, 1)
+        rows = await db.insert(
+            "AssessmentResult",
+            [{"assessment_id": 1, "teacher_id": 1, "student_id": 1, "mindmap": mindmap(level)} for level in (1, 2, 3, 4, 5, 5)],
+        )
+        # Every change reads the same version of the row before any writes it: as
+        # with several workers, all but one have to retry (or the row is rebuilt)
+        await asyncio.gather(*(record_result_change(db, new=AssessmentResult(**row)) for row in rows))
+        return await get_stats(db, 1)
+
+    stats = asyncio.run(run())
+    assert (stats.result_count, stats.processed_count) == (6, 6)
+    assert stats.node_stats["Cells"].histogram == [1, 1, 1, 1, 2]
@@ -0,0 +1,131 @@
+import asyncio
+import json
+
+import httpx
+
+from src.api.dependencies import get_db
+from src.config import settings
+from src.crud.student import student
+from src.importer import import_rows
+from src.main import app
+from src.schemas.student import StudentCreate, StudentPatch
+from src.services import assignments
+from src.storage import SQLiteBackend
+
+API = settings.API_VERSION
+HEADERS = {"Authorization": f"Bearer {settings.API_KEY}"}
+ASSESSMENT = {"name": "A", "first_question": "?", "system_prompt": "", "mindmap_template": "{}"}
+
+
+def test_assignments_stay_in_step_with_assessment_ids():
+    db = SQLiteBackend()
+
+    async def override():
+        yield db
+
+    async def names(client, assessment_id):
+        students = (await client.get(f"{API}/assessments/{assessment_id}/students", headers=HEADERS)).json()
+        return [student["name"] for student in students]
+
+    async def run():
+        await db.insert("Assessment", [ASSESSMENT, ASSESSMENT])
+        seen = {}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            for name, assessment_ids in (("Ada", [1]), ("Alan", []), ("Grace", [2])):
+                await client.post(f"{API}/students/", headers=HEADERS, json={"name": name, "assessment_ids": assessment_ids})
+            assigned = await client.post(f"{API}/assessments/1/assign", headers=HEADERS, json={"student_ids": [1, 2, 3]})
+            seen["assigned"] = await names(client, 1)
+            seen["unknown"] = await client.post(f"{API}/assessments/1/assign", headers=HEADERS, json={"student_ids": [3, 9]})
+
+            await client.patch(f"{API}/students/2", headers=HEADERS, json={"assessment_ids": [2]})
+            seen["patched"] = await names(client, 1), await names(client, 2)
+            unassigned = await client.post(f"{API}/assessments/2/unassign", headers=HEADERS, json={"student_ids": [2, 3]})
+            seen["grace"] = (await client.get(f"{API}/students/3", headers=HEADERS)).json()["assessment_ids"]
+
+            await client.delete(f"{API}/assessments/1", headers=HEADERS)
+            seen["ada"] = (await client.get(f"{API}/students/1", headers=HEADERS)).json()["assessment_ids"]
+            seen["own"] = (await client.get(f"{API}/assessments/student/1", headers=HEADERS)).json()
+            seen["missing"] = await client.get(f"{API}/assessments/student/9", headers=HEADERS)
+
+            rows = [{"name": "Imported", "assessment_ids": json.dumps([2])}]
+            await import_rows(db, "Student", rows, csv_cells=True)
+            seen["imported"] = await names(client, 2)
+        return assigned, unassigned, seen
+
+    app.dependency_overrides[get_db] = override
+    try:
+        assigned, unassigned, seen = asyncio.run(run())
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+    # Ada already had assessment 1
+    assert assigned.json() == {"assessment_id": 1, "changed": [2, 3], "student_ids": [1, 2, 3]}
+    assert seen["assigned"] == ["Ada", "Alan", "Grace"]
+    assert seen["unknown"].status_code == 404 and "9" in seen["unknown"].json()["detail"]
+    # PATCHing assessment_ids moved Alan from assessment 1 to 2
+    assert seen["patched"] == (["Ada", "Grace"], ["Alan", "Grace"])
+    assert unassigned.json() == {"assessment_id": 2, "changed": [2, 3], "student_ids": []}
+    assert seen["grace"] == [1]
+    # Deleting an assessment unassigns it
+    assert seen["ada"] == [] and seen["own"] == []
+    assert seen["missing"].status_code == 404
+    assert seen["imported"] == ["Imported"]
+
+
+def test_unknown_assessments_write_nothing_and_concurrent_changes_all_land():
+    db = SQLiteBackend()
+
+    async def override():
+        yield db
+
+    async def run():
+        await db.insert("Assessment", [ASSESSMENT] * 5)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            created = await client.post(f"{API}/students/", headers=HEADERS, json={"name": "Ada", "assessment_ids": [1, 9]})
+            await client.post(f"{API}/students/", headers=HEADERS, json={"name": "Alan", "assessment_ids": [1]})
+            patched = await client.patch(f"{API}/students/1", headers=HEADERS, json={"name": "Al", "assessment_ids": [8]})
+            # Every change reads the same version of the row first, as with several workers
+            await asyncio.gather(*(assignments.assign(db, a, [1]) for a in range(2, 6)))
+        return created, patched, await db.select("Student"), await db.select("Assignment", where={"student_id": 1})
+
+    app.dependency_overrides[get_db] = override
+    try:
+        created, patched, students, indexed = asyncio.run(run())
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+    assert created.status_code == 404 and "9" in created.json()["detail"]
+    assert patched.status_code == 404
+    assert [(row["name"], sorted(row["assessment_ids"])) for row in students] == [("Alan", [1, 2, 3, 4, 5])]
+    assert sorted(row["assessment_id"] for row in indexed) == [1, 2, 3, 4, 5]
+
+
+def test_writes_outside_the_api_keep_the_index_and_version_in_step():
+    db = SQLiteBackend()
+
+    async def indexed(student_id):
+        return sorted(row["assessment_id"] for row in await db.select("Assignment", where={"student_id": student_id}))
+
+    async def run():
+        await db.insert("Assessment", [ASSESSMENT] * 3)
+        await assignments.create_student(db, obj_in=StudentCreate(name="Ada", assessment_ids=[1]))
+        seen = {"created": await indexed(1)}
+        # As the web app does: read the array, then write it straight through Supabase
+        await db.update("Student", {"assessment_ids": [1, 2]}, where={"id": 1})
+        seen["web"] = await indexed(1), (await db.select("Student", where={"id": 1}))[0]["version"]
+        # An API write from the version read before the web app's loses and retries
+        seen["stale"] = await student.patch_if_unchanged(
+            db, id=1, obj_in=StudentPatch(assessment_ids=[3]), version=0, returning=False
+        )
+        await assignments.assign(db, 3, [1])
+        seen["assigned"] = await indexed(1), (await db.select("Student", where={"id": 1}))[0]["assessment_ids"]
+        await db.delete("Student", where={"id": 1})
+        seen["deleted"] = await indexed(1)
+        return seen
+
+    seen = asyncio.run(run())
+    assert seen["created"] == [1]
+    assert seen["web"] == ([1, 2], 1)
+    assert seen["stale"] is False
+    assert seen["assigned"] == ([1, 2, 3], [1, 2, 3])
+    assert seen["deleted"] == []
@@ -0,0 +1,41 @@
+import asyncio
+
+from benchmarks.__main__ import check
+from benchmarks.suite import run_suite
+
+THRESHOLDS = {"max_regression": 0.25, "noise_floor_ms": 5, "limits": {"read.*": {"p95_ms": 50}}}
+
+
+def stats(p95_ms, errors=0):
+    return {"p95_ms": p95_ms, "throughput_rps": 100.0, "errors": errors}
+
+
+def test_check_flags_limits_and_regressions():
+    results = {"read.a@10": stats(60), "list.b@10": stats(20), "list.c@10": stats(4), "list.d@10": stats(1, errors=2)}
+    baseline = {"list.b@10": stats(10), "list.c@10": stats(1)}
+    assert check(results, THRESHOLDS, baseline) == [
+        "read.a@10: p95 60.0 ms > 50 ms",
+        "list.b@10: p95 20.0 ms regressed from 10.0 ms",
+        "list.d@10: 2 errors",
+    ]
+
+
+def test_suite_runs_on_sqlite():
+    results = asyncio.run(
+        run_suite(sizes=(10,), class_size=3, concurrencies=(2,), scale=0.01, select=lambda name: not name.startswith("pipeline."))
+    )
+    assert {"read.teacher@10", "create.assessment_result@10", "list.spells@10"} <= results.keys()
+    assert all(result["errors"] == 0 for result in results.values())
+
+
+def test_seed_indexes_the_assignments():
+    from benchmarks.suite import seed
+    from src.storage import SQLiteBackend
+
+    async def run():
+        db = SQLiteBackend()
+        await seed(db, 10, 3)
+        return await db.select("Assignment")
+
+    # One per student, so list.student_assessments reads a populated index
+    assert len(asyncio.run(run())) == 10
@@ -0,0 +1,132 @@
+import asyncio
+
+from src.config import settings
+from src.crud import teacher
+from src.middleware.idempotency import IdempotencyStore, StoredResponse
+from src.schemas.teacher import TeacherCreate, TeacherPatch
+from src.services.cache import Cache, Codec, LocalCache, SharedCache
+from src.services.redis_client import RedisClient
+from src.storage import SQLiteBackend
+from tests.fakes.redis import FakeRedis
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def worker(url, clock=None) -> Cache:
+    local = LocalCache(max_entries=100, max_bytes=10_000, **({"clock": clock} if clock else {}))
+    return Cache(local, SharedCache(RedisClient(url, timeout=0.2)), local_ttl=5, poll_interval=0.01)
+
+
+def test_workers_load_a_miss_once_and_share_it():
+    codec = Codec(dict)
+    clock = Clock()
+    loads = []
+
+    async def load():
+        loads.append(1)
+        await asyncio.sleep(0.05)
+        return {"text": "cells " * 500, "version": len(loads)}
+
+    async def run():
+        async with FakeRedis() as redis:
+            first, second = worker(redis.url), worker(redis.url, clock)
+            # Concurrent misses in two workers: one load, the rest wait for it
+            values = await asyncio.gather(
+                *(cache.get_or_load("k", load, ttl=60, codec=codec) for cache in (first, second) * 5)
+            )
+            stored = redis._get(b"alterview:k")
+            gets = redis.commands["GET"]
+            again = await second.get("k", codec)
+            local_hit = redis.commands["GET"] == gets
+
+            # Invalidated by the first worker; the second serves its copy until local_ttl
+            await first.delete("k")
+            stale = await second.get_or_load("k", load, ttl=60, codec=codec)
+            clock.now = 6
+            fresh = await second.get_or_load("k", load, ttl=60, codec=codec)
+            return values, stored, again, local_hit, stale, fresh, first.stats, second.stats
+
+    values, stored, again, local_hit, stale, fresh, first_stats, second_stats = asyncio.run(run())
+    assert all(value["version"] == 1 for value in values) and again == values[0]
+    assert len(loads) == 2 and fresh["version"] == 2 and stale["version"] == 1
+    # Compressed, so well under the 3000 characters of text
+    assert stored[:1] == b"z" and len(stored) < 200
+    assert local_hit
+    assert first_stats["loads"] + second_stats["loads"] == 2
+
+
+def test_shared_tier_outage_reads_as_misses():
+    codec = Codec(int)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return len(loads)
+
+    async def run():
+        redis = await FakeRedis().start()
+        url = redis.url
+        await redis.stop()
+        cache = worker(url)
+        values = [await cache.get_or_load(key, load, ttl=60, codec=codec) for key in ("a", "a", "b")]
+        return values, cache.shared.errors
+
+    values, errors = asyncio.run(run())
+    # The first failure takes the tier out of use for a while, so it is only tried once
+    assert values == [1, 1, 2]
+    assert errors == 1
+
+
+def test_crud_lookups_and_idempotency_records_are_cached(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_CRUD_TTL", 60)
+    db = SQLiteBackend()
+    db.cache = Cache(LocalCache(max_entries=100))
+    response = StoredResponse(201, [(b"content-type", b"application/json")], b'{"id": 1}')
+
+    async def run():
+        async with FakeRedis() as redis:
+            created = await teacher.create(db, obj_in=TeacherCreate(name="Ada"))
+            await teacher.get(db, id=created.id)
+            await db.update("Teacher", {"name": "Behind the cache's back"}, where={"id": created.id})
+            cached = await teacher.get(db, id=created.id)
+            await teacher.patch(db, id=created.id, obj_in=TeacherPatch(name="Grace"), returning=False)
+            patched = await teacher.get(db, id=created.id)
+
+            stores = [IdempotencyStore(ttl=60, max_keys=10, shared=SharedCache(RedisClient(redis.url))) for _ in range(2)]
+            await stores[0].put("key", "f" * 64, response)
+            replayed = await stores[1].get("key")
+        return cached, patched, replayed
+
+    cached, patched, replayed = asyncio.run(run())
+    assert cached.name == "Ada"
+    assert patched.name == "Grace"
+    assert replayed == ("f" * 64, response)
+
+
+def test_a_key_deleted_during_its_load_is_not_cached():
+    cache = Cache(LocalCache(max_entries=100))
+    codec = Codec(str)
+    row = {"name": "Ada"}
+
+    async def load():
+        name = row["name"]
+        await asyncio.sleep(0.05)
+        return name
+
+    async def run():
+        first = asyncio.create_task(cache.get_or_load("teacher", load, ttl=60, codec=codec))
+        await asyncio.sleep(0.01)
+        row["name"] = "Grace"
+        await cache.delete("teacher")
+        later = await cache.get_or_load("teacher", load, ttl=60, codec=codec)
+        return await first, later, await cache.get("teacher", codec)
+
+    first, later, cached = asyncio.run(run())
+    assert (first, later, cached) == ("Ada", "Grace", "Grace")
+    assert cache.stats["loads"] == 2 and cache.stats["stale_loads"] == 1
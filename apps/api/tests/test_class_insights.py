@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import pytest
+
+from src.services.class_insights import generate_class_insights
+from src.services.openrouter import OpenRouterError
+
+
+def test_generate_class_insights_map_reduce():
+    prompts = []
+
+    async def complete(prompt, variables):
+        prompts.append(prompt.id)
+        if variables.get("students", "").count("Student ") == 1:
+            raise RuntimeError("provider error")
+        return [f"observation {len(prompts)}"]
+
+    mindmaps = [
+        json.dumps({"topic": {"name": "Cells", "understandingLevel": 3, "studentResponse": "x", "subtopics": []}})
+        for _ in range(7)
+    ]
+    summary = {"students": 7, "nodes": [], "outliers": {"low": [], "high": []}}
+    result = asyncio.run(
+        generate_class_insights(mindmaps, summary, fan_in=2, concurrency=2, complete=complete)
+    )
+
+    # 4 map groups (the single-student one fails), 3 summaries -> 2 -> 1, then the final call
+    assert result["groups"] == 4
+    assert result["failed_groups"] == 1
+    assert prompts == ["class.map"] * 4 + ["class.reduce"] * 3 + ["class.final"]
+    assert len(result["insights"]) == 1
+
+
+def test_failed_reduce_chunks_are_reported():
+    async def complete(prompt, variables):
+        if prompt.id == "class.reduce" and variables["summaries"].count("Group ") == 1:
+            raise RuntimeError("provider error")
+        return ["observation"]
+
+    mindmaps = [
+        json.dumps({"topic": {"name": "Cells", "understandingLevel": 3, "studentResponse": "x", "subtopics": []}})
+        for _ in range(5)
+    ]
+    summary = {"students": 5, "nodes": [], "outliers": {"low": [], "high": []}}
+    # 3 map groups; the first reduce merges 2 of them and drops the lone third
+    result = asyncio.run(generate_class_insights(mindmaps, summary, fan_in=2, concurrency=2, complete=complete))
+    assert result["groups"] == 3
+    assert result["failed_groups"] == 1
+
+
+def test_every_reduce_chunk_failing_fails_the_run():
+    async def complete(prompt, variables):
+        if prompt.id == "class.reduce":
+            raise RuntimeError("provider error")
+        return ["observation"]
+
+    mindmaps = [
+        json.dumps({"topic": {"name": "Cells", "understandingLevel": 3, "studentResponse": "x", "subtopics": []}})
+        for _ in range(4)
+    ]
+    summary = {"students": 4, "nodes": [], "outliers": {"low": [], "high": []}}
+    with pytest.raises(OpenRouterError):
+        asyncio.run(generate_class_insights(mindmaps, summary, fan_in=2, concurrency=2, complete=complete))
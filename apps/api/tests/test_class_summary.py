@@ -0,0 +1,46 @@
+import json
+
+from src.services.class_summary import format_summary, summarize_class
+from src.services.mindmap_tree import parse_mindmap
+
+
+def make_mindmap(topic_level, sub_levels):
+    return {
+        "topic": {
+            "name": "Cells",
+            "understandingLevel": topic_level,
+            "subtopics": [
+                {"name": f"Sub {i}", "understandingLevel": level, "subtopics": []}
+                for i, level in enumerate(sub_levels)
+            ],
+        }
+    }
+
+
+def test_parse_mindmap_double_encoded():
+    mindmap = make_mindmap(3, [4])
+    assert parse_mindmap(json.dumps(json.dumps(mindmap))) == mindmap
+    assert parse_mindmap("not json") is None
+
+
+def test_summarize_class():
+    mindmaps = [json.dumps(make_mindmap(level, [level, 5])) for level in (4, 4, 4, 4, 1)]
+    mindmaps.append("garbage")
+    summary = summarize_class(mindmaps, [1, 2, 3, 4, 5, 6])
+
+    assert summary["students"] == 5
+    topic, sub0, sub1 = summary["nodes"]
+    assert topic["path"] == "Cells"
+    assert sub0["path"] == "Cells / Sub 0"
+    assert topic["mean"] == 3.4
+    assert topic["distribution"] == {1: 1, 2: 0, 3: 0, 4: 4, 5: 0}
+    assert topic["low_outliers"] == [5]
+    assert sub1["std"] == 0.0 and sub1["low_outliers"] == []
+    assert summary["outliers"]["low"] == [5]
+    assert "Sub 1: mean 5.0" in format_summary(summary)
+
+
+def test_summarize_class_missing_levels():
+    summary = summarize_class([make_mindmap(None, ["n/a"])], [1])
+    assert [node["count"] for node in summary["nodes"]] == [0, 0]
+    assert summary["nodes"][0]["mean"] is None
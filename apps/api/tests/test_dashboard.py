@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+import httpx
+
+from src.api.dependencies import get_db
+from src.config import settings
+from src.main import app
+from src.storage import SQLiteBackend
+
+API = settings.API_VERSION
+HEADERS = {"Authorization": f"Bearer {settings.API_KEY}"}
+TEMPLATE = {"topic": {"name": "Cells", "description": "Cell biology", "subtopics": []}}
+
+
+class CountingBackend(SQLiteBackend):
+    def __init__(self):
+        super().__init__()
+        self.selects = 0
+
+    async def select(self, table, **kwargs):
+        self.selects += 1
+        return await super().select(table, **kwargs)
+
+
+def mindmap(level):
+    return json.dumps({"topic": {**TEMPLATE["topic"], "understandingLevel": level}})
+
+
+def test_dashboard_aggregates_each_assessment_in_fixed_queries():
+    db = CountingBackend()
+
+    async def override():
+        yield db
+
+    async def dashboard(client, teacher_id=1):
+        db.selects = 0
+        response = await client.get(f"{API}/teachers/{teacher_id}/dashboard", headers=HEADERS)
+        return response, db.selects
+
+    async def run():
+        await db.insert("Teacher", [{"name": "Snape"}, {"name": "McGonagall"}])
+        assessment = {"first_question": "?", "system_prompt": "", "mindmap_template": json.dumps(TEMPLATE)}
+        await db.insert(
+            "Assessment",
+            [{**assessment, "name": name, "teacher_id": teacher_id} for name, teacher_id in (("A", 1), ("B", 1), ("C", 2))],
+        )
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            for mindmap_json in (mindmap(2), mindmap(5), None):
+                # Results are created with a GET (see create_assessment_result)
+                await client.request(
+                    "GET",
+                    f"{API}/assessment-results/",
+                    headers=HEADERS,
+                    json={"assessment_id": 1, "teacher_id": 1, "student_id": 1, "mindmap": mindmap_json},
+                )
+            await client.post(f"{API}/students/", headers=HEADERS, json={"name": "Harry", "assessment_ids": [1, 2]})
+            # Written behind the API's back, so assessment B has no stats row yet
+            await db.insert("AssessmentResult", [{"assessment_id": 2, "teacher_id": 1, "student_id": 1, "mindmap": mindmap(3)}])
+            first = await dashboard(client)
+            await client.get(f"{API}/assessments/2/stats", headers=HEADERS)
+            second = await dashboard(client)
+            missing = await client.get(f"{API}/teachers/9/dashboard", headers=HEADERS)
+        return first, second, missing
+
+    app.dependency_overrides[get_db] = override
+    try:
+        (first, first_queries), (second, second_queries), missing = asyncio.run(run())
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+    body = first.json()
+    a, b = body["assessments"]
+    assert (a["name"], a["assigned_count"], a["result_count"], a["processed_count"], a["unprocessed_count"]) == ("A", 1, 3, 2, 1)
+    assert a["average_understanding"] == 3.5 and a["last_activity_at"] is not None
+    assert (b["name"], b["result_count"], b["processed_count"], b["average_understanding"]) == ("B", 1, 1, 3.0)
+    assert (body["result_count"], body["processed_count"], body["unprocessed_count"]) == (4, 3, 1)
+    assert body["last_activity_at"] == max(a["last_activity_at"], b["last_activity_at"])
+    # Teacher, assessments, stats, assignments, plus the results of B while it has no stats
+    assert (first_queries, second_queries) == (5, 4)
+    assert second.json()["assessments"][1]["result_count"] == 1
+    assert missing.status_code == 404
+
+
+def test_results_written_outside_the_api_are_counted():
+    db = SQLiteBackend()
+
+    async def override():
+        yield db
+
+    async def counts(client):
+        body = (await client.get(f"{API}/teachers/1/dashboard", headers=HEADERS)).json()
+        return body["result_count"], body["processed_count"], body["unprocessed_count"]
+
+    async def run():
+        await db.insert("Teacher", [{"name": "Snape"}])
+        await db.insert(
+            "Assessment",
+            [{"name": "A", "teacher_id": 1, "first_question": "?", "system_prompt": "", "mindmap_template": json.dumps(TEMPLATE)}],
+        )
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await client.request(
+                "GET", f"{API}/assessment-results/", headers=HEADERS, json={"assessment_id": 1, "teacher_id": 1, "student_id": 1}
+            )
+            # As the web app does: insert through Supabase, then have the API fill the mindmap
+            (row,) = await db.insert("AssessmentResult", [{"assessment_id": 1, "teacher_id": 1, "student_id": 2}])
+            before = await counts(client)
+            await client.patch(f"{API}/assessment-results/{row['id']}", headers=HEADERS, json={"mindmap": mindmap(4)})
+            processed = await counts(client)
+            await db.delete("AssessmentResult", where={"id": row["id"]})
+            deleted = await counts(client)
+        return before, processed, deleted
+
+    app.dependency_overrides[get_db] = override
+    try:
+        before, processed, deleted = asyncio.run(run())
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+    assert before == (2, 0, 2)
+    assert processed == (2, 1, 1)
+    assert deleted == (1, 0, 1)
@@ -0,0 +1,139 @@
+import asyncio
+import json
+
+import httpx
+
+from benchmarks.fakes import FakeOpenRouter, FakeOpenRouterConfig
+from src.api.dependencies import get_db
+from src.config import settings
+from src.main import app
+from src.services import openrouter
+from src.services.events import EventBus, SharedEventBus, event_stream, get_bus
+from src.services.redis_client import RedisClient
+from src.storage import SQLiteBackend
+from tests.fakes.redis import FakeRedis
+
+API = settings.API_VERSION
+HEADERS = {"Authorization": f"Bearer {settings.API_KEY}"}
+TEMPLATE = {"topic": {"name": "Cells", "description": "Cell biology", "subtopics": []}}
+RESULT = [("result", 1), ("assessment", 1), ("teacher", 1)]
+
+
+def test_slow_subscribers_lag_instead_of_blocking_and_can_resume():
+    bus = EventBus(history=3)
+
+    async def run():
+        stream = event_stream(bus, [("assessment", 1), ("teacher", 1)], heartbeat=0.01, max_queue=2)
+        chunks = [await stream.__anext__()]
+        for i in range(4):
+            bus.publish("result.created", RESULT, {"n": i})
+        bus.publish("result.created", [("assessment", 2)], {"n": "other"})
+        chunks.append(await stream.__anext__())
+        chunks.append(await stream.__anext__())  # Idle: a heartbeat
+        subscribers = bus.subscriber_count
+        await stream.aclose()
+
+        # Events 1 and 2 are no longer kept, 3 and 4 are replayed
+        with bus.subscribe([("result", 1)], last_event_id=f"{bus.epoch}-0") as subscription:
+            replayed = await subscription.drain(0)
+
+        # Ids from another bus (e.g. before a restart) can't be resumed from
+        restarted = EventBus()
+        restarted.publish("result.created", RESULT, {"n": 0})
+        resumed = event_stream(restarted, [("result", 1)], last_event_id=chunks[1].split("id: ")[-1].split("\n")[0])
+        reset = await resumed.__anext__()
+        await resumed.aclose()
+        return chunks, subscribers, replayed, reset, restarted.epoch
+
+    chunks, subscribers, (replayed, forgotten), reset, epoch = asyncio.run(run())
+
+    assert chunks[0].startswith("retry: 3000\n")
+    # Published to both of the subscription's topics, delivered once; the two oldest were dropped
+    assert chunks[1].startswith('event: lagged\ndata: {"dropped": 2}\n\n')
+    assert [json.loads(line[6:])["n"] for line in chunks[1].splitlines() if line.startswith("data: {\"n\"")] == [2, 3]
+    assert chunks[2] == ": heartbeat\n\n"
+    assert subscribers == 1 and bus.subscriber_count == 0
+    assert [event.id for event in replayed] == [3, 4] and forgotten == 2
+    assert reset.endswith(f"id: {epoch}-1\nevent: reset\ndata: {{}}\n\n")
+
+
+def test_shared_buses_deliver_every_workers_events_and_resume_on_any():
+    async def run():
+        async with FakeRedis() as redis:
+            workers = [SharedEventBus(RedisClient(redis.url), retry_after=0.01) for _ in range(2)]
+            stream = event_stream(workers[1], [("teacher", 1)], heartbeat=1)
+            await stream.__anext__()
+            # Published by the worker that processed the result, heard on the one holding the stream
+            await workers[0].send("result.processed", RESULT, {"n": 1})
+            delivered = await stream.__anext__()
+            await stream.aclose()
+            await workers[0].send("result.processed", RESULT, {"n": 2})
+            await asyncio.sleep(0.05)
+            # The client reconnects to the other worker
+            last_event_id = delivered.split("id: ")[1].split("\n")[0]
+            resumed = event_stream(workers[0], [("teacher", 1)], heartbeat=1, last_event_id=last_event_id)
+            subscribed = await resumed.__anext__()
+            replayed = await resumed.__anext__()
+            await resumed.aclose()
+            for worker in workers:
+                await worker.close()
+            return delivered, subscribed, replayed, [worker.epoch for worker in workers]
+
+    delivered, subscribed, replayed, epochs = asyncio.run(run())
+
+    # Ids come from Redis, so they mean the same on every worker
+    assert epochs[0] == epochs[1]
+    assert delivered.startswith(f"id: {epochs[0]}-1\nevent: result.processed\n")
+    assert "reset" not in subscribed
+    assert replayed.startswith(f"id: {epochs[0]}-2\n") and '"n": 2' in replayed
+
+
+def test_results_publish_their_lifecycle():
+    db = SQLiteBackend()
+
+    async def override():
+        yield db
+
+    async def run():
+        await db.insert(
+            "Assessment",
+            [{"name": "A", "first_question": "?", "system_prompt": "", "mindmap_template": json.dumps(TEMPLATE)}],
+        )
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            unscoped = await client.get(f"{API}/events/", headers=HEADERS)
+            with get_bus().subscribe([("teacher", 1)]) as subscription:
+                # Results are created with a GET (see create_assessment_result)
+                await client.request(
+                    "GET",
+                    f"{API}/assessment-results/",
+                    headers=HEADERS,
+                    json={"assessment_id": 1, "teacher_id": 1, "student_id": 1, "transcript": "Teacher: What are cells?"},
+                )
+                await client.post(
+                    f"{API}/assessment-results/1/transcript",
+                    headers=HEADERS,
+                    json=[{"speaker": "Student", "offset_ms": 0, "text": "Building blocks."}],
+                )
+                await client.patch(
+                    f"{API}/assessment-results/1",
+                    headers={**HEADERS, "Prefer": "return=minimal"},
+                    json={"insights": "[]"},
+                )
+                await client.get(f"{API}/assessment-results/1/process", headers=HEADERS)
+                events, dropped = await subscription.drain(0)
+        return unscoped, events, dropped
+
+    app.dependency_overrides[get_db] = override
+    openrouter._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=FakeOpenRouter(FakeOpenRouterConfig(seed=5)).app()))
+    try:
+        unscoped, events, dropped = asyncio.run(run())
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        openrouter._client = None
+
+    assert unscoped.status_code == 422
+    assert [event.type for event in events] == ["result.created", "transcript.appended", "result.updated", "result.processed"]
+    assert events[1].data["segments"] == [{"speaker": "Student", "offset_ms": 0, "text": "Building blocks."}]
+    assert events[2].data["fields"] == ["insights"]
+    assert events[3].data == {"result_id": 1, "assessment_id": 1, "teacher_id": 1, "student_id": 1, "ok": True}
+    assert dropped == 0
@@ -0,0 +1,142 @@
+import asyncio
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from src.api.dependencies import get_db
+from src.config import settings
+from src.main import app
+from src.middleware import IdempotencyMiddleware, IdempotencyStore
+from src.services.cache import SharedCache
+from src.services.redis_client import RedisClient
+from src.storage import SQLiteBackend
+from tests.fakes.redis import FakeRedis
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def counting_app(store: IdempotencyStore, calls=None):
+    calls = [] if calls is None else calls
+
+    async def create(request: Request):
+        body = await request.json()
+        calls.append(body)
+        await asyncio.sleep(body.get("sleep", 0.01))
+        if body.get("fail"):
+            return JSONResponse({"detail": "failed"}, status_code=500)
+        return JSONResponse({"id": len(calls)}, status_code=201)
+
+    async def count(request: Request):
+        return JSONResponse({"count": len(calls)})
+
+    inner = Starlette(routes=[Route("/items", create, methods=["POST"]), Route("/items", count, methods=["GET"])])
+    return IdempotencyMiddleware(inner, store=store), calls
+
+
+def post(client, key, body, token="a"):
+    return client.post("/items", json=body, headers={"Idempotency-Key": key, "Authorization": f"Bearer {token}"})
+
+
+def test_retries_replay_the_first_response():
+    clock = Clock()
+    store = IdempotencyStore(ttl=60, max_keys=100, clock=clock)
+    wrapped, calls = counting_app(store)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=wrapped), base_url="http://test") as client:
+            # Concurrent duplicates attach to the request already running
+            first, second = await asyncio.gather(post(client, "k1", {"n": 1}), post(client, "k1", {"n": 1}))
+            replayed = await post(client, "k1", {"n": 1})
+            # Scoped per caller, and a different request can't reuse the key
+            other_caller = await post(client, "k1", {"n": 1}, token="b")
+            reused = await post(client, "k1", {"n": 2})
+            clock.now = 61
+            expired = await post(client, "k1", {"n": 1})
+            return first, second, replayed, other_caller, reused, expired
+
+    first, second, replayed, other_caller, reused, expired = asyncio.run(run())
+    assert first.status_code == second.status_code == replayed.status_code == 201
+    assert first.json() == second.json() == replayed.json() == {"id": 1}
+    assert replayed.headers["idempotent-replayed"] == "true"
+    assert other_caller.json() == {"id": 2}
+    assert reused.status_code == 422
+    assert expired.json() == {"id": 3}
+    assert len(calls) == 3
+
+
+def test_failures_are_not_stored():
+    store = IdempotencyStore(ttl=60, max_keys=100)
+    wrapped, calls = counting_app(store)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=wrapped), base_url="http://test") as client:
+            return await asyncio.gather(post(client, "k", {"fail": True}), post(client, "k", {"fail": True}))
+
+    responses = asyncio.run(run())
+    # The waiting retry ran for real once the first attempt failed
+    assert [response.status_code for response in responses] == [500, 500]
+    assert len(calls) == 2
+
+
+def test_retries_on_another_worker_wait_for_the_running_request():
+    calls = []
+
+    async def run():
+        async with FakeRedis() as redis:
+            workers = []
+            for _ in range(2):
+                store = IdempotencyStore(
+                    ttl=60, max_keys=100, shared=SharedCache(RedisClient(redis.url)), poll_interval=0.01
+                )
+                wrapped, _ = counting_app(store, calls)
+                workers.append(httpx.AsyncClient(transport=httpx.ASGITransport(app=wrapped), base_url="http://test"))
+            first, second = workers
+            responses = await asyncio.gather(
+                post(first, "k", {"sleep": 0.1}), post(second, "k", {"sleep": 0.1}), post(second, "k", {"sleep": 0.1})
+            )
+            reused = await post(second, "k", {"sleep": 0})
+            # Reads aren't intercepted, so they are never replayed
+            counts = [(await first.get("/items", headers={"Idempotency-Key": "read"})).json()]
+            await post(first, "k2", {"sleep": 0})
+            counts.append((await first.get("/items", headers={"Idempotency-Key": "read"})).json())
+            for client in workers:
+                await client.aclose()
+            return responses, reused, counts
+
+    responses, reused, counts = asyncio.run(run())
+    assert [response.json() for response in responses] == [{"id": 1}] * 3
+    assert reused.status_code == 422
+    assert counts == [{"count": 1}, {"count": 2}]
+
+
+def test_create_with_idempotency_key():
+    db = SQLiteBackend()
+
+    async def override():
+        yield db
+
+    async def run():
+        headers = {"Authorization": f"Bearer {settings.API_KEY}", "Idempotency-Key": "create-teacher-1"}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            responses = [
+                await client.post(f"{settings.API_VERSION}/teachers/", headers=headers, json={"name": "Ada"})
+                for _ in range(3)
+            ]
+        return responses, await db.select("Teacher")
+
+    app.dependency_overrides[get_db] = override
+    try:
+        responses, teachers = asyncio.run(run())
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+    assert len({response.text for response in responses}) == 1
+    assert len(teachers) == 1
@@ -0,0 +1,83 @@
+import asyncio
+import io
+from pathlib import Path
+
+import pytest
+
+from src.importer import Checkpoint, ColumnTemplates, ImportFailed, import_rows, open_source, read_rows
+from src.storage import SQLiteBackend, StorageError
+
+USERS = Path(__file__).parent.parent / "harry-potter-db-seed-users.csv"
+
+
+class FlakyBackend(SQLiteBackend):
+    """Fails every insert after the first `healthy` ones"""
+
+    def __init__(self, healthy: int):
+        super().__init__()
+        self.healthy = healthy
+
+    async def insert(self, table, rows):
+        if self.healthy <= 0:
+            raise StorageError("connection lost", "08006")
+        self.healthy -= 1
+        return await super().insert(table, rows)
+
+
+def test_imports_seed_users_as_students():
+    async def run():
+        db = SQLiteBackend()
+        with open_source(str(USERS)) as source:
+            report = await import_rows(
+                db,
+                "Student",
+                read_rows(source, "csv"),
+                batch_size=20,
+                templates=ColumnTemplates.parse(["name={forename} {surname}"]),
+                csv_cells=True,
+            )
+        return report, await db.select("Student")
+
+    report, students = asyncio.run(run())
+    assert report.inserted == len(students) == 113
+    assert students[0]["name"] == "Patricia Stimpson"
+    assert report.rows_per_second > 0
+
+
+def test_rejects_invalid_rows_and_decodes_csv_cells():
+    source = io.StringIO('name,assessment_ids\nAda,"[1, 2]"\n,[3]\nGrace,not a list\n')
+    rejects = io.StringIO()
+
+    async def run():
+        db = SQLiteBackend()
+        report = await import_rows(db, "Student", read_rows(source, "csv"), csv_cells=True, rejects=rejects)
+        return report, await db.select("Student")
+
+    report, students = asyncio.run(run())
+    assert (report.inserted, report.rejected) == (1, 2)
+    assert students[0]["assessment_ids"] == [1, 2]
+    assert [line.split(",")[0] for line in rejects.getvalue().splitlines()] == ['{"row": 1', '{"row": 2']
+
+
+def test_resumes_from_checkpoint(tmp_path):
+    rows = [{"name": f"Teacher {i}"} for i in range(95)]
+    path = tmp_path / "checkpoint.json"
+
+    async def run():
+        db = FlakyBackend(healthy=3)
+        checkpoint = Checkpoint(source="teachers", table="Teacher", batch_size=10)
+        with pytest.raises(ImportFailed):
+            await import_rows(
+                db, "Teacher", rows, batch_size=10, parallel=1, checkpoint=checkpoint, checkpoint_path=path, retries=1
+            )
+        assert Checkpoint.load(path).offset == 30
+
+        db.healthy = 100
+        report = await import_rows(
+            db, "Teacher", rows, batch_size=10, checkpoint=Checkpoint.load(path), checkpoint_path=path
+        )
+        return report, await db.select("Teacher")
+
+    report, teachers = asyncio.run(run())
+    assert (report.skipped, report.inserted) == (30, 65)
+    assert sorted(teacher["name"] for teacher in teachers) == sorted(row["name"] for row in rows)
@@ -0,0 +1,34 @@
+import pytest
+
+from src.services.json_extract import JSONExtractionError, JSONExtractor, extract_json
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('```json\n{"a": [1, 2,],}\n```', {"a": [1, 2]}),
+        ('Here [is] the map: {"a": "x}y", "b": {"c": 1}} and more {', {"a": "x}y", "b": {"c": 1}}),
+        ('{"a": 1, "b": {"c": "trunc', {"a": 1, "b": {"c": "trunc"}}),
+        ('["one", "two", "thr', ["one", "two", "thr"]),
+        ('{"a": 1, "b":', {"a": 1}),
+    ],
+)
+def test_extract_json(text, expected):
+    assert extract_json(text) == expected
+
+
+def test_extract_json_expect():
+    assert extract_json('see [1] then {"x": 2}', expect=dict) == {"x": 2}
+    with pytest.raises(JSONExtractionError):
+        extract_json("no json here")
+
+
+def test_incremental_stops_at_complete_value():
+    extractor = JSONExtractor()
+    chunks = ['Sure:\n```json\n{"topic": {"na', 'me": "A", "subtopics": [1, 2]}', '}\n```', " trailing"]
+    for i, chunk in enumerate(chunks):
+        extractor.feed(chunk)
+        if extractor.done:
+            break
+    assert i == 2
+    assert extractor.finish() == {"topic": {"name": "A", "subtopics": [1, 2]}}
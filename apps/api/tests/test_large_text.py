@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+from src.schemas import AssessmentResult
+from src.services.result_export import export_results
+from src.storage import LargeTextBackend, LazyRow, LocalBlobStore, SQLiteBackend
+from src.storage.large_text import COMPRESSED, OFFLOADED
+
+TRANSCRIPT = "\n".join(f"Student: Mitochondria are the powerhouse of the cell ({i})" for i in range(2000))
+
+
+class CountingBlobStore(LocalBlobStore):
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.gets = 0
+
+    async def get(self, key):
+        self.gets += 1
+        return await super().get(key)
+
+
+def result(**values):
+    return {"assessment_id": 1, "teacher_id": 1, "student_id": 1, **values}
+
+
+def test_large_values_are_compressed_and_unpacked_on_read():
+    inner = SQLiteBackend()
+    db = LargeTextBackend(inner, min_size=1024)
+
+    async def run():
+        created = await db.insert(
+            "AssessmentResult",
+            [result(transcript=TRANSCRIPT, mindmap="{}"), result(transcript="\x1fnot a marker")],
+        )
+        raw = await inner.select("AssessmentResult", order_by="id")
+        rows = await db.select("AssessmentResult", order_by="id")
+        await db.update("AssessmentResult", {"transcript": TRANSCRIPT + "!"}, where={"id": 2})
+        updated = await db.select("AssessmentResult", where={"id": 2})
+        return created, raw, rows, updated
+
+    created, raw, rows, updated = asyncio.run(run())
+
+    assert created[0]["transcript"] == TRANSCRIPT
+    # Stored compressed, while short values stay plain text
+    assert raw[0]["transcript"].startswith(COMPRESSED) and len(raw[0]["transcript"]) < len(TRANSCRIPT) / 10
+    assert raw[0]["mindmap"] == "{}"
+    # Text that looks packed is packed too, so it reads back unchanged
+    assert raw[1]["transcript"].startswith(COMPRESSED)
+    assert rows[1]["transcript"] == "\x1fnot a marker"
+
+    row = rows[0]
+    assert isinstance(row, LazyRow)
+    assert dict.__getitem__(row, "transcript").startswith(COMPRESSED)  # Not unpacked until read
+    assert AssessmentResult(**row).transcript == TRANSCRIPT
+    assert json.loads(json.dumps(rows[0]))["transcript"] == TRANSCRIPT
+    assert updated[0]["transcript"] == TRANSCRIPT + "!"
+
+
+def test_offloaded_values_are_only_fetched_for_selected_columns(tmp_path):
+    inner = SQLiteBackend()
+    blobs = CountingBlobStore(tmp_path)
+    db = LargeTextBackend(inner, min_size=1024, blobs=blobs, offload_size=1024)
+
+    async def run():
+        await db.insert("AssessmentResult", [result(transcript=TRANSCRIPT), result(transcript=TRANSCRIPT)])
+        raw = await inner.select("AssessmentResult", columns=["transcript"])
+        ids = await db.select("AssessmentResult", columns=["id", "student_id"])
+        gets_without_transcript = blobs.gets
+        rows = await db.select("AssessmentResult")
+        exported = b"".join([chunk async for chunk in export_results(db, where={"teacher_id": 1}, columns=["transcript"])])
+        return raw, ids, gets_without_transcript, rows, exported
+
+    raw, ids, gets_without_transcript, rows, exported = asyncio.run(run())
+
+    assert all(row["transcript"].startswith(OFFLOADED) for row in raw)
+    assert len(list(tmp_path.rglob("*"))) == 4  # AssessmentResult/transcript/<key> for each row
+    assert len(ids) == 2 and gets_without_transcript == 0
+    assert [row["transcript"] for row in rows] == [TRANSCRIPT, TRANSCRIPT]
+    assert [json.loads(line)["transcript"] for line in exported.splitlines()] == [TRANSCRIPT, TRANSCRIPT]
+
+
+def test_offloaded_values_are_deleted_with_their_rows(tmp_path):
+    inner = SQLiteBackend()
+    db = LargeTextBackend(inner, min_size=1024, blobs=LocalBlobStore(tmp_path), offload_size=1024)
+
+    async def run():
+        await db.insert("AssessmentResult", [result(transcript=TRANSCRIPT), result(transcript=TRANSCRIPT)])
+        await db.update("AssessmentResult", {"transcript": "short"}, where={"id": 1})
+        await db.update("AssessmentResult", {"mindmap": "{}"}, where={"id": 2})
+        kept = sorted(path.name for path in tmp_path.rglob("*") if path.is_file())
+        deleted = await db.delete("AssessmentResult", where={"id": 2})
+        left = [path for path in tmp_path.rglob("*") if path.is_file()]
+        return kept, deleted, left
+
+    kept, deleted, left = asyncio.run(run())
+    # Only the overwritten transcript's blob went with the first update
+    assert len(kept) == 1
+    assert deleted[0]["transcript"] == TRANSCRIPT
+    assert left == []
@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from benchmarks.fakes import FakeOpenRouter, FakeOpenRouterConfig, cassette_key
+from src.api.v1.endpoints.assessment_results import process_assessment
+from src.main import app
+from src.config import settings
+from src.prompts import CLASS_MAP
+from src.services import openrouter
+from src.services.cache import Cache, LocalCache
+
+
+@pytest.fixture
+def fake_openrouter():
+    def install(config):
+        fake = FakeOpenRouter(config)
+        openrouter._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app()))
+        return fake
+
+    yield install
+    openrouter._client = None
+
+
+def test_generate_mindmap(fake_openrouter):
+    fake_openrouter(FakeOpenRouterConfig(seed=1))
+
+    async def call():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post(
+                f"{settings.API_VERSION}/assessments/generate-mindmap",
+                headers={"Authorization": f"Bearer {settings.API_KEY}"},
+                json={"text": "Cell biology"},
+            )
+
+    response = asyncio.run(call())
+    assert response.status_code == 200
+    assert {"name", "description", "subtopics"} <= response.json()["topic"].keys()
+
+
+def test_replay_cassette(fake_openrouter, tmp_path):
+    variables = {"students": "Student 1:\n- Cells [3]: answer"}
+    request = json.loads(CLASS_MAP.payload(variables))
+    cassette = tmp_path / "cassette.jsonl"
+    cassette.write_text(json.dumps({"key": cassette_key(request), "content": '```json\n["recorded"]\n```'}) + "\n")
+    fake = fake_openrouter(FakeOpenRouterConfig(mode="replay", cassette=cassette, on_miss="error"))
+
+    assert asyncio.run(openrouter.chat_completion_json(CLASS_MAP, variables, expect=list)) == ["recorded"]
+    with pytest.raises(openrouter.OpenRouterError):
+        asyncio.run(openrouter.chat_completion_json(CLASS_MAP, {"students": "other"}, expect=list))
+    assert fake.config.stats["replayed"] == 1
+
+
+def test_identical_requests_share_a_cached_result(fake_openrouter, monkeypatch):
+    fake = fake_openrouter(FakeOpenRouterConfig(seed=3, latency="fixed:20"))
+    monkeypatch.setattr(settings, "LLM_CACHE_TTL", 60)
+    monkeypatch.setattr(openrouter, "get_cache", lambda cache=Cache(LocalCache(max_entries=10)): cache)
+    variables = {"students": "Student 1:\n- Cells [3]: answer"}
+
+    async def run():
+        same = await asyncio.gather(*(openrouter.chat_completion_json(CLASS_MAP, variables, expect=list) for _ in range(3)))
+        later = await openrouter.chat_completion_json(CLASS_MAP, variables, expect=list)
+        other = await openrouter.chat_completion_json(CLASS_MAP, {"students": "other"}, expect=list)
+        return same, later, other
+
+    same, later, other = asyncio.run(run())
+    assert same[0] == same[1] == same[2] == later
+    assert fake.config.stats["requests"] == 2
+
+
+def test_invalid_and_repaired_results_are_not_cached(fake_openrouter, monkeypatch, tmp_path):
+    truncated = {"students": "Student 1:\n- Cells [1]: cut off"}
+    cassette = tmp_path / "cassette.jsonl"
+    key = cassette_key(json.loads(CLASS_MAP.payload(truncated)))
+    cassette.write_text(json.dumps({"key": key, "content": '["complete", "cut of'}) + "\n")
+    fake = fake_openrouter(FakeOpenRouterConfig(seed=4, mode="replay", cassette=cassette))
+    monkeypatch.setattr(settings, "LLM_CACHE_TTL", 60)
+    monkeypatch.setattr(openrouter, "get_cache", lambda cache=Cache(LocalCache(max_entries=10)): cache)
+    variables = {"students": "Student 1:\n- Cells [3]: answer"}
+
+    def reject(value):
+        raise ValueError("not usable")
+
+    async def run():
+        with pytest.raises(ValueError):
+            await openrouter.chat_completion_json(CLASS_MAP, variables, expect=list, validate=reject)
+        await openrouter.chat_completion_json(CLASS_MAP, variables, expect=list)
+        repaired = [await openrouter.chat_completion_json(CLASS_MAP, truncated, expect=list) for _ in range(2)]
+        return repaired
+
+    repaired = asyncio.run(run())
+    assert repaired == [["complete", "cut of"]] * 2
+    # The rejected value was never stored, and neither was the repaired one
+    assert fake.config.stats["requests"] == 4 and fake.config.stats["replayed"] == 2
+
+
+def test_process_assessment(fake_openrouter):
+    fake_openrouter(FakeOpenRouterConfig(seed=2))
+    template = {"topic": {"name": "Cells", "description": "Cell biology", "subtopics": []}}
+    data = {"blankMindmapTemplate": json.dumps(template), "userTranscript": "Student: cells have membranes"}
+
+    processed = asyncio.run(process_assessment(data))
+    assert "error" not in processed
+    assert processed["mindmap"]["topic"]["name"] == "Cells"
+    assert isinstance(processed["insights"], list)
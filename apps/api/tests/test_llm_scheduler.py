@@ -0,0 +1,78 @@
+import asyncio
+
+from src.services.llm_scheduler import LLMScheduler, Priority
+
+
+def test_interactive_calls_jump_the_queue():
+    scheduler = LLMScheduler(concurrency={Priority.INTERACTIVE: 1, Priority.BATCH: 1}, rate=0, burst=1)
+    order = []
+
+    async def call(name, priority, release):
+        async with scheduler.slot(priority):
+            order.append(name)
+            await release.wait()
+
+    async def run():
+        # One slot per class; the batch slot is taken and two more batch calls queue behind it
+        first, done = asyncio.Event(), asyncio.Event()
+        tasks = [asyncio.create_task(call("batch-0", Priority.BATCH, first))]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(call(f"batch-{i}", Priority.BATCH, done)) for i in (1, 2)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("interactive", Priority.INTERACTIVE, done)))
+        await asyncio.sleep(0)
+        # The interactive call has its own budget and doesn't wait behind queued batch work
+        assert order == ["batch-0", "interactive"]
+        assert scheduler.stats()["batch"] == {"in_flight": 1, "waiting": 2}
+        first.set()
+        done.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == ["batch-0", "interactive", "batch-1", "batch-2"]
+    assert scheduler.stats()["batch"] == {"in_flight": 0, "waiting": 0}
+
+
+def test_rate_budget_goes_to_interactive_calls_first():
+    scheduler = LLMScheduler(concurrency={Priority.INTERACTIVE: 4, Priority.BATCH: 4}, rate=50, burst=1)
+    order = []
+
+    async def call(name, priority):
+        async with scheduler.slot(priority):
+            order.append(name)
+
+    async def run():
+        # The burst token goes to the first caller; the rest wait for tokens at 50/s
+        tasks = [asyncio.create_task(call(f"batch-{i}", Priority.BATCH)) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("interactive", Priority.INTERACTIVE)))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == ["batch-0", "interactive", "batch-1", "batch-2"]
+
+
+def test_cancelled_waiters_give_up_their_place():
+    scheduler = LLMScheduler(concurrency={Priority.INTERACTIVE: 1, Priority.BATCH: 1}, rate=0, burst=1)
+
+    async def run():
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot(Priority.BATCH):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        release.set()
+        await holder
+        await asyncio.gather(waiter, return_exceptions=True)
+        # The slot is free again rather than held by the cancelled call
+        async with scheduler.slot(Priority.BATCH):
+            assert scheduler.stats()["batch"]["in_flight"] == 1
+
+    asyncio.run(run())
+    assert scheduler.stats()["batch"] == {"in_flight": 0, "waiting": 0}
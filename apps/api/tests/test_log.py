@@ -0,0 +1,53 @@
+import asyncio
+import json
+import logging
+import random
+
+import httpx
+from fastapi import FastAPI
+
+from src.log import ContextQueueHandler, JSONFormatter, SamplingFilter, parse_sample_rates, request_id, truncate
+from src.middleware import RequestIDMiddleware
+
+
+def record(name: str, level: int = logging.INFO, **extra) -> logging.LogRecord:
+    return logging.makeLogRecord({"name": name, "levelno": level, "levelname": logging.getLevelName(level), "msg": "hello", **extra})
+
+
+def test_sampling_uses_the_most_specific_category():
+    random.seed(0)
+    sampler = SamplingFilter(parse_sample_rates("src.crud=0, src.crud.assessment=1"))
+    assert not sampler.filter(record("src.crud.student"))
+    assert sampler.filter(record("src.crud.assessment"))
+    assert sampler.filter(record("src.crud.student", logging.WARNING))
+    assert sampler.filter(record("src.api"))
+
+
+def test_json_lines_carry_request_id_and_truncated_fields():
+    token = request_id.set("abc")
+    try:
+        prepared = ContextQueueHandler(None).prepare(record("src.api", payload="x" * 50, count=3))
+    finally:
+        request_id.reset(token)
+    entry = json.loads(JSONFormatter(max_length=10).format(prepared))
+    assert entry["request_id"] == "abc" and entry["message"] == "hello" and entry["count"] == 3
+    assert entry["payload"] == truncate("x" * 50, 10) == "xxxxxxxxxx... (40 more characters)"
+
+
+def test_request_id_is_propagated_or_generated():
+    app = FastAPI()
+
+    @app.get("/")
+    async def index():
+        return {"request_id": request_id.get()}
+
+    app.add_middleware(RequestIDMiddleware)
+
+    async def call(headers):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get("/", headers=headers)
+
+    given = asyncio.run(call({"X-Request-ID": "trace-1"}))
+    assert given.json() == {"request_id": "trace-1"} and given.headers["x-request-id"] == "trace-1"
+    generated = asyncio.run(call({}))
+    assert generated.json()["request_id"] == generated.headers["x-request-id"] != "-"
@@ -0,0 +1,48 @@
+import json
+
+import numpy as np
+
+from src.services.mindmap_tree import MindmapTree, score_matrix
+
+MINDMAP = {
+    "topic": {
+        "name": "Cells",
+        "description": "d",
+        "understandingLevel": 4,
+        "subtopics": [
+            {"name": "Membrane", "understandingLevel": "2", "subtopics": [{"name": "Lipids"}]},
+            {"name": "Nucleus", "understandingLevel": 5, "subtopics": []},
+        ],
+    }
+}
+
+
+def test_round_trip():
+    tree = MindmapTree.loads(json.dumps(MINDMAP))
+    assert tree.to_dict() == MINDMAP
+    assert MindmapTree.loads(tree.dumps()).to_dict() == MINDMAP
+
+
+def test_indexed_arrays():
+    tree = MindmapTree(MINDMAP)
+    assert tree.paths == ["Cells", "Cells / Membrane", "Cells / Membrane / Lipids", "Cells / Nucleus"]
+    assert tree.parents.tolist() == [-1, 0, 1, 0]
+    assert tree.depths.tolist() == [0, 1, 2, 1]
+    assert tree.score("Cells / Membrane") == 2.0
+    assert np.isnan(tree.score("Cells / Membrane / Lipids"))
+    assert tree.children("Cells") == ["Cells / Membrane", "Cells / Nucleus"]
+    assert tree.node("Cells / Nucleus")["understandingLevel"] == 5
+
+
+def test_compare_and_matrix():
+    a = MindmapTree(MINDMAP)
+    b = MindmapTree(MINDMAP)
+    b.set_score("Cells / Nucleus", 3)
+    assert a.compare(b) == {"Cells / Nucleus": (5.0, 3.0)}
+    assert b.to_dict()["topic"]["subtopics"][1]["understandingLevel"] == 3
+
+    c = MindmapTree({"name": "Cells", "understandingLevel": 1, "subtopics": [{"name": "Ribosome", "understandingLevel": 2}]})
+    paths, matrix = score_matrix([a, c])
+    assert paths[-1] == "Cells / Ribosome"
+    assert matrix.shape == (2, 5)
+    assert matrix[1, 0] == 1 and np.isnan(matrix[0, 4]) and np.isnan(matrix[1, 1])
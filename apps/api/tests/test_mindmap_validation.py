@@ -0,0 +1,79 @@
+import copy
+import json
+
+import pytest
+
+from src.services.mindmap_validation import SCHEMA_KEYWORDS, MindmapValidationError, compile_template
+
+TEMPLATE = {
+    "topic": {
+        "name": "Cells",
+        "description": "",
+        "subtopics": [{"name": "Membrane", "description": "", "subtopics": []}],
+    }
+}
+
+
+def fill(template):
+    filled = copy.deepcopy(template)
+    for node in (filled["topic"], filled["topic"]["subtopics"][0]):
+        node.update(studentResponse="answer", understandingLevel=3)
+    return filled
+
+
+def test_compile_template_is_cached():
+    compiled = compile_template(json.dumps(TEMPLATE))
+    assert compile_template(json.dumps(TEMPLATE)) is compiled
+    assert "'Membrane'" in compiled.schema["properties"]["topic"]["properties"]["subtopics"]["description"]
+
+
+def conforms(value, schema) -> bool:
+    """Checks a value against the keyword subset the compiled schemas use"""
+    assert schema.keys() <= SCHEMA_KEYWORDS
+    kind = schema.get("type")
+    if kind == "object":
+        return (
+            isinstance(value, dict)
+            and set(schema["required"]) <= value.keys()
+            and all(conforms(value[key], sub) for key, sub in schema["properties"].items() if key in value)
+        )
+    if kind == "array":
+        return isinstance(value, list) and all(conforms(item, schema["items"]) for item in value)
+    types = {"string": str, "integer": int, "number": (int, float), "boolean": bool}
+    return kind is None or isinstance(value, types[kind])
+
+
+def test_schema_matches_the_validator():
+    template = copy.deepcopy(TEMPLATE)
+    template["topic"]["subtopics"].append({"name": "Nucleus", "description": "", "hint": "DNA", "subtopics": []})
+    compiled = compile_template(template)
+    filled = copy.deepcopy(template)
+    for node in (filled["topic"], *filled["topic"]["subtopics"]):
+        node.update(studentResponse="answer", understandingLevel=3)
+
+    assert conforms(filled, compiled.schema)
+    compiled.validate(filled)
+    # The schema can't tell siblings apart, the validator does
+    filled["topic"]["subtopics"].reverse()
+    assert conforms(filled, compiled.schema)
+    with pytest.raises(MindmapValidationError):
+        compiled.validate(filled)
+    del filled["topic"]["studentResponse"]
+    assert not conforms(filled, compiled.schema)
+
+
+def test_validate():
+    compiled = compile_template(TEMPLATE)
+    assert compiled.validate(json.dumps(fill(TEMPLATE))).score("Cells / Membrane") == 3
+
+    drifted = fill(TEMPLATE)
+    drifted["topic"]["subtopics"][0]["name"] = "Membranes"
+    with pytest.raises(MindmapValidationError, match="missing node 'Cells / Membrane'"):
+        compiled.validate(drifted)
+
+    unscored = fill(TEMPLATE)
+    unscored["topic"]["understandingLevel"] = 7
+    del unscored["topic"]["subtopics"][0]["studentResponse"]
+    with pytest.raises(MindmapValidationError) as error:
+        compiled.validate(unscored)
+    assert len(error.value.errors) == 2
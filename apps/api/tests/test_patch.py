@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import httpx
+
+from src.api.dependencies import get_db
+from src.config import settings
+from src.main import app
+from src.storage import SQLiteBackend
+
+API = settings.API_VERSION
+HEADERS = {"Authorization": f"Bearer {settings.API_KEY}"}
+TEMPLATE = {"topic": {"name": "Cells", "description": "Cell biology", "subtopics": []}}
+
+
+def mindmap(level):
+    return json.dumps({"topic": {**TEMPLATE["topic"], "understandingLevel": level}})
+
+
+def test_patch_writes_only_the_fields_sent():
+    db = SQLiteBackend()
+
+    async def override():
+        yield db
+
+    async def run():
+        await db.insert("Student", [{"name": "Hermione", "assessment_ids": [1, 2]}])
+        await db.insert(
+            "Assessment",
+            [{"name": "A", "first_question": "?", "system_prompt": "", "mindmap_template": json.dumps(TEMPLATE)}],
+        )
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            patched = await client.patch(f"{API}/students/1", headers=HEADERS, json={"name": "Ron"})
+            nulled = await client.patch(f"{API}/students/1", headers=HEADERS, json={"name": None})
+            unknown = await client.patch(f"{API}/students/1", headers=HEADERS, json={"house": "Gryffindor"})
+            missing = await client.patch(f"{API}/students/9", headers=HEADERS, json={"name": "Ron"})
+            minimal = await client.patch(
+                f"{API}/assessments/1",
+                headers={**HEADERS, "Prefer": "return=minimal"},
+                json={"first_question": "What is a cell?"},
+            )
+            minimal_missing = [
+                await client.patch(f"{API}/{path}", headers={**HEADERS, "Prefer": "return=minimal"}, json=body)
+                for path, body in [
+                    ("assessments/9", {"first_question": "?"}),
+                    ("teachers/9", {"name": "Snape"}),
+                    ("students/9", {"name": "Ron"}),
+                    ("assessment-results/9", {"transcript": "?"}),
+                ]
+            ]
+            assessment = (await client.get(f"{API}/assessments/1", headers=HEADERS)).json()
+
+            # Results are created with a GET (see create_assessment_result)
+            await client.request(
+                "GET",
+                f"{API}/assessment-results/",
+                headers=HEADERS,
+                json={"assessment_id": 1, "teacher_id": 1, "student_id": 1, "transcript": "long", "mindmap": mindmap(2)},
+            )
+            await client.patch(f"{API}/assessment-results/1", headers=HEADERS, json={"mindmap": mindmap(4)})
+            result = (await client.get(f"{API}/assessment-results/1", headers=HEADERS)).json()
+            stats = (await client.get(f"{API}/assessments/1/stats", headers=HEADERS)).json()
+        return patched, nulled, unknown, missing, minimal, minimal_missing, assessment, result, stats
+
+    app.dependency_overrides[get_db] = override
+    try:
+        patched, nulled, unknown, missing, minimal, minimal_missing, assessment, result, stats = asyncio.run(run())
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+    assert patched.status_code == 200
+    assert patched.json()["name"] == "Ron" and patched.json()["assessment_ids"] == [1, 2]
+    assert nulled.status_code == 422
+    assert unknown.status_code == 422
+    assert missing.status_code == 404
+    assert minimal.status_code == 204 and minimal.content == b""
+    # Only a count comes back with return=minimal, which is enough to tell a missing row
+    assert [response.status_code for response in minimal_missing] == [404] * 4
+    assert assessment["first_question"] == "What is a cell?" and assessment["name"] == "A"
+    # The transcript wasn't sent, so it was left alone
+    assert result["transcript"] == "long"
+    # The stats moved from the old mindmap's level to the new one's
+    assert stats["result_count"] == 1
+    assert stats["node_stats"]["Cells"]["histogram"] == [0, 0, 0, 1, 0]
@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from src.middleware import ProfilingMiddleware
+
+
+def busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def make_app(tmp_path, **options) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        busy(0.05)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    app.add_middleware(ProfilingMiddleware, directory=str(tmp_path), interval_ms=1, **options)
+    return app
+
+
+def get(app: FastAPI, url: str, **kwargs) -> httpx.Response:
+    async def call():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get(url, **kwargs)
+
+    return asyncio.run(call())
+
+
+def test_profiles_requests_with_the_token(tmp_path):
+    app = make_app(tmp_path, token="secret")
+    response = get(app, "/slow", headers={"X-Profile": "secret"})
+    assert response.json() == {"ok": True}
+
+    lines = (tmp_path / f"{response.headers['x-profile-id']}.folded").read_text().splitlines()
+    stacks = {line.rsplit(" ", 1)[0]: int(line.rsplit(" ", 1)[1]) for line in lines}
+    assert any(stack.startswith("GET /slow;") and stack.endswith("test_profiling:busy") for stack in stacks)
+    assert stacks["GET /slow;(waiting)"] > 0
+
+    assert "x-profile-id" in get(app, "/slow?profile=secret").headers
+
+
+def test_ignores_requests_without_the_token(tmp_path):
+    app = make_app(tmp_path, token="secret")
+    assert "x-profile-id" not in get(app, "/slow", headers={"X-Profile": "wrong"}).headers
+    assert "x-profile-id" not in get(app, "/slow").headers
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,100 @@
+import asyncio
+import csv
+import io
+import json
+
+import httpx
+
+from src.api.dependencies import get_db
+from src.config import settings
+from src.main import app
+from src.storage import SQLiteBackend
+
+TEMPLATE = {
+    "topic": {"name": "Cells", "description": "", "subtopics": [{"name": "Membrane", "description": "", "subtopics": []}]}
+}
+
+
+def filled(topic_level, membrane_level):
+    return json.dumps(
+        {
+            "topic": {
+                **TEMPLATE["topic"],
+                "understandingLevel": topic_level,
+                "subtopics": [{**TEMPLATE["topic"]["subtopics"][0], "understandingLevel": membrane_level}],
+            }
+        }
+    )
+
+
+def export(path, **params):
+    db = SQLiteBackend()
+
+    async def override():
+        yield db
+
+    async def run():
+        await db.insert(
+            "Assessment",
+            [
+                {
+                    "name": "A",
+                    "first_question": "?",
+                    "system_prompt": "",
+                    "mindmap_template": json.dumps(TEMPLATE),
+                    "teacher_id": 1,
+                }
+            ],
+        )
+        await db.insert(
+            "AssessmentResult",
+            [
+                {
+                    "assessment_id": 1,
+                    "teacher_id": 1,
+                    "student_id": i,
+                    "transcript": f"T{i}",
+                    "mindmap": filled(i % 5 + 1, 3) if i % 2 else None,
+                }
+                for i in range(1, 8)
+            ]
+            + [{"assessment_id": 2, "teacher_id": 2, "student_id": 1}],
+        )
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get(
+                f"{settings.API_VERSION}/assessment-results/export/{path}",
+                params=params,
+                headers={"Authorization": f"Bearer {settings.API_KEY}"},
+            )
+
+    app.dependency_overrides[get_db] = override
+    settings.EXPORT_PAGE_SIZE, page_size = 3, settings.EXPORT_PAGE_SIZE
+    try:
+        return asyncio.run(run())
+    finally:
+        settings.EXPORT_PAGE_SIZE = page_size
+        app.dependency_overrides.pop(get_db, None)
+
+
+def test_ndjson_export_pages_through_all_results():
+    response = export("teacher/1", columns="id,student_id", scores="true")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    # 7 results over pages of 3, in id order, with only the selected columns
+    assert [row["id"] for row in rows] == list(range(1, 8))
+    assert rows[0] == {"id": 1, "student_id": 1, "scores": {"Cells": 2.0, "Cells / Membrane": 3.0}}
+    assert rows[1]["scores"] == {}
+
+
+def test_csv_export_has_a_column_per_template_node():
+    response = export("assessment/1", format="csv", columns="student_id", scores="true")
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["student_id", "score:Cells", "score:Cells / Membrane"]
+    assert rows[1] == ["1", "2.0", "3.0"]
+    assert rows[2] == ["2", "", ""]
+    assert len(rows) == 8
+
+
+def test_export_rejects_unknown_columns():
+    assert export("student/1", columns="id,secret").status_code == 422
+    assert export("assessment/9").status_code == 404
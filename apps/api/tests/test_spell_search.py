@@ -0,0 +1,88 @@
+import asyncio
+import csv
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+from src.api.dependencies import get_db
+from src.config import settings
+from src.main import app
+from src.schemas import Spell
+from src.services import spell_search
+from src.services.spell_search import SpellIndex
+from src.storage import SQLiteBackend
+
+SEED = Path(__file__).parent.parent / "harry-potter-db-seed-spells.csv"
+
+
+@pytest.fixture(scope="module")
+def index():
+    with SEED.open(encoding="utf-8-sig") as f:
+        return SpellIndex(Spell(**row) for row in csv.DictReader(f))
+
+
+def names(spells):
+    return [spell.name for spell in spells]
+
+
+def test_ranks_exact_then_prefix_then_word_prefix(index):
+    assert names(index.search("lumos")) == ["Lumos"]
+    assert names(index.search("rep"))[:2] == ["Reparo", "Reparifors"]
+    # "Reparo" is also a word in "Oculus Reparo", ranked after the names starting with it
+    assert names(index.search("reparo"))[:2] == ["Reparo", "Oculus Reparo"]
+    assert names(index.search("LEVI"))[:2] == ["Levicorpus", "Wingardium Leviosa"]
+
+
+def test_tolerates_typos(index):
+    assert names(index.search("expeliarmus"))[0] == "Expelliarmus"
+    assert names(index.search("wingardium levosa"))[0] == "Wingardium Leviosa"
+    assert index.search("zzzz") == []
+
+
+def test_searches_descriptions(index):
+    assert "Accio" in names(index.search("summons", field="description"))
+
+
+def test_typeahead_is_sub_millisecond(index):
+    queries = ["a", "ac", "acc", "acci", "accio", "expel", "wingard", "levosa"]
+    start = time.perf_counter()
+    for _ in range(100):
+        for query in queries:
+            index.search(query)
+    assert (time.perf_counter() - start) / (100 * len(queries)) < 0.001
+
+
+def test_search_endpoint_uses_the_index():
+    db = SQLiteBackend()
+
+    async def override():
+        yield db
+
+    async def run():
+        await db.insert("spells", [{"id": "1", "name": "Lumos", "description": "Lights the wand"}])
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            found = await client.get(
+                f"{settings.API_VERSION}/spells/search/",
+                params={"keyword": "lumso"},
+                headers={"Authorization": f"Bearer {settings.API_KEY}"},
+            )
+            # Indexed until a write through the API or the TTL, so a direct insert isn't seen yet
+            await db.insert("spells", [{"id": "2", "name": "Nox", "description": "Puts out the light"}])
+            missing = await client.get(
+                f"{settings.API_VERSION}/spells/search/",
+                params={"keyword": "nox"},
+                headers={"Authorization": f"Bearer {settings.API_KEY}"},
+            )
+        return found, missing
+
+    app.dependency_overrides[get_db] = override
+    spell_search.invalidate()
+    try:
+        found, missing = asyncio.run(run())
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        spell_search.invalidate()
+    assert names(Spell(**spell) for spell in found.json()["results"]) == ["Lumos"]
+    assert missing.status_code == 404
@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.api.dependencies import get_db
+from src.config import settings
+from src.crud import assessment
+from src.main import app
+from src.schemas import AssessmentCreate, StudentCreate
+from src.services import assignments
+from src.storage import SQLiteBackend, StorageError
+
+TEMPLATE = {"topic": {"name": "Cells", "description": "", "subtopics": [{"name": "Membrane", "subtopics": []}]}}
+
+
+def test_sqlite_backend_queries():
+    async def run():
+        db = SQLiteBackend()
+        rows = await db.insert("Student", [{"name": "Ada", "assessment_ids": [1, 2]}, {"name": "Alan"}])
+        assert [row["id"] for row in rows] == [1, 2]
+        assert rows[0]["assessment_ids"] == [1, 2] and rows[1]["assessment_ids"] == []
+
+        assert [r["name"] for r in await db.select("Student", where={"id": [2, 3]})] == ["Alan"]
+        assert [r["name"] for r in await db.select("Student", ilike={"name": "a%"}, order_by="id", descending=True)] == ["Alan", "Ada"]
+        assert await db.select("Student", columns=["name"], limit=1) == [{"name": "Ada"}]
+
+        updated = await db.update("Student", {"assessment_ids": [3]}, where={"id": 2})
+        assert updated[0]["assessment_ids"] == [3]
+        assert [r["id"] for r in await db.delete("Student", where={"name": "Ada"})] == [1]
+        assert await db.select("Student", where={"id": 1}) == []
+
+        with pytest.raises(StorageError) as error:
+            await db.select("Student", ilike={"name; DROP TABLE Student": "x"})
+        assert error.value.code == "42703"
+        await db.close()
+
+    asyncio.run(run())
+
+
+def test_crud_and_api_on_sqlite():
+    db = SQLiteBackend()
+
+    async def override():
+        yield db
+
+    async def run():
+        template = json.dumps(TEMPLATE)
+        created = await assessment.create(
+            db,
+            obj_in=AssessmentCreate(name="Cells", first_question="?", system_prompt="", mindmap_template=template),
+        )
+        await assignments.create_student(db, obj_in=StudentCreate(name="Ada", assessment_ids=[created.id]))
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            headers = {"Authorization": f"Bearer {settings.API_KEY}"}
+            own = await client.get(f"{settings.API_VERSION}/assessments/student/1", headers=headers)
+            missing = await client.get(f"{settings.API_VERSION}/assessments/{created.id + 1}", headers=headers)
+        return own, missing
+
+    app.dependency_overrides[get_db] = override
+    try:
+        own, missing = asyncio.run(run())
+    finally:
+        app.dependency_overrides.clear()
+    assert own.status_code == 200 and [a["name"] for a in own.json()] == ["Cells"]
+    assert missing.status_code == 404
+
+
+def test_backend_is_created_once_on_first_use(monkeypatch):
+    from src.api import dependencies
+
+    created = []
+
+    async def create_backend():
+        await asyncio.sleep(0.01)
+        created.append(SQLiteBackend())
+        return created[-1]
+
+    async def run():
+        # No lifespan events, as with hosts that don't send them
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            headers = {"Authorization": f"Bearer {settings.API_KEY}"}
+            responses = await asyncio.gather(
+                *(client.get(f"{settings.API_VERSION}/teachers/", headers=headers) for _ in range(3))
+            )
+        # The lifespan only closes it on shutdown
+        async with dependencies.lifespan(app):
+            pass
+        return responses
+
+    monkeypatch.setattr(dependencies, "create_backend", create_backend)
+    responses = asyncio.run(run())
+    assert [response.status_code for response in responses] == [200] * 3
+    assert len(created) == 1 and dependencies._backend is None
+
+
+def test_postgrest_matches_none_with_is_null():
+    from postgrest import AsyncPostgrestClient
+
+    from src.storage import PostgrestBackend
+
+    query = AsyncPostgrestClient("http://test").table("Student").select("*")
+    query = PostgrestBackend._filter(query, {"name": None, "id": 1, "assessment_id": [1, 2]})
+    assert str(query.params) == "select=%2A&name=is.null&id=eq.1&assessment_id=in.%281%2C2%29"
+
+
+def test_postgrest_minimal_update_counts_the_matched_rows():
+    from postgrest import AsyncPostgrestClient
+
+    from src.storage import PostgrestBackend
+
+    requests = []
+
+    def respond(request):
+        requests.append(request)
+        return httpx.Response(204, headers={"Content-Range": "*/0"})
+
+    client = AsyncPostgrestClient("http://test")
+    client.session = httpx.AsyncClient(
+        base_url="http://test", headers=client.session.headers, transport=httpx.MockTransport(respond)
+    )
+    updated = asyncio.run(PostgrestBackend(client).update("Teacher", {"name": "Ada"}, where={"id": 9}, returning=False))
+    assert updated == []
+    assert requests[0].headers["prefer"] == "return=minimal,count=exact"
@@ -0,0 +1,138 @@
+import asyncio
+import json
+
+import httpx
+
+from benchmarks.fakes import FakeOpenRouter, FakeOpenRouterConfig
+from src.api.dependencies import get_db
+from src.config import settings
+from src.main import app
+from src.services import openrouter
+from src.storage import SQLiteBackend
+
+API = f"{settings.API_VERSION}/assessment-results"
+HEADERS = {"Authorization": f"Bearer {settings.API_KEY}"}
+TEMPLATE = {"topic": {"name": "Cells", "description": "Cell biology", "subtopics": []}}
+
+
+def test_segments_are_appended_assembled_and_compacted():
+    db = SQLiteBackend()
+    fake = FakeOpenRouter(FakeOpenRouterConfig(seed=3))
+
+    async def override():
+        yield db
+
+    async def run():
+        await db.insert(
+            "Assessment",
+            [{"name": "A", "first_question": "?", "system_prompt": "", "mindmap_template": json.dumps(TEMPLATE)}],
+        )
+        await db.insert(
+            "AssessmentResult",
+            [{"assessment_id": 1, "teacher_id": 1, "student_id": 1, "transcript": "Teacher: What are cells?"}],
+        )
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            appended = await client.post(
+                f"{API}/1/transcript",
+                headers=HEADERS,
+                json=[
+                    {"speaker": "Teacher", "offset_ms": 9000, "text": "Go on."},
+                    {"speaker": "Student", "offset_ms": 4000, "text": "Building blocks."},
+                ],
+            )
+            missing = await client.post(f"{API}/9/transcript", headers=HEADERS, json=[])
+            live = (await client.get(f"{API}/1/transcript", headers=HEADERS)).json()
+            result = (await client.get(f"{API}/1", headers=HEADERS)).json()
+            listed = [
+                (await client.get(f"{API}/student/1", headers=HEADERS, params=params)).json()[0]["transcript"]
+                for params in ({"transcript": "false"}, {})
+            ]
+            await client.get(f"{API}/1/process", headers=HEADERS)
+            compacted = (await client.get(f"{API}/1/transcript", headers=HEADERS)).json()
+        return appended, missing, live, result, listed, compacted
+
+    app.dependency_overrides[get_db] = override
+    openrouter._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app()))
+    try:
+        appended, missing, live, result, listed, compacted = asyncio.run(run())
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        openrouter._client = None
+
+    assert appended.status_code == 200 and len(appended.json()) == 2
+    assert missing.status_code == 404
+    # Segments follow the stored transcript in interview order, not arrival order
+    expected = "Teacher: What are cells?\nStudent: Building blocks.\nTeacher: Go on."
+    assert live == {"result_id": 1, "transcript": expected, "pending_segments": 2}
+    assert result["transcript"] == expected
+    # Lists leave the transcript out when asked to
+    assert listed == [None, expected]
+    # Processing folded the segments into the result's transcript column
+    assert compacted == {"result_id": 1, "transcript": expected, "pending_segments": 0}
+
+
+def test_writing_the_transcript_replaces_the_segments():
+    db = SQLiteBackend()
+
+    async def override():
+        yield db
+
+    async def run():
+        await db.insert("AssessmentResult", [{"assessment_id": 1, "teacher_id": 1, "student_id": 1, "transcript": "Teacher: Hi"}])
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            segment = {"speaker": "Student", "offset_ms": 1000, "text": "Hello."}
+            await client.post(f"{API}/1/transcript", headers=HEADERS, json=[segment])
+            # A client edits the transcript it read (segments included) and writes it back
+            result = (await client.get(f"{API}/1", headers=HEADERS)).json()
+            result["transcript"] += " Teacher: Bye"
+            await client.put(f"{API}/1", headers=HEADERS, json=result)
+            put = (await client.get(f"{API}/1/transcript", headers=HEADERS)).json()
+
+            await client.post(f"{API}/1/transcript", headers=HEADERS, json=[segment])
+            await client.patch(f"{API}/1", headers=HEADERS, json={"transcript": "Teacher: Again"})
+            patched = (await client.get(f"{API}/1/transcript", headers=HEADERS)).json()
+        return put, patched
+
+    app.dependency_overrides[get_db] = override
+    try:
+        put, patched = asyncio.run(run())
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+    assert put == {"result_id": 1, "transcript": "Teacher: Hi\nStudent: Hello. Teacher: Bye", "pending_segments": 0}
+    assert patched == {"result_id": 1, "transcript": "Teacher: Again", "pending_segments": 0}
+
+
+def test_processing_keeps_fields_patched_during_the_llm_calls():
+    db = SQLiteBackend()
+    fake = FakeOpenRouter(FakeOpenRouterConfig(seed=3, latency="fixed:100"))
+
+    async def override():
+        yield db
+
+    async def run():
+        await db.insert(
+            "Assessment",
+            [{"name": "A", "first_question": "?", "system_prompt": "", "mindmap_template": json.dumps(TEMPLATE)}],
+        )
+        await db.insert(
+            "AssessmentResult",
+            [{"assessment_id": 1, "teacher_id": 1, "student_id": 1, "transcript": "Teacher: What are cells?"}],
+        )
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            processing = asyncio.create_task(client.get(f"{API}/1/process", headers=HEADERS))
+            await asyncio.sleep(0.05)
+            await client.patch(f"{API}/1", headers=HEADERS, json={"voice_recording_id": 7})
+            await processing
+            return (await client.get(f"{API}/1", headers=HEADERS)).json()
+
+    app.dependency_overrides[get_db] = override
+    openrouter._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake.app()))
+    try:
+        result = asyncio.run(run())
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        openrouter._client = None
+
+    assert result["voice_recording_id"] == 7
+    assert result["insights"] is not None